@@ -0,0 +1,972 @@
+# benchmark.py - Medições de desempenho dos componentes do compilador
+#
+# Uso: python benchmark.py <experimento> [opções]
+import argparse
+import math
+import time
+
+# ===========================================
+#           PROGRAMAS DE TESTE
+# ===========================================
+
+# Trecho representativo da linguagem, repetido para gerar entradas grandes
+SAMPLE_PROGRAM = '''
+; soma dos elementos de uma lista
+(defun soma (lista)
+    (if (eq lista nil) 0
+        (+ (car lista) (soma (cdr lista)))))
+
+(defun concat (lista1 lista2)
+  (if (eq lista1 nil) lista2
+     (cons (car lista1)
+         (concat (cdr lista1) lista2))))
+
+(defun classifica (n)
+  (cond ((< n 0) 0)
+        ((> n 100) 2)
+        (T 1)))
+
+(soma (list 1 2 3 4 5 6 7 8 9 10))
+(concat (list 1 2) (list 3 4))
+(classifica (* (mod 17 5) (expt 2 3)))
+(if (>= (floor 10 3) 3) T nil)
+'''
+
+
+# Programa com muitas expressões constantes e cópias (alvo do otimizador)
+CONSTANT_PROGRAM = '''
+(defun area (r) (* (+ 1 2) (* r r)))
+(defun escolhe (x) (if (> (* 2 3) 5) (+ x (- 10 4)) 0))
+(defun faixa (n)
+  (cond ((< n (* 2 5)) (list 1 (+ 1 1) 3))
+        ((= (mod 10 3) 1) (cons n nil))
+        (T nil)))
+(area 4)
+(escolhe (+ 20 (expt 2 5)))
+(faixa 3)
+(faixa 50)
+(if (eq 1 1) (floor 7 2) (/ 1 0))
+(car (cdr (list (+ 1 1) (* 3 3) 27)))
+'''
+
+
+def generate_source(copies):
+    """Gera um programa grande concatenando cópias do programa de exemplo."""
+    return SAMPLE_PROGRAM * copies
+
+
+def run_program(source, **options):
+    """Compila e executa source; retorna (linhas de resultado, compilador)."""
+    import contextlib
+    import io
+    from compiler import LispCompiler
+
+    compiler = LispCompiler(cache=False, **options)
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        compiler.compile_and_execute(source)
+    results = [line for line in out.getvalue().splitlines() if line.startswith('=>')]
+    return results, compiler
+
+
+def best_of(func, repeat=3):
+    """Executa func repeat vezes e retorna (menor tempo, último retorno)."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+# ===========================================
+#                 LEXER
+# ===========================================
+
+def lex_with_ply(source):
+    from tokens import get_lexer
+    lex = get_lexer().clone()
+    lex.input(source)
+    return list(lex)
+
+
+def lex_with_stream(source):
+    from fastlexer import scan
+    return scan(source)
+
+
+def lex_with_fast(source):
+    from fastlexer import tokenize
+    tokens = []
+    for batch in tokenize(source):
+        tokens.extend(batch)
+    return tokens
+
+
+def compare_lexers(source):
+    """Teste diferencial: os dois backends devem produzir a mesma sequência."""
+    ply_tokens = lex_with_ply(source)
+    fast_tokens = lex_with_fast(source)
+    stream_tokens = list(lex_with_stream(source))
+
+    def key(tok):
+        return (tok.type, tok.value, tok.lineno, tok.lexpos)
+
+    for i, (a, b, c) in enumerate(zip(ply_tokens, fast_tokens, stream_tokens)):
+        if key(a) != key(b):
+            raise AssertionError(f"Token {i} diverge: PLY={a} rápido={b}")
+        if key(a) != key(c):
+            raise AssertionError(f"Token {i} diverge: PLY={a} colunas={c}")
+    if not len(ply_tokens) == len(fast_tokens) == len(stream_tokens):
+        raise AssertionError(f"Quantidade diverge: PLY={len(ply_tokens)} rápido={len(fast_tokens)} colunas={len(stream_tokens)}")
+    return len(ply_tokens)
+
+
+def bench_lexer(args):
+    source = generate_source(args.copies)
+    total = compare_lexers(source)
+    print(f"Entrada: {len(source)} caracteres, {total} tokens (backends conferidos)")
+
+    for name, func in (('ply', lex_with_ply), ('fast', lex_with_fast), ('stream', lex_with_stream)):
+        elapsed, _ = best_of(lambda: func(source), args.repeat)
+        print(f"  {name:6} {elapsed:8.3f} s  {total / elapsed:12,.0f} tokens/s")
+
+    # Memória retida pelos tokens: lista de LexToken x colunas do TokenStream
+    import tracemalloc
+    for name, func in (('ply', lex_with_ply), ('stream', lex_with_stream)):
+        tracemalloc.start()
+        kept = func(source)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del kept
+        print(f"  {name:6} {size / 2**20:8.1f} MiB retidos ({size / total:.0f} bytes/token)")
+
+
+# ===========================================
+#               OTIMIZADOR
+# ===========================================
+
+def bench_optimizer(args):
+    """Confere que -O1 não muda resultados e mostra quantas instruções remove."""
+    from optimizer import OPT_LEVELS
+
+    for name, source in (('exemplo', SAMPLE_PROGRAM), ('constantes', CONSTANT_PROGRAM)):
+        base, compiler = run_program(source, opt_level=0)
+        size = len(compiler.current_code)
+        for level in OPT_LEVELS[1:]:
+            results, compiler = run_program(source, opt_level=level)
+            if results != base:
+                raise AssertionError(f"-O{level} mudou o resultado de '{name}': {results} != {base}")
+            stats = compiler.last_opt_stats
+            print(f"  {name:11} -O{level}: {size} -> {len(compiler.current_code)} instruções "
+                  f"({stats['folded']} dobradas, {stats['propagated']} cópias propagadas, "
+                  f"{stats['removed']} removidas) — resultados idênticos")
+            for func, (blocks, instrs) in stats['cfg'].items():
+                if blocks or instrs:
+                    print(f"      {func:16} fluxo de controle: {blocks} blocos e {instrs} instruções a menos")
+
+
+# ===========================================
+#        FORMATO BINÁRIO (.lispc)
+# ===========================================
+
+def parse_source(source):
+    """Fonte -> AST (lexer rápido)."""
+    from parser import get_parser
+    from fastlexer import FastLexer
+
+    return get_parser().parse(source, lexer=FastLexer())
+
+
+def compile_source(source, opt_level=0, inline_size=None):
+    """Fonte -> código intermediário (sem otimização, por padrão)."""
+    from codegen import CodeGenerator
+    from optimizer import optimize, INLINE_SIZE
+
+    if inline_size is None:
+        inline_size = INLINE_SIZE
+    return optimize(CodeGenerator().generate(parse_source(source)), opt_level, inline_size)[0]
+
+
+def compile_bytecode(source):
+    """Fonte -> Program com slots alocados (o conteúdo de um .lispc)."""
+    import bytecode
+    from codegen import allocate_slots
+
+    code, template = allocate_slots(compile_source(source))
+    return bytecode.encode(code, template)
+
+
+def run_bytecode(filename):
+    """Executa um .lispc; retorna as linhas de resultado."""
+    import contextlib
+    import io
+    from compiler import LispCompiler
+
+    compiler = LispCompiler(cache=False)
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        compiler.execute_bytecode_file(filename)
+    return [line for line in out.getvalue().splitlines() if line.startswith('=>')]
+
+
+def bench_bytecode(args):
+    import os
+    import tempfile
+    import tracemalloc
+    import bytecode
+
+    source = generate_source(args.copies)
+    program = compile_bytecode(source)
+    code = program.decode()
+
+    # Ida e volta: o binário lido deve devolver exatamente o mesmo programa
+    loaded = bytecode.from_bytes(program.to_bytes())
+    if loaded.decode() != code or loaded.frame != program.frame:
+        raise AssertionError("Código decodificado do .lispc difere do original")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'programa' + bytecode.BYTECODE_SUFFIX)
+        program.save(filename)
+        size = os.path.getsize(filename)
+
+        # Resultados idênticos executando do fonte e do .lispc
+        small = os.path.join(tmp, 'exemplo' + bytecode.BYTECODE_SUFFIX)
+        compile_bytecode(SAMPLE_PROGRAM).save(small)
+        expected, _ = run_program(SAMPLE_PROGRAM)
+        if run_bytecode(small) != expected:
+            raise AssertionError("Resultado do .lispc difere do programa fonte")
+
+        print(f"Programa: {len(code)} instruções, {len(program.pool)} constantes no pool "
+              f"(ida e volta e resultados conferidos)")
+
+        # Memória: lista de tuplas x arrays do Program
+        tracemalloc.start()
+        kept = program.decode()
+        tuples_size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del kept
+        print(f"  lista de tuplas {tuples_size / 2**20:8.2f} MiB")
+        print(f"  binário         {program.nbytes() / 2**20:8.2f} MiB  ({tuples_size / program.nbytes():.1f}x menor); "
+              f"arquivo {size / 2**20:.2f} MiB")
+
+        # Carga: compilar o fonte x mapear o .lispc (e decodificar para execução)
+        compile_time, _ = best_of(lambda: compile_source(source), args.repeat)
+        map_time, _ = best_of(lambda: bytecode.load(filename), args.repeat)
+        decode_time, _ = best_of(lambda: bytecode.load(filename).decode(), args.repeat)
+        print(f"  compilar fonte  {compile_time * 1000:8.1f} ms")
+        print(f"  mapear .lispc   {map_time * 1000:8.1f} ms")
+        print(f"  mapear+decodif. {decode_time * 1000:8.1f} ms")
+
+
+# ===========================================
+#        DESPACHO DO INTERPRETADOR
+# ===========================================
+
+# Cargas de trabalho: chamadas recursivas (fib) e percurso de listas,
+# com o resultado esperado de cada expressão
+DISPATCH_PROGRAMS = {
+    'fib': ('''
+(defun fib (n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))
+(fib 18)
+''', ['=> 2584']),
+    'listas': ('''
+(defun faixa (n acc) (if (= n 0) acc (faixa (- n 1) (cons n acc))))
+(defun soma (l acc) (if (eq l nil) acc (soma (cdr l) (+ acc (car l)))))
+(defun conta (l n) (if (eq l nil) n (conta (cdr l) (+ n 1))))
+(soma (faixa 1500 nil) 0)
+(conta (faixa 1500 nil) 0)
+''', ['=> 1125750', '=> 1500']),
+    'cond': ('''
+(defun classe (n) (cond ((< n 10) 1) ((< n 100) 2) ((< n 1000) 3) (t 4)))
+(defun soma (n acc) (if (= n 0) acc (soma (- n 1) (+ acc (classe n)))))
+(soma 3000 0)
+''', ['=> 10893']),
+}
+
+
+def run_interpreter(code, interpreter=None):
+    """Executa code em um interpretador (novo, se não for dado); retorna as linhas de resultado."""
+    import contextlib
+    import io
+    from interpreter import Interpreter
+
+    interpreter = interpreter or Interpreter()
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        interpreter.execute(code)
+    return [line for line in out.getvalue().splitlines() if line.startswith('=>')]
+
+
+def count_instructions(code):
+    """Número de instruções executadas, contadas por handlers envolvidos.
+
+    Retorna (instruções, taxa de acerto das formas especializadas).
+    """
+    from interpreter import Interpreter, HITS, MISSES
+
+    class CountingInterpreter(Interpreter):
+        steps = 0
+
+        def counted(self, handler):
+            def counted(instr):
+                CountingInterpreter.steps += 1
+                return handler(instr)
+            return counted
+
+        def decode(self, instr):
+            return self.counted(super().decode(instr))
+
+        def quicken(self, instr, handler):
+            super().quicken(instr, self.counted(handler))
+
+    interpreter = CountingInterpreter()
+    interpreter.count_hits = True
+    run_interpreter(code, interpreter)
+    hits = sum(row[1 + HITS] for row in interpreter.quicken_report())
+    misses = sum(row[1 + MISSES] for row in interpreter.quicken_report())
+    return CountingInterpreter.steps, hits / max(hits + misses, 1)
+
+
+def bench_dispatch(args):
+    print(f"Instruções executadas por segundo ({args.repeat} execuções, menor tempo, -O{args.opt})")
+    for name, (source, expected) in DISPATCH_PROGRAMS.items():
+        code = compile_source(source, args.opt)
+        steps, hit_rate = count_instructions(code)
+        elapsed, results = best_of(lambda: run_interpreter(code), args.repeat)
+        if results != expected:
+            raise AssertionError(f"Resultado de '{name}' incorreto: {results} != {expected}")
+        print(f"  {name:8} {steps:9,} instruções  {elapsed * 1000:8.1f} ms  {steps / elapsed:12,.0f} instr/s"
+              f"  quickening {hit_rate:6.1%}")
+
+
+# ===========================================
+#             BACKEND PYTHON
+# ===========================================
+
+# Casos de borda da comparação com o Interpreter: coerções, aridade,
+# funções indefinidas, erros de tipo e recursão mais funda que a pilha do Python
+DIFF_PROGRAMS = {
+    'aritmética': '''
+(+ a 2) (- (list 1 2) 1) (* nil 3) (/ 7 0) (mod 7 0) (floor 7 2) (mod (- 0 7) 2)
+(expt 2 10) (expt 2 (- 0 1)) (+ (expt 2 (- 0 1)) 2) (- 10 (* 2 (+ 1 1)))
+''',
+    'comparações': '''
+(equalp 2 (* 4 (expt 2 (- 0 1)))) (equalp a A) (eq (list 1 2) (list 1 2)) (equal nil nil)
+(/= 1 2) (= (cons 1 2) (cons 1 2)) (< 1 2) (>= 2 3)
+''',
+    'listas': '''
+(car nil) (cdr 5) (car (cdr (list 1 2 3))) (cons 1 2) (cons 1 (list 2 3)) (list)
+(list (list 1) (cons 2 nil) nil)
+''',
+    'controle': '''
+(defun sinal (n) (cond ((< n 0) (- 0 1)) ((> n 0) 1)))
+(sinal (- 0 5)) (sinal 0) (sinal 7)
+(+ (if (> 1 2) 1 2) (cond ((= 1 1) 10) (T 20)))
+(if nil 1 2) (if 0 1 2) (cond (nil 1) (T (if T 3 4)))
+''',
+    'aridade': '''
+(defun dois (a b) (list a b))
+(dois 1) (dois 1 2 3)
+(defun conta (n acc) (if (= n 0) acc (conta (- n 1))))
+(conta 3 0)
+''',
+    'indefinida': '''
+(defun f (x) (g x))
+(f 1) (h 2)
+''',
+    'redefinição': '''
+(defun f (x) 1) (f 0) (defun f (x) 2) (f 0)
+''',
+    'erro de tipo': '''
+(defun menor (a b) (< a b))
+(menor 1 2) (menor (list 1) 2) (menor 3 4)
+''',
+    'recursão funda': '''
+(defun faixa (n) (if (= n 0) nil (cons n (faixa (- n 1)))))
+(defun par (n) (cond ((= n 0) T) (T (impar (- n 1)))))
+(defun impar (n) (cond ((= n 0) nil) (T (par (- n 1)))))
+(car (faixa 5000)) (par 10001)
+''',
+}
+
+
+def run_output(code, interpreter):
+    """Executa code no interpretador dado; retorna todas as linhas impressas."""
+    import contextlib
+    import io
+
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        interpreter.execute(code)
+    return out.getvalue().splitlines()
+
+
+def bench_python(args):
+    """Confere o backend Python contra o Interpreter (mesma saída) e compara os tempos."""
+    from interpreter import Interpreter
+    from optimizer import OPT_LEVELS
+    from pybackend import PyBackend
+
+    programs = dict(DIFF_PROGRAMS, exemplo=SAMPLE_PROGRAM, constantes=CONSTANT_PROGRAM)
+    programs.update((name, source) for name, (source, _) in DISPATCH_PROGRAMS.items())
+    print(f"Comparação com o Interpreter ({len(programs)} programas, -O{'/-O'.join(map(str, OPT_LEVELS))})")
+    totals = {}
+    for name, source in programs.items():
+        for level in OPT_LEVELS:
+            code = compile_source(source, level)
+            backend = PyBackend()
+            # Expressão refeita após erro: a posição é a do trecho refeito
+            expected = without_positions(run_output(code, Interpreter()))
+            output = without_positions(run_output(code, backend))
+            if output != expected:
+                raise AssertionError(f"backend Python mudou a saída de '{name}' (-O{level}):\n"
+                                     f"{output}\n!=\n{expected}")
+            for key, count in backend.native_stats.items():
+                totals[key] = totals.get(key, 0) + count
+    print(f"  saídas idênticas: {totals['native']} unidades nativas, {totals['interpreted']} "
+          f"no Interpreter, {totals['fallbacks']} expressões refeitas no Interpreter após erro")
+
+    print(f"\nTempo por execução ({args.repeat} execuções, menor tempo, -O{args.opt})")
+    print(f"  {'programa':10} {'interp':>10} {'python 1ª':>10} {'python':>10} {'ganho':>7}")
+    for name, (source, expected) in DISPATCH_PROGRAMS.items():
+        code = compile_source(source, args.opt)
+        interp, _ = best_of(lambda: run_interpreter(code), args.repeat)
+        backend = PyBackend()
+        # Primeira execução: tradução e compile(); as demais usam o cache
+        first, results = best_of(lambda: run_interpreter(code, backend), 1)
+        native, results = best_of(lambda: run_interpreter(code, backend), args.repeat)
+        if results != expected:
+            raise AssertionError(f"Resultado de '{name}' incorreto: {results} != {expected}")
+        print(f"  {name:10} {interp * 1000:8.1f}ms {first * 1000:8.1f}ms {native * 1000:8.1f}ms "
+              f"{interp / native:6.1f}x")
+
+
+# ===========================================
+#            SESSÃO LONGA (REPL)
+# ===========================================
+
+# Definição feita no início da sessão e linha avaliada repetidamente depois
+REPL_PRELUDE = '(defun dobro (x) (* x 2))'
+REPL_LINE = ('(if (> (dobro 3) 5) (dobro 4) 0)', 8)
+
+
+def bench_repl(args):
+    import contextlib
+    import io
+    from interpreter import Interpreter
+
+    interpreter = Interpreter()
+    prelude = compile_source(REPL_PRELUDE)
+    source, expected = REPL_LINE
+    line = compile_source(source)
+    print(f"Custo de uma avaliação ao longo de uma sessão de {args.lines:,} linhas "
+          f"(lotes de {args.batch})")
+
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.execute(prelude)
+        for n in range(args.lines // args.batch):
+            start = time.perf_counter()
+            for _ in range(args.batch):
+                result = interpreter.execute(line)
+            times.append(time.perf_counter() - start)
+            if result != expected:
+                raise AssertionError(f"Resultado incorreto na linha {n * args.batch}: {result} != {expected}")
+
+    first, last = times[0] / args.batch, times[-1] / args.batch
+    ratio = last / first
+    print(f"  primeiro lote  {first * 1e6:8.1f} us/linha")
+    print(f"  último lote    {last * 1e6:8.1f} us/linha   razão {ratio:.2f}")
+    # O custo de uma linha não deve depender do tamanho da sessão (folga para ruído)
+    if ratio > 3.0:
+        raise AssertionError(f"Avaliação fica mais lenta com a sessão: razão {ratio:.2f}")
+
+
+# ===========================================
+#          LATÊNCIA POR AVALIAÇÃO
+# ===========================================
+
+# Linhas curtas de REPL ({n} muda a cada avaliação: nenhuma é repetida)
+LATENCY_LINES = {
+    'aritmética': '(+ (* {n} 2) (- {n} 1))',
+    'chamada': '(if (> (dobro {n}) 5) (dobro 4) 0)',
+    'listas': '(car (cdr (list {n} (cons 1 2) 3)))',
+    'cond': '(cond ((< {n} 0) 0) ((> {n} 100) (dobro {n})) (T 1))',
+}
+
+
+def latency_backends():
+    """Modos comparados: nome -> (backend novo, avaliação de uma AST)."""
+    from closures import ClosureBackend
+    from codegen import CodeGenerator
+    from interpreter import Interpreter
+    from pybackend import PyBackend
+
+    def execute(backend):
+        return lambda ast: backend.execute(CodeGenerator().generate(ast))
+
+    def new(cls, evaluate):
+        backend = cls()
+        return backend, evaluate(backend)
+
+    return {
+        'interp': lambda: new(Interpreter, execute),
+        'python': lambda: new(PyBackend, execute),
+        'closure': lambda: new(ClosureBackend, lambda backend: backend.execute_ast),
+    }
+
+
+def bench_latency(args):
+    """Confere o modo closure contra o Interpreter e mede o tempo por avaliação dos três modos."""
+    import contextlib
+    import io
+    from closures import ClosureBackend
+    from interpreter import Interpreter
+
+    programs = dict(DIFF_PROGRAMS, exemplo=SAMPLE_PROGRAM, constantes=CONSTANT_PROGRAM)
+    programs.update((name, source) for name, (source, _) in DISPATCH_PROGRAMS.items())
+    print(f"Comparação com o Interpreter ({len(programs)} programas)")
+    totals = {}
+    for name, source in programs.items():
+        # Expressão refeita após erro: a posição é a do código dela
+        expected = without_positions(run_output(compile_source(source), Interpreter()))
+        backend = ClosureBackend()
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            backend.execute_ast(parse_source(source))
+        output = without_positions(out.getvalue().splitlines())
+        if output != expected:
+            raise AssertionError(f"modo closure mudou a saída de '{name}':\n{output}\n!=\n{expected}")
+        for key, count in backend.closure_stats.items():
+            totals[key] = totals.get(key, 0) + count
+    print(f"  saídas idênticas: {totals['closure']} expressões em closures, {totals['interpreted']} "
+          f"formas no Interpreter, {totals['fallbacks']} expressões refeitas no Interpreter após erro")
+
+    backends = latency_backends()
+    prelude = parse_source(REPL_PRELUDE)
+    print(f"\nLatência por avaliação ({args.evals} linhas distintas, menor de {args.repeat} rodadas)")
+    print(f"  {'linha':10} {'parse':>9} " + ' '.join(f"{mode:>9}" for mode in backends) + f" {'ganho':>7}")
+    for name, line in LATENCY_LINES.items():
+        sources = [line.format(n=n) for n in range(args.evals)]
+        parse, asts = best_of(lambda: [parse_source(source) for source in sources], args.repeat)
+        times = {}
+        results = {}
+        for mode, new_backend in backends.items():
+            best = None
+            for _ in range(args.repeat):
+                backend, evaluate = new_backend()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    evaluate(prelude)
+                    start = time.perf_counter()
+                    values = [evaluate(ast) for ast in asts]
+                    elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            times[mode] = best / args.evals
+            results[mode] = values
+        if any(values != results['interp'] for values in results.values()):
+            raise AssertionError(f"Resultados de '{name}' diferem entre os modos")
+        print(f"  {name:10} {parse / args.evals * 1e6:7.1f}us " +
+              ' '.join(f"{times[mode] * 1e6:7.1f}us" for mode in backends) +
+              f" {times['interp'] / times['closure']:6.1f}x")
+
+    # Embutido: call_function sobre a função do prelúdio
+    print(f"\ncall_function('dobro', [n]) ({args.evals} chamadas)")
+    for mode, new_backend in backends.items():
+        backend, evaluate = new_backend()
+        with contextlib.redirect_stdout(io.StringIO()):
+            evaluate(prelude)
+        elapsed, values = best_of(lambda: [backend.call_function('dobro', [n]) for n in range(args.evals)],
+                                  args.repeat)
+        if values != [2 * n for n in range(args.evals)]:
+            raise AssertionError(f"call_function incorreto no modo {mode}")
+        print(f"  {mode:10} {elapsed / args.evals * 1e6:7.1f}us/chamada")
+
+
+# ===========================================
+#          BYTECODE DE PILHA
+# ===========================================
+
+def ast_output(source, backend):
+    """Executa o fonte a partir da AST no backend dado; retorna todas as linhas impressas."""
+    import contextlib
+    import io
+
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        backend.execute_ast(parse_source(source))
+    return out.getvalue().splitlines()
+
+
+def without_positions(lines):
+    # A posição da instrução que falhou depende do formato do código
+    return [line for line in lines if not line.startswith('Erro na instrução')]
+
+
+def bench_stack(args):
+    """Confere a VM de pilha contra o Interpreter e compara os backends por carga de trabalho."""
+    from closures import ClosureBackend
+    from codegen import CodeGenerator
+    from interpreter import Interpreter
+    from pybackend import PyBackend
+    from stackvm import StackVM
+
+    programs = dict(DIFF_PROGRAMS, exemplo=SAMPLE_PROGRAM, constantes=CONSTANT_PROGRAM)
+    programs.update((name, source) for name, (source, _) in DISPATCH_PROGRAMS.items())
+    print(f"Comparação com o Interpreter ({len(programs)} programas)")
+    for name, source in programs.items():
+        expected = without_positions(run_output(compile_source(source), Interpreter()))
+        output = without_positions(ast_output(source, StackVM()))
+        if output != expected:
+            raise AssertionError(f"VM de pilha mudou a saída de '{name}':\n{output}\n!=\n{expected}")
+    print("  saídas idênticas")
+
+    # Cargas: as de despacho e as de listas no tamanho pedido
+    workloads = {name: source for name, (source, _) in DISPATCH_PROGRAMS.items()}
+    workloads.update((name, case(args.size)) for name, case in LIST_CASES.items())
+
+    def ir(cls, shared=False):
+        # Código intermediário gerado a partir da AST; PyBackend reaproveita a tradução
+        instance = cls() if shared else None
+        return lambda ast: (instance or cls()).execute(CodeGenerator().generate(ast))
+
+    backends = {
+        'interp': ir(Interpreter),
+        'python': ir(PyBackend, shared=True),
+        'closure': lambda ast: ClosureBackend().execute_ast(ast),
+        'stack': lambda ast: StackVM().execute_ast(ast),
+    }
+
+    print(f"\nTempo por execução a partir da AST ({args.repeat} execuções, menor tempo; python com a tradução em cache)")
+    print(f"  {'carga':12} " + ' '.join(f"{mode:>9}" for mode in backends) + f"  {'melhor':8}")
+    import contextlib
+    import io
+    for name, source in workloads.items():
+        ast = parse_source(source)
+        times = {}
+        results = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for mode, run in backends.items():
+                times[mode], results[mode] = best_of(lambda: run(ast), args.repeat)
+        if any(result != results['interp'] for result in results.values()):
+            raise AssertionError(f"Resultados de '{name}' diferem entre os backends: {results}")
+        best = min(times, key=times.get)
+        print(f"  {name:12} " + ' '.join(f"{times[mode] * 1000:7.1f}ms" for mode in backends) + f"  {best}")
+
+
+# ===========================================
+#          EXPANSÃO EM LINHA
+# ===========================================
+
+# Laços que chamam funções auxiliares pequenas a cada passo
+INLINE_PROGRAMS = {
+    'quadrados': ('''
+(defun quadrado (x) (* x x))
+(defun positivo (n) (> n 0))
+(defun soma-quadrados (n acc) (if (positivo n) (soma-quadrados (- n 1) (+ acc (quadrado n))) acc))
+(soma-quadrados 3000 0)
+''', ['=> 9004500500']),
+    'predicados': ('''
+(defun vazia (l) (eq l nil))
+(defun inc (x) (+ x 1))
+(defun abs (n) (if (< n 0) (- 0 n) n))
+(defun faixa (n acc) (if (= n 0) acc (faixa (- n 1) (cons (- n 750) acc))))
+(defun soma-abs (l acc) (if (vazia l) acc (soma-abs (cdr l) (+ acc (abs (car l))))))
+(defun conta (l n) (if (vazia l) n (conta (cdr l) (inc n))))
+(soma-abs (faixa 1500 nil) 0)
+(conta (faixa 1500 nil) 0)
+''', ['=> 562500', '=> 1500']),
+}
+
+
+def count_calls(code):
+    """Número de chamadas de função executadas (CALL e TAIL_CALL, inclusive as superinstruções)."""
+    from interpreter import Interpreter
+
+    class CallCounter(Interpreter):
+        calls = 0
+
+        def decode(self, instr):
+            handler = super().decode(instr)
+            if 'CALL' not in instr[0]:
+                return handler
+
+            def counted(instr):
+                CallCounter.calls += 1
+                return handler(instr)
+            return counted
+
+    run_interpreter(code, CallCounter())
+    return CallCounter.calls
+
+
+def bench_inline(args):
+    """Confere a expansão em linha (mesma saída) e mede a economia de chamadas em -O1."""
+    from interpreter import Interpreter
+    from pybackend import PyBackend
+
+    programs = dict(DIFF_PROGRAMS, exemplo=SAMPLE_PROGRAM, constantes=CONSTANT_PROGRAM)
+    programs.update((name, source) for name, (source, _) in DISPATCH_PROGRAMS.items())
+    programs.update((name, source) for name, (source, _) in INLINE_PROGRAMS.items())
+    print(f"Comparação com -O0 e -O1 sem expansão ({len(programs)} programas, limite {args.size})")
+    for name, source in programs.items():
+        expected = without_positions(run_output(compile_source(source), Interpreter()))
+        for size in (0, args.size):
+            output = without_positions(run_output(compile_source(source, 1, size), Interpreter()))
+            if output != expected:
+                raise AssertionError(f"-O1 (limite {size}) mudou a saída de '{name}':\n{output}\n!=\n{expected}")
+    print("  saídas idênticas")
+
+    print(f"\nChamadas e tempo em -O1, sem expansão x limite {args.size} ({args.repeat} execuções, menor tempo)")
+    print(f"  {'programa':10} {'chamadas':>17} {'instruções':>19} {'interp':>17} {'python':>15}")
+    for name, (source, expected) in INLINE_PROGRAMS.items():
+        row = {}
+        for size in (0, args.size):
+            code = compile_source(source, 1, size)
+            steps, _ = count_instructions(code)
+            interp, results = best_of(lambda: run_interpreter(code), args.repeat)
+            if results != expected:
+                raise AssertionError(f"Resultado de '{name}' incorreto: {results} != {expected}")
+            backend = PyBackend()
+            native, _ = best_of(lambda: run_interpreter(code, backend), args.repeat)
+            row[size] = (count_calls(code), steps, interp * 1000, native * 1000)
+        (calls, steps, interp, native), (calls2, steps2, interp2, native2) = row[0], row[args.size]
+        print(f"  {name:10} {calls:7,} -> {calls2:7,} {steps:8,} -> {steps2:8,} "
+              f"{interp:5.1f} -> {interp2:5.1f}ms {native:4.1f} -> {native2:4.1f}ms")
+
+
+# ===========================================
+#          ESCALABILIDADE DE LISTAS
+# ===========================================
+
+# Programas de tamanho n: constroem e percorrem listas de n elementos
+LIST_CASES = {
+    'faixa+soma': lambda n: f'''
+(defun faixa (n acc) (if (= n 0) acc (faixa (- n 1) (cons n acc))))
+(defun soma (l) (if (eq l nil) 0 (+ (car l) (soma (cdr l)))))
+(soma (faixa {n} nil))
+''',
+    'list+conta': lambda n: f'''
+(defun conta (l n) (if (eq l nil) n (conta (cdr l) (+ n 1))))
+(conta (list {' '.join(['7'] * n)}) 0)
+''',
+}
+
+
+# Expoente máximo aceito para o crescimento do tempo (1 = linear, 2 = quadrático)
+MAX_GROWTH = 1.5
+
+
+def growth_exponent(sizes, times):
+    """Inclinação da reta de mínimos quadrados de log(tempo) x log(n): o k de tempo ~ n^k."""
+    xs = [math.log(n) for n in sizes]
+    ys = [math.log(t) for t in times]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    return (sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+            / sum((x - mean_x) ** 2 for x in xs))
+
+
+def bench_lists(args):
+    sizes = [args.size // 4, args.size // 2, args.size]
+    print(f"Tempo de execução por tamanho de lista (n = {sizes}, {args.repeat} execuções, menor tempo)")
+
+    failures = []
+    for name, make in LIST_CASES.items():
+        times = []
+        for n in sizes:
+            code = compile_source(make(n))
+            run_interpreter(code)   # Aquecimento: a primeira execução paga alocações e caches frios
+            elapsed, results = best_of(lambda: run_interpreter(code), args.repeat)
+            expected = n * (n + 1) // 2 if name == 'faixa+soma' else n
+            if results != [f'=> {expected}']:
+                raise AssertionError(f"Resultado de '{name}' com n={n} incorreto: {results}")
+            times.append(elapsed)
+
+        # Pela inclinação das três medidas, não por uma razão isolada (ruído)
+        growth = growth_exponent(sizes, times)
+        linear = growth < MAX_GROWTH
+        if not linear:
+            failures.append(name)
+        cols = '  '.join(f"{t * 1000:8.1f} ms" for t in times)
+        print(f"  {name:11} {cols}   tempo ~ n^{growth:.2f}  {'ok' if linear else 'NÃO LINEAR'}")
+
+    if failures:
+        raise AssertionError(f"Crescimento super-linear em: {', '.join(failures)}")
+
+
+# ===========================================
+#          ESCALABILIDADE DO PARSER
+# ===========================================
+
+# Geradores de entradas de tamanho n para cada regra de lista da gramática
+SCALING_CASES = {
+    'blocos':    lambda n: '(+ 1 2)\n' * n,
+    'argumentos': lambda n: '(list ' + ' '.join(str(i) for i in range(n)) + ')',
+    'parametros': lambda n: '(defun f (' + ' '.join(f'p{i}' for i in range(n)) + ') 0)',
+    'clausulas':  lambda n: '(cond ' + ' '.join(f'((eq x {i}) {i})' for i in range(n)) + ')',
+}
+
+
+def bench_parser_scaling(args):
+    from parser import get_parser
+    from fastlexer import FastLexer
+
+    parser = get_parser()
+    lexer = FastLexer()
+    sizes = [args.size // 4, args.size // 2, args.size]
+    print(f"Tempo de parse por tamanho de entrada (n = {sizes})")
+
+    failures = []
+    for name, make in SCALING_CASES.items():
+        times = []
+        for n in sizes:
+            source = make(n)
+            parser.parse(source, lexer=lexer)   # Aquecimento, como em bench_lists
+            elapsed, ast = best_of(lambda: parser.parse(source, lexer=lexer), args.repeat)
+            if ast is None:
+                raise AssertionError(f"Falha no parse do caso '{name}' com n={n}")
+            times.append(elapsed)
+
+        # Mesmo critério de bench_lists: inclinação de log(tempo) x log(n)
+        growth = growth_exponent(sizes, times)
+        linear = growth < MAX_GROWTH
+        if not linear:
+            failures.append(name)
+        cols = '  '.join(f"{t * 1000:8.1f} ms" for t in times)
+        print(f"  {name:11} {cols}   tempo ~ n^{growth:.2f}  {'ok' if linear else 'NÃO LINEAR'}")
+
+    if failures:
+        raise AssertionError(f"Crescimento super-linear em: {', '.join(failures)}")
+
+
+# ===========================================
+#            PARTIDA (CLI CURTA)
+# ===========================================
+
+# Processo mínimo: importa o compilador e avalia uma expressão
+STARTUP_SNIPPET = ("from compiler import LispCompiler; "
+                   "LispCompiler(lexer_backend={backend!r}).compile_and_execute('(+ 1 2)')")
+
+
+def time_to_first_result(backend, cwd):
+    """Tempo entre o início do processo e a primeira linha de RESULT (=>)."""
+    import subprocess
+    import sys
+
+    cmd = [sys.executable, '-c', STARTUP_SNIPPET.format(backend=backend)]
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, text=True)
+    elapsed = None
+    for line in proc.stdout:
+        if line.startswith('=>'):
+            elapsed = time.perf_counter() - start
+            break
+    proc.stdout.read()
+    proc.wait()
+    if elapsed is None:
+        raise RuntimeError(f"Processo não produziu resultado (backend {backend})")
+    return elapsed
+
+
+def copy_sources_without_tables(dest):
+    """Copia os módulos para dest sem lextab.py/parsetab.py (força a análise da gramática)."""
+    import glob
+    import os
+    import shutil
+
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    for path in glob.glob(os.path.join(src_dir, '*.py')):
+        if os.path.basename(path) not in ('lextab.py', 'parsetab.py'):
+            shutil.copy(path, dest)
+
+
+def bench_startup(args):
+    import os
+    import tempfile
+
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    print(f"Latência import -> primeiro resultado ({args.repeat} execuções, menor tempo)")
+
+    for backend in ('ply', 'fast'):
+        best = min(time_to_first_result(backend, src_dir) for _ in range(args.repeat))
+        print(f"  tabelas pré-geradas, lexer {backend:5} {best * 1000:8.1f} ms")
+
+    # Sem tabelas: cada processo refaz a análise da gramática
+    times = []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            copy_sources_without_tables(tmp)
+            times.append(time_to_first_result('ply', tmp))
+    print(f"  sem tabelas (gera gramática)  {min(times) * 1000:8.1f} ms")
+
+
+# ===========================================
+#                 MAIN
+# ===========================================
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmarks do compilador Lisp")
+    sub = arg_parser.add_subparsers(dest='experimento', required=True)
+
+    p = sub.add_parser('lexer', help="tokens/s dos backends de lexer (PLY x rápido)")
+    p.add_argument('--copies', type=int, default=2000, help="cópias do programa de exemplo")
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_lexer)
+
+    p = sub.add_parser('optimizer', help="confere e mede o otimizador (-O)")
+    p.set_defaults(func=bench_optimizer)
+
+    p = sub.add_parser('bytecode', help="formato binário .lispc: memória e tempo de carga")
+    p.add_argument('--copies', type=int, default=500, help="cópias do programa de exemplo")
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_bytecode)
+
+    p = sub.add_parser('dispatch', help="instruções/s do interpretador (fib, listas e cond)")
+    p.add_argument('--repeat', type=int, default=3)
+    p.add_argument('-O', dest='opt', type=int, default=0, choices=(0, 1), help="nível de otimização")
+    p.set_defaults(func=bench_dispatch)
+
+    p = sub.add_parser('python', help="backend Python: mesma saída que o interpretador e tempos")
+    p.add_argument('--repeat', type=int, default=5)
+    p.add_argument('-O', dest='opt', type=int, default=0, choices=(0, 1), help="nível de otimização")
+    p.set_defaults(func=bench_python)
+
+    p = sub.add_parser('latencia', help="modo closure: mesma saída e latência por avaliação dos três modos")
+    p.add_argument('--evals', type=int, default=2000, help="linhas avaliadas por rodada")
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_latency)
+
+    p = sub.add_parser('pilha', help="VM de pilha: mesma saída e tempo por carga nos quatro backends")
+    p.add_argument('--size', type=int, default=2000, help="n das cargas de listas")
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_stack)
+
+    p = sub.add_parser('inline', help="expansão em linha: mesma saída e economia de chamadas em -O1")
+    p.add_argument('--size', type=int, default=12, help="tamanho máximo das funções expandidas")
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_inline)
+
+    p = sub.add_parser('listas', help="construir e percorrer listas deve ser linear")
+    p.add_argument('--size', type=int, default=100000, help="maior n testado")
+    p.add_argument('--repeat', type=int, default=5)
+    p.set_defaults(func=bench_lists)
+
+    p = sub.add_parser('repl', help="custo de uma avaliação não cresce com a sessão")
+    p.add_argument('--lines', type=int, default=5000, help="linhas avaliadas na sessão")
+    p.add_argument('--batch', type=int, default=250)
+    p.set_defaults(func=bench_repl)
+
+    p = sub.add_parser('parser', help="escalabilidade do parse (listas grandes devem ser lineares)")
+    p.add_argument('--size', type=int, default=100000, help="maior n testado")
+    p.add_argument('--repeat', type=int, default=1)
+    p.set_defaults(func=bench_parser_scaling)
+
+    p = sub.add_parser('startup', help="latência de partida até o primeiro resultado")
+    p.add_argument('--repeat', type=int, default=5)
+    p.set_defaults(func=bench_startup)
+
+    args = arg_parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# bytecode.py - Formato binário do código intermediário (arquivos .lispc)
+#
+# Cada instrução (op, a1, a2, res) vira quatro inteiros de 32 bits em um
+# array: o código da operação e três operandos marcados. Os valores
+# constantes e nomes (números, 'nil', nomes de função, labels) ficam em um
+# pool sem repetições; as labels ficam em uma tabela (nome, posição).
+#
+# Layout do arquivo .lispc (little-endian):
+#   cabeçalho   MAGIC, versão, nº de instruções, nº de labels, bytes do pool
+#   código      4 x int32 por instrução
+#   labels      2 x int32 por label (índice do nome no pool, posição)
+#   pool        tupla (pool, molde do frame de nível superior) serializada com marshal
+import marshal
+import mmap
+import struct
+import sys
+from array import array
+
+from codegen import Slot, LABEL_OPS, ARGS_OPS, BRANCH_OPS, BRANCH_NOT_OPS
+from optimizer import ARITH_OPS, CMP_OPS
+
+# Extensão dos programas pré-compilados
+BYTECODE_SUFFIX = '.lispc'
+
+MAGIC = b'LSPC'
+FORMAT_VERSION = 5
+_HEADER = struct.Struct('<4sHHIII')   # 20 bytes: mantém o código alinhado em 4
+
+# Códigos das operações. A ordem faz parte do formato: novas operações
+# entram no fim. FORMAT_VERSION muda a cada operação nova, removida ou com
+# outro significado, para que um leitor antigo rejeite o arquivo em vez de
+# executá-lo errado (3: LIST; 4: superinstruções e IF_NOT_CMP_x; 5: IF_FALSE_GOTO)
+OPCODES = ('RESULT', 'ASSIGN') + ARITH_OPS + CMP_OPS + (
+    'CONS', 'CAR', 'CDR', 'IF_TRUE_GOTO', 'GOTO', 'LABEL', 'PARAM', 'CALL',
+    'TAIL_CALL', 'LOAD', 'RETURN', 'FUNC_BEGIN', 'FUNC_END', 'PARAM_DEF', 'LIST',
+    'CALL_ARGS', 'TAIL_CALL_ARGS') + BRANCH_OPS + ('IF_FALSE_GOTO',) + BRANCH_NOT_OPS
+OPCODE_IDS = {op: i for i, op in enumerate(OPCODES)}
+
+# Tipos de operando (2 bits menos significativos); o resto é o índice.
+# Os argumentos de CALL_ARGS/TAIL_CALL_ARGS são uma constante do pool: a
+# tupla com a palavra codificada de cada argumento
+NONE, CONST, SLOT, LABEL = range(4)
+
+
+# ==============================
+#     Programa codificado
+# ==============================
+
+class Program:
+    """Código intermediário codificado: array de operações, labels e pool."""
+    __slots__ = ('code', 'labels', 'pool', 'frame')
+
+    def __init__(self, code, labels, pool, frame=()):
+        self.code = code       # 4 inteiros por instrução (array ou memoryview)
+        self.labels = labels   # Pares (índice do nome no pool, posição)
+        self.pool = pool       # Tupla de constantes e nomes
+        self.frame = frame     # Molde do frame de nível superior (ver codegen.allocate_slots)
+
+    def __len__(self):
+        return len(self.code) // 4
+
+    def operand(self, word):
+        kind = word & 3
+        index = word >> 2
+        if kind == CONST:
+            return self.pool[index]
+        if kind == SLOT:
+            return Slot(index)
+        if kind == LABEL:
+            return self.pool[self.labels[2 * index]]
+        return None
+
+    def instruction(self, i):
+        """Decodifica a instrução i como tupla (op, a1, a2, res)."""
+        code = self.code
+        base = 4 * i
+        operand = self.operand
+        op = OPCODES[code[base]]
+        a2 = operand(code[base + 2])
+        if op in ARGS_OPS:
+            a2 = tuple(operand(word) for word in a2)
+        return (op, operand(code[base + 1]), a2, operand(code[base + 3]))
+
+    def decode(self):
+        """Lista de tuplas executável pelo Interpreter."""
+        return [self.instruction(i) for i in range(len(self))]
+
+    def label_positions(self):
+        """Dicionário label -> posição da instrução LABEL."""
+        pool = self.pool
+        labels = self.labels
+        return {pool[labels[i]]: labels[i + 1] for i in range(0, len(labels), 2)}
+
+    def nbytes(self):
+        """Memória ocupada pelo código e pela tabela de labels (sem o pool)."""
+        return (len(self.code) + len(self.labels)) * 4
+
+    # ==============================
+    #     Serialização
+    # ==============================
+
+    def to_bytes(self):
+        code = array('i', self.code)
+        labels = array('i', self.labels)
+        if sys.byteorder == 'big':
+            code.byteswap()
+            labels.byteswap()
+        pool = marshal.dumps((self.pool, self.frame))
+        header = _HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(self), len(labels) // 2, len(pool))
+        return header + code.tobytes() + labels.tobytes() + pool
+
+    def save(self, filename):
+        with open(filename, 'wb') as f:
+            f.write(self.to_bytes())
+
+
+# ==============================
+#     Codificação
+# ==============================
+
+def _pool_key(val):
+    # 1 e True são constantes diferentes, inclusive dentro de tuplas (moldes de frame)
+    if type(val) is tuple:
+        return (tuple, tuple(_pool_key(item) for item in val))
+    return (type(val), val)
+
+
+def encode(code, frame=()):
+    """Codifica uma lista de instruções (op, a1, a2, res) em um Program."""
+    words = array('i')
+    labels = array('i')
+    pool = []
+    pool_ids = {}     # Chave do valor (_pool_key) -> índice
+    label_ids = {}    # Nome da label -> índice na tabela
+
+    def constant(val):
+        key = _pool_key(val)
+        index = pool_ids.get(key)
+        if index is None:
+            index = pool_ids[key] = len(pool)
+            pool.append(val)
+        return index
+
+    def label(name):
+        index = label_ids.get(name)
+        if index is None:
+            index = label_ids[name] = len(labels) // 2
+            labels.extend((constant(name), -1))
+        return index
+
+    def operand(val):
+        if val is None:
+            return NONE
+        if type(val) is Slot:
+            return (int(val) << 2) | SLOT
+        return (constant(val) << 2) | CONST
+
+    for pos, (op, a1, a2, res) in enumerate(code):
+        if op in LABEL_OPS:
+            index = label(res)
+            if op == 'LABEL':
+                labels[2 * index + 1] = pos
+            res_word = (index << 2) | LABEL
+        else:
+            res_word = operand(res)
+        if op in ARGS_OPS:
+            a2 = tuple(operand(val) for val in a2)
+        words.extend((OPCODE_IDS[op], operand(a1), operand(a2), res_word))
+
+    return Program(words, labels, tuple(pool), tuple(frame))
+
+
+# ==============================
+#     Leitura
+# ==============================
+
+def from_bytes(data):
+    """Monta um Program sobre data (bytes, mmap...) sem copiar o código."""
+    magic, version, _, n_instr, n_labels, pool_size = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("não é um arquivo .lispc")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"versão {version} do formato .lispc não suportada (esperada {FORMAT_VERSION})")
+
+    view = memoryview(data)
+    start = _HEADER.size
+    code_end = start + 16 * n_instr
+    labels_end = code_end + 8 * n_labels
+    code = view[start:code_end].cast('i')
+    labels = view[code_end:labels_end].cast('i')
+    if sys.byteorder == 'big':
+        code = array('i', code)
+        labels = array('i', labels)
+        code.byteswap()
+        labels.byteswap()
+    pool, frame = marshal.loads(view[labels_end:labels_end + pool_size])
+    return Program(code, labels, pool, frame)
+
+
+def load(filename):
+    """Abre um arquivo .lispc mapeado em memória."""
+    with open(filename, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return from_bytes(data)
@@ -0,0 +1,153 @@
+# cache.py - Cache em disco do código intermediário, endereçado pelo conteúdo
+import hashlib
+import marshal
+import os
+import tempfile
+
+from codegen import COMPILER_VERSION
+
+# Diretório padrão (relativo ao diretório de trabalho), no estilo do __pycache__
+DEFAULT_CACHE_DIR = '__lispcache__'
+
+# Tamanho máximo padrão do cache em bytes
+DEFAULT_MAX_BYTES = 64 * 2**20
+
+# Extensão das entradas
+ENTRY_SUFFIX = '.lispir'
+
+
+class CompileCache:
+    """Cache de código intermediário compartilhável entre processos.
+
+    Cada entrada é indexada pelo hash do código fonte, da versão do compilador
+    e das opções de compilação. As gravações são atômicas (arquivo temporário
+    + os.replace) e o tamanho total é limitado com descarte LRU, usando o
+    mtime dos arquivos como horário do último acesso.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    # ==============================
+    #     Chaves e caminhos
+    # ==============================
+
+    def key(self, source, options=''):
+        """Chave da entrada: hash do fonte + versão do compilador + opções."""
+        h = hashlib.sha256()
+        h.update(f"{COMPILER_VERSION}|{marshal.version}|{options}|".encode('utf-8'))
+        h.update(source.encode('utf-8') if isinstance(source, str) else source)
+        return h.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    # ==============================
+    #     Leitura e gravação
+    # ==============================
+
+    def get(self, key):
+        """Retorna o código intermediário da entrada ou None se não existir."""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                code = marshal.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (EOFError, ValueError, TypeError):
+            # Entrada corrompida ou de outra versão: descarta
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        # Marca o acesso para o descarte LRU
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return code
+
+    def put(self, key, code):
+        """Grava a entrada de forma atômica e aplica o limite de tamanho."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            data = marshal.dumps(code)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self.path(key))
+            except BaseException:
+                self._remove(tmp_path)
+                raise
+        except (OSError, ValueError) as e:
+            # Falhas do cache nunca impedem a compilação
+            print(f"AVISO: não foi possível gravar no cache: {e}")
+            return
+        self.writes += 1
+        self.evict()
+
+    def evict(self):
+        """Remove as entradas menos usadas até o cache caber em max_bytes."""
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(ENTRY_SUFFIX):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue   # Removida por outro processo
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        except FileNotFoundError:
+            return
+
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                self.evictions += 1
+            total -= size
+
+    def clear(self):
+        """Remove todas as entradas do cache."""
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(ENTRY_SUFFIX):
+                        self._remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    # ==============================
+    #     Estatísticas
+    # ==============================
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,425 @@
+# cfg.py - Blocos básicos, grafo de fluxo de controle e simplificação de saltos
+#
+# O código de uma região (corpo de função ou trecho de nível superior entre
+# definições) é dividido em blocos básicos: sequências sem label no meio e
+# sem salto antes do fim. Cada bloco sabe para onde salta (jump) e para onde
+# cai se não saltar (fallthrough); o CFG guarda os blocos na ordem do código.
+#
+# simplify() usa o CFG para:
+#   - resolver saltos condicionais sobre constantes (IF_TRUE_GOTO T L)
+#   - encaminhar saltos para blocos que só têm um GOTO
+#   - remover blocos inalcançáveis
+#   - juntar blocos em linha reta (A só vai para B e B só vem de A)
+#   - na volta para código linear, inverter o salto condicional quando o
+#     destino é o próximo bloco (IF_FALSE_GOTO) e omitir GOTOs para o próximo
+#
+# Um salto condicional cujos dois caminhos dão no mesmo bloco sai do código,
+# mas a comparação que calcula a condição fica: ela pode falhar, e o erro
+# faz parte do resultado. Nas comparações fundidas com o salto (IF_CMP_x),
+# o salto só sai se a comparação não pode falhar (codegen.may_fail).
+import re
+
+from codegen import may_fail, JUMP_OPS, BRANCH_OPS, BRANCH_NOT_OPS
+
+# Saltos condicionais (os demais saltos de JUMP_OPS são incondicionais)
+COND_JUMPS = JUMP_OPS - {'GOTO'}
+
+# Saltos pela verdade de um operando (os demais comparam dois operandos)
+TRUTH_JUMPS = ('IF_TRUE_GOTO', 'IF_FALSE_GOTO')
+
+# Salto condicional invertido (mesmos operandos, condição negada)
+INVERSE = {'IF_TRUE_GOTO': 'IF_FALSE_GOTO', 'IF_FALSE_GOTO': 'IF_TRUE_GOTO'}
+INVERSE.update(zip(BRANCH_OPS, BRANCH_NOT_OPS))
+INVERSE.update(zip(BRANCH_NOT_OPS, BRANCH_OPS))
+
+# Instruções depois das quais a execução não continua na seguinte
+EXIT_OPS = frozenset(('RETURN', 'TAIL_CALL', 'TAIL_CALL_ARGS'))
+
+# Sucessor "fim da região": continua depois do último bloco
+EXIT = None
+
+# Labels criadas aqui (B1, B2...), distintas das do codegen (L1, L2...)
+_BLOCK_LABEL = re.compile(r'B(\d+)$')
+
+
+class BasicBlock:
+    """Bloco básico: entra só pelo início e sai só pelo fim."""
+    __slots__ = ('label', 'code', 'fallthrough')
+
+    def __init__(self, label, code, fallthrough=EXIT):
+        self.label = label              # Nome do bloco (label do código ou gerado)
+        self.code = code                # Instruções, sem LABEL; o salto, se houver, é a última
+        self.fallthrough = fallthrough  # Label do bloco seguinte se não saltar (EXIT: fim da região)
+
+    @property
+    def terminator(self):
+        """Última instrução, se for salto ou saída; senão None."""
+        if self.code and (self.code[-1][0] in JUMP_OPS or self.code[-1][0] in EXIT_OPS):
+            return self.code[-1]
+        return None
+
+    @property
+    def jump(self):
+        """Label de destino do salto no fim do bloco (None se não termina em salto)."""
+        last = self.terminator
+        return last[3] if last is not None and last[0] in JUMP_OPS else None
+
+    def successors(self):
+        """Labels dos blocos seguintes (EXIT = fim da região)."""
+        last = self.terminator
+        if last is None:
+            return [self.fallthrough]
+        if last[0] in EXIT_OPS:
+            return []
+        if last[0] == 'GOTO':
+            return [last[3]]
+        return [last[3], self.fallthrough]
+
+    def __repr__(self):
+        return f"<Bloco {self.label}: {len(self.code)} instruções -> {self.successors()}>"
+
+
+class CFG:
+    """Grafo de fluxo de controle de uma região: blocos na ordem do código."""
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.by_label = {block.label: block for block in blocks}
+
+    @property
+    def entry(self):
+        return self.blocks[0] if self.blocks else None
+
+    @classmethod
+    def build(cls, code, new_label):
+        """Divide code em blocos básicos; new_label() dá nomes para blocos sem label."""
+        blocks = []
+        current = None
+        for instr in code:
+            op = instr[0]
+            if op == 'LABEL':
+                # Label começa bloco novo (o anterior cai nele)
+                current = BasicBlock(instr[3], [])
+                blocks.append(current)
+                continue
+            if current is None:
+                current = BasicBlock(new_label(), [])
+                blocks.append(current)
+            current.code.append(instr)
+            if op in JUMP_OPS or op in EXIT_OPS:
+                current = None
+
+        # Cada bloco cai no seguinte na ordem do código
+        for block, following in zip(blocks, blocks[1:]):
+            block.fallthrough = following.label
+        return cls(blocks)
+
+    def predecessors(self):
+        """Dicionário label -> lista de labels dos blocos que levam a ele."""
+        preds = {block.label: [] for block in self.blocks}
+        for block in self.blocks:
+            for succ in block.successors():
+                if succ is not EXIT:
+                    preds[succ].append(block.label)
+        return preds
+
+    def reachable(self):
+        """Labels dos blocos alcançáveis a partir da entrada."""
+        if not self.blocks:
+            return set()
+        seen = {self.entry.label}
+        stack = [self.entry]
+        while stack:
+            for succ in stack.pop().successors():
+                if succ is not EXIT and succ not in seen:
+                    seen.add(succ)
+                    stack.append(self.by_label[succ])
+        return seen
+
+    def postdominators(self):
+        """Pós-dominador imediato de cada bloco alcançável (EXIT se só o fim da região).
+
+        O pós-dominador imediato de um salto condicional é onde os dois
+        caminhos se juntam. Só para grafos sem ciclos (o codegen não gera
+        laços); com ciclo, ValueError.
+        """
+        if not self.blocks:
+            return {}
+        # Pós-ordem: os sucessores de um bloco vêm antes dele
+        order = []
+        number = {EXIT: -1}
+        visiting = {self.entry.label}
+        stack = [(self.entry, iter(self.entry.successors()))]
+        while stack:
+            block, succs = stack[-1]
+            for succ in succs:
+                if succ is EXIT or succ in number:
+                    continue
+                if succ in visiting:
+                    raise ValueError(f"ciclo no fluxo de controle (bloco {succ})")
+                visiting.add(succ)
+                following = self.by_label[succ]
+                stack.append((following, iter(following.successors())))
+                break
+            else:
+                stack.pop()
+                number[block.label] = len(order)
+                order.append(block)
+
+        # Cooper, Harvey e Kennedy: sobe na árvore até os dois caminhos se encontrarem
+        ipdom = {EXIT: EXIT}
+
+        def intersect(a, b):
+            while a != b:
+                if number[a] > number[b]:
+                    a = ipdom[a]
+                else:
+                    b = ipdom[b]
+            return a
+
+        for block in order:
+            succs = block.successors() or [EXIT]
+            result = succs[0]
+            for succ in succs[1:]:
+                result = intersect(result, succ)
+            ipdom[block.label] = result
+        del ipdom[EXIT]
+        return ipdom
+
+    def remove(self, labels):
+        self.blocks = [block for block in self.blocks if block.label not in labels]
+        self.by_label = {block.label: block for block in self.blocks}
+
+    def retarget(self, old, new):
+        """Faz todo salto e fallthrough para old ir para new. Retorna se mudou algo."""
+        changed = False
+        for block in self.blocks:
+            if block.fallthrough == old:
+                block.fallthrough = new
+                changed = True
+            if block.jump == old:
+                block.code[-1] = block.code[-1][:3] + (new,)
+                changed = True
+        return changed
+
+    def to_code(self, new_label):
+        """Código linear: LABEL só onde há salto, GOTO só onde o seguinte não é o sucessor."""
+        code = []
+        exit_label = None
+
+        def target(label):
+            # EXIT vira uma label no fim da região
+            nonlocal exit_label
+            if label is EXIT:
+                exit_label = exit_label or new_label()
+                return exit_label
+            return label
+
+        blocks = self.blocks
+        for i, block in enumerate(blocks):
+            following = blocks[i + 1].label if i + 1 < len(blocks) else EXIT
+            body = list(block.code)
+            last = block.terminator
+            flow = block.fallthrough    # Para onde segue (None: não segue)
+            if last is None:
+                pass
+            elif last[0] in EXIT_OPS:
+                flow = None
+            elif last[0] == 'GOTO':
+                flow = body.pop()[3]
+            elif last[3] == flow and not may_fail(last):
+                body.pop()              # Os dois caminhos vão para o mesmo lugar
+            elif last[3] == flow:
+                # Comparação fundida que pode falhar: fica, saltando para o seguinte
+                body[-1] = last[:3] + (target(last[3]),)
+            elif last[3] == following and last[0] in INVERSE:
+                # Inverte: salta para o fallthrough e cai no destino
+                body[-1] = (INVERSE[last[0]], last[1], last[2], target(flow))
+                flow = following
+            else:
+                body[-1] = last[:3] + (target(last[3]),)
+            code.append(('LABEL', None, None, block.label))
+            code.extend(body)
+            if flow is not None and flow != following:
+                code.append(('GOTO', None, None, target(flow)))
+        if exit_label is not None:
+            code.append(('LABEL', None, None, exit_label))
+
+        # Só ficam as labels que são destino de algum salto
+        targets = {instr[3] for instr in code if instr[0] in JUMP_OPS}
+        return [instr for instr in code if instr[0] != 'LABEL' or instr[3] in targets]
+
+
+# ==============================
+#     Simplificação
+# ==============================
+
+def constant_truth(val):
+    """Verdade de um operando constante (como no interpretador); None se não é constante."""
+    if val is True or val is False:
+        return val
+    if isinstance(val, int):
+        return val != 0
+    if isinstance(val, str):
+        if val.lower() == 'nil':
+            return False
+        if val.upper() == 'T':
+            return True
+    return None
+
+
+def fold_branches(cfg, variables=()):
+    """Troca saltos condicionais sobre constantes por GOTO ou nada. Retorna quantos.
+
+    variables: nomes que são variáveis na região (um parâmetro t não é T).
+    """
+    folded = 0
+    for block in cfg.blocks:
+        last = block.terminator
+        if last is None or last[0] not in TRUTH_JUMPS or last[1] in variables:
+            continue
+        truth = constant_truth(last[1])
+        if truth is None:
+            continue
+        if last[0] == 'IF_FALSE_GOTO':
+            truth = not truth
+        if truth:
+            block.code[-1] = ('GOTO', None, None, last[3])
+        else:
+            block.code.pop()
+        folded += 1
+    return folded
+
+
+def thread_jumps(cfg):
+    """Encaminha saltos para blocos vazios ou que só têm um GOTO direto ao destino final."""
+    entry = cfg.entry
+    changed = True
+    while changed:
+        changed = False
+        for block in cfg.blocks:
+            if block is entry:
+                continue
+            if not block.code:
+                target = block.fallthrough
+            elif len(block.code) == 1 and block.code[0][0] == 'GOTO':
+                target = block.code[0][3]
+            else:
+                continue
+            if target != block.label and cfg.retarget(block.label, target):
+                changed = True
+
+
+def remove_unreachable(cfg):
+    """Remove blocos sem caminho a partir da entrada. Retorna quantos."""
+    reachable = cfg.reachable()
+    dead = {block.label for block in cfg.blocks if block.label not in reachable}
+    cfg.remove(dead)
+    return len(dead)
+
+
+def merge_blocks(cfg):
+    """Junta A e B quando A só vai para B e B só vem de A. Retorna quantas junções."""
+    preds = cfg.predecessors()
+    merged = set()
+    for block in cfg.blocks:
+        if block.label in merged:
+            continue
+        while True:
+            succs = block.successors()
+            if len(succs) != 1 or succs[0] is EXIT:
+                break
+            succ = cfg.by_label[succs[0]]
+            if succ is block or succ is cfg.entry or len(preds[succ.label]) != 1:
+                break
+            if block.terminator is not None:
+                block.code.pop()    # GOTO para succ
+            block.code.extend(succ.code)
+            block.fallthrough = succ.fallthrough
+            merged.add(succ.label)
+            # Os sucessores de succ passam a vir de block
+            for label in succ.successors():
+                if label is not EXIT:
+                    preds[label] = [block.label if p == succ.label else p for p in preds[label]]
+    cfg.remove(merged)
+    return len(merged)
+
+
+def simplify(code, new_label, variables=()):
+    """Simplifica o fluxo de controle de uma região. Retorna (código, blocos antes, blocos depois)."""
+    cfg = CFG.build(code, new_label)
+    before = len(cfg.blocks)
+    fold_branches(cfg, variables)
+    thread_jumps(cfg)
+    remove_unreachable(cfg)
+    merge_blocks(cfg)
+    return cfg.to_code(new_label), before, len(cfg.blocks)
+
+
+# ==============================
+#     Regiões
+# ==============================
+
+def regions(code):
+    """Divide o código em regiões: (nome, parâmetros, início, fim) de cada
+    corpo de função e de cada trecho de nível superior entre definições.
+
+    O corpo de uma função vai da instrução seguinte aos PARAM_DEF até o
+    FUNC_END (exclusive); no nível superior, nome é None.
+    """
+    result = []
+    start = 0
+    i = 0
+    while i < len(code):
+        op = code[i][0]
+        if op == 'FUNC_BEGIN':
+            if i > start:
+                result.append((None, (), start, i))
+            name = code[i][1]
+            body = i + 1
+            while body < len(code) and code[body][0] == 'PARAM_DEF':
+                body += 1
+            end = body
+            while end < len(code) and not (code[end][0] == 'FUNC_END' and code[end][1] == name):
+                end += 1
+            params = tuple(instr[1] for instr in code[i + 1:body])
+            result.append((name, params, body, end))
+            i = start = end + 1
+            continue
+        i += 1
+    if start < len(code):
+        result.append((None, (), start, len(code)))
+    return result
+
+
+def simplify_cfg(code, stats=None):
+    """Aplica simplify a cada região do código.
+
+    stats (dicionário) recebe, por função ('<nível superior>' para o resto),
+    os blocos e instruções removidos.
+    """
+    # Continua a numeração de uma passada anterior
+    counter = 0
+    for instr in code:
+        match = _BLOCK_LABEL.match(str(instr[3])) if instr[0] == 'LABEL' else None
+        if match:
+            counter = max(counter, int(match.group(1)))
+
+    def new_label():
+        nonlocal counter
+        counter += 1
+        return f"B{counter}"
+
+    result = []
+    pos = 0
+    for name, params, start, end in regions(code):
+        result.extend(code[pos:start])
+        new, before, after = simplify(code[start:end], new_label, params)
+        result.extend(new)
+        pos = end
+        if stats is not None:
+            key = name or '<nível superior>'
+            blocks, instrs = stats.get(key, (0, 0))
+            stats[key] = (blocks + before - after, instrs + (end - start) - len(new))
+    result.extend(code[pos:])
+    return result
@@ -0,0 +1,355 @@
+# closures.py - Compilação da AST em closures aninhadas
+#
+# Caminho rápido para avaliações curtas (REPL, call_function): a AST é
+# percorrida uma vez e cada nó vira uma closure Python que recebe o frame
+# (lista com os argumentos da função atual) e retorna o valor do nó. Os
+# parâmetros são resolvidos para índices do frame na compilação; não há
+# código intermediário, temporários, labels nem alocação de slots.
+#
+# Chamadas em posição de cauda retornam um TailCall, executado pelo laço
+# de ClosureBackend.call sem crescer a pilha do Python.
+#
+# ClosureBackend herda do Interpreter: cada forma de nível superior é
+# compilada à parte, e a que não compila (LOAD, defun fora do nível
+# superior) passa pelo código intermediário. Uma expressão que falha em
+# Python (erro de tipo, recursão mais funda que a pilha do Python) é refeita
+# sozinha no código intermediário, sem a saída parcial: o resultado (ou o
+# erro) é o mesmo do Interpreter, e as anteriores não rodam de novo.
+import contextlib
+import io
+import operator
+import sys
+
+from codegen import CodeGenerator, allocate_slots
+from interpreter import Interpreter, ARITHMETIC, COMPARISONS, runtime_value, _false
+from nodes import NUM, DEFUN, IF, COND, CALL
+from optimizer import optimize, INLINE_SIZE
+from runtime import Pair, from_list
+
+NUMBERS = (int, float)
+
+
+class Unsupported(Exception):
+    """Nó que não vira closure: a unidade passa pelo código intermediário."""
+
+
+class TailCall:
+    """Chamada em posição de cauda, feita pelo laço de chamada depois do retorno."""
+    __slots__ = ('name', 'args')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+
+class Function:
+    """Função compilada: corpo recebe o frame (argumentos) e retorna o valor ou um TailCall."""
+    __slots__ = ('name', 'arity', 'body', 'node')
+
+    def __init__(self, name, arity, body, node):
+        self.name = name
+        self.arity = arity
+        self.body = body
+        self.node = node    # Defun de origem (para registrar no Interpreter)
+
+
+# ==============================
+#     Compilação
+# ==============================
+
+class ClosureCompiler:
+    """Compila os nós da AST em closures frame -> valor."""
+
+    def __init__(self, call):
+        self.call = call    # call(nome, argumentos): chamada de função em tempo de execução
+        self.scope = {}     # Parâmetro -> índice no frame da função atual
+
+    def compile(self, node):
+        """Compila uma forma de nível superior: Function (defun) ou closure da expressão."""
+        if node.kind == DEFUN:
+            self.scope = {p: i for i, p in enumerate(node.params)}
+            return Function(node.name, len(node.params), self.tail(node.body), node)
+        self.scope = {}
+        return self.expression(node)
+
+    # Despacho pela tag do nó (como CodeGenerator.gen_expression)
+    def expression(self, node):
+        return self.COMPILERS[node.kind](self, node)
+
+    # -------- Posição de cauda --------
+    def tail(self, node):
+        """Closure de um nó em posição de cauda: chamadas viram TailCall."""
+        kind = node.kind
+        if kind == IF:
+            cond, then, else_ = self.expression(node.cond), self.tail(node.then), self.tail(node.else_)
+            return lambda frame: then(frame) if cond(frame) else else_(frame)
+        if kind == COND:
+            return self.cond(node, self.tail)
+        if kind == CALL:
+            name = node.name
+            args = [self.expression(a) for a in node.args]
+            return lambda frame: TailCall(name, [arg(frame) for arg in args])
+        return self.expression(node)
+
+    # -------- Literais e variáveis --------
+    def comp_num(self, node):
+        value = node.value
+        return lambda frame: value
+
+    def comp_symbol(self, node):
+        index = self.scope.get(node.name)
+        if index is None:
+            # Fora dos parâmetros, o símbolo vale como constante (nil, T ou o nome)
+            value = runtime_value(node.name)
+            return lambda frame: value
+        return operator.itemgetter(index)
+
+    def comp_nil(self, node):
+        return lambda frame: []
+
+    def comp_true(self, node):
+        return lambda frame: True
+
+    # -------- Aritmética e comparações --------
+    def comp_arith(self, node):
+        func = ARITHMETIC.get(node.op)
+        if func is None:
+            raise Unsupported(f"operação {node.op}")
+        left = self.expression(node.left)
+        if node.right.kind == NUM:
+            # Operando constante (n - 1): só o outro é avaliado e conferido
+            right = node.right.value
+
+            def arith_const(frame):
+                value = left(frame)
+                if not isinstance(value, NUMBERS):
+                    value = 0
+                return func(value, right)
+            return arith_const
+        right = self.expression(node.right)
+
+        def arith(frame):
+            a = left(frame)
+            b = right(frame)
+            # Como no Interpreter: o que não é número vale 0
+            if not isinstance(a, NUMBERS):
+                a = 0
+            if not isinstance(b, NUMBERS):
+                b = 0
+            return func(a, b)
+        return arith
+
+    def comp_compare(self, node):
+        func = COMPARISONS.get('CMP_' + node.op, _false)
+        left = self.expression(node.left)
+        if node.right.kind == NUM:
+            right = node.right.value
+            return lambda frame: func(left(frame), right)
+        right = self.expression(node.right)
+        return lambda frame: func(left(frame), right(frame))
+
+    # -------- Listas --------
+    def comp_cons(self, node):
+        car, cdr = self.expression(node.car), self.expression(node.cdr)
+        return lambda frame: Pair(car(frame), cdr(frame))
+
+    def comp_list(self, node):
+        items = [self.expression(item) for item in node.items]
+        if not items:
+            return lambda frame: []
+        return lambda frame: from_list([item(frame) for item in items])
+
+    def comp_car(self, node):
+        expr = self.expression(node.expr)
+
+        def car(frame):
+            val = expr(frame)
+            return val.car if type(val) is Pair else []
+        return car
+
+    def comp_cdr(self, node):
+        expr = self.expression(node.expr)
+
+        def cdr(frame):
+            val = expr(frame)
+            return val.cdr if type(val) is Pair else []
+        return cdr
+
+    # -------- Controle --------
+    def comp_if(self, node):
+        cond, then, else_ = self.expression(node.cond), self.expression(node.then), self.expression(node.else_)
+        return lambda frame: then(frame) if cond(frame) else else_(frame)
+
+    def comp_cond(self, node):
+        return self.cond(node, self.expression)
+
+    def cond(self, node, compile_body):
+        clauses = [(self.expression(test), compile_body(body)) for test, body in node.clauses]
+
+        def cond(frame):
+            for test, body in clauses:
+                if test(frame):
+                    return body(frame)
+            return []   # Nenhuma cláusula verdadeira: nil
+        return cond
+
+    # -------- Chamadas --------
+    def comp_call(self, node):
+        name = node.name
+        call = self.call
+        args = [self.expression(a) for a in node.args]
+        if len(args) == 1:
+            arg, = args
+            return lambda frame: call(name, [arg(frame)])
+        return lambda frame: call(name, [arg(frame) for arg in args])
+
+    # -------- Não compilados --------
+    def unsupported(self, node):
+        raise Unsupported(f"nó {type(node).__name__}")
+
+    # Tabela de despacho indexada pela tag do nó (ordem de nodes.KIND_NAMES)
+    COMPILERS = (
+        comp_num,       # NUM
+        comp_symbol,    # SYMBOL
+        comp_nil,       # NIL
+        comp_true,      # TRUE
+        unsupported,    # DEFUN (só no nível superior)
+        comp_if,        # IF
+        comp_arith,     # ARITH
+        comp_compare,   # COMPARE
+        comp_cons,      # CONS
+        comp_list,      # LIST
+        comp_car,       # CAR
+        comp_cdr,       # CDR
+        comp_cond,      # COND
+        comp_call,      # CALL
+        unsupported,    # LOAD
+    )
+
+
+# ==============================
+#     Execução
+# ==============================
+
+class ClosureBackend(Interpreter):
+    """Interpreter que executa a AST compilada em closures quando possível."""
+
+    def __init__(self, cache=None, opt_level=0, inline_size=INLINE_SIZE):
+        super().__init__(cache, opt_level, inline_size)
+        self.closures = {}    # Funções compiladas em closures: nome -> Function
+        self.pending = {}     # Funções das closures ainda não registradas no Interpreter: nome -> Defun
+        self.syncing = False  # Registrando as funções de pending (não substituem as closures)
+        self.compiler = ClosureCompiler(self.call)
+        self.closure_stats = {'closure': 0, 'interpreted': 0, 'fallbacks': 0}
+
+    def execute_ast(self, ast):
+        """Executa a AST em closures, forma por forma; o que não compila ou falha
+        passa pelo código intermediário."""
+        expressions = []
+        for node in ast:
+            try:
+                compiled = self.compiler.compile(node)
+            except Unsupported:
+                compiled = None
+                self.closure_stats['interpreted'] += 1
+            if node.kind != DEFUN:
+                expressions.append((node, compiled))
+                continue
+            # Como em register_functions: as funções da unidade valem desde o
+            # início; a que não compila fica só no Interpreter
+            self.pending[node.name] = node
+            if compiled is None:
+                self.closures.pop(node.name, None)
+            else:
+                self.closures[node.name] = compiled
+
+        self.last_result = None
+        frame = []
+        for node, expr in expressions:
+            if expr is not None:
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()) as out:
+                        result = expr(frame)
+                        print(f"=> {self.format_result(result)}")
+                except Exception:
+                    # Inclusive RecursionError: o Interpreter não usa a pilha do Python
+                    self.closure_stats['fallbacks'] += 1
+                else:
+                    sys.stdout.write(out.getvalue())
+                    self.last_result = result
+                    self.closure_stats['closure'] += 1
+                    continue
+            self.execute(self.generate([node]))
+            if self.error is not None:
+                break   # Como no Interpreter: o erro encerra a unidade
+        return self.last_result
+
+    def generate(self, ast):
+        """Código intermediário da AST (caminho do Interpreter)."""
+        code, _ = optimize(CodeGenerator().generate(ast), self.opt_level, self.inline_size)
+        return code
+
+    def call(self, name, args):
+        """Chama uma função: laço das closures (com as chamadas de cauda) ou o Interpreter."""
+        closures = self.closures
+        while True:
+            func = closures.get(name)
+            if func is None:
+                return self.call_interpreted(name, args)
+            arity = func.arity
+            if len(args) != arity:
+                # Argumentos faltando valem nil; os que sobram são ignorados
+                args = (args + [[]] * arity)[:arity]
+            result = func.body(args)
+            if type(result) is not TailCall:
+                return result
+            name, args = result.name, result.args
+
+    def call_interpreted(self, name, args):
+        """Função que não está nas closures: a versão do Interpreter ou erro."""
+        if name not in self.functions and name not in self.pending:
+            print(f"ERRO: Função '{name}' não definida")
+            return []
+        self.sync_functions()
+        return Interpreter.call_function(self, name, args)
+
+    def call_function(self, func_name, args):
+        """Chama uma função diretamente: pelas closures, se ela foi compilada assim."""
+        if func_name not in self.closures:
+            return super().call_function(func_name, args)
+        args = [runtime_value(arg) for arg in args]
+        try:
+            return self.call(func_name, args)
+        except RecursionError:
+            self.sync_functions()
+            return super().call_function(func_name, args)
+
+    # -------- Registro no Interpreter --------
+
+    def execute_allocated(self, code, template):
+        """Antes de executar código intermediário, registra as funções das closures."""
+        self.sync_functions()
+        return super().execute_allocated(code, template)
+
+    def sync_functions(self):
+        """Registra no Interpreter as funções definidas só em closures."""
+        if not self.pending:
+            return
+        nodes = list(self.pending.values())
+        self.pending = {}
+        code, _ = allocate_slots(CodeGenerator().generate(nodes))
+        self.syncing = True
+        try:
+            self.add_segment(code)
+        finally:
+            self.syncing = False
+
+    def register_functions(self, segment):
+        """Funções definidas no código intermediário substituem as das closures."""
+        super().register_functions(segment)
+        if self.syncing:
+            return
+        for instr in segment.code:
+            if instr[0] == 'FUNC_BEGIN':
+                self.closures.pop(instr[1], None)
+                self.pending.pop(instr[1], None)
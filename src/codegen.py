@@ -1,3 +1,57 @@
+import re
+from heapq import heappush, heappop
+from nodes import DEFUN, IF, COND, CALL
+
+# Versão do código intermediário gerado. Deve mudar sempre que o codegen (ou
+# um passo posterior) passar a gerar código diferente: invalida o cache em disco.
+COMPILER_VERSION = '11'
+
+# Temporários gerados pelo CodeGenerator (%t1, %t2, ...). O % não aparece
+# em nenhum ID do lexer: um símbolo como t9 continua sendo constante
+_TEMP = re.compile(r'%t\d+$')
+
+# Operações aritméticas e de comparação (instrução: (op, a1, a2, res))
+ARITH_OPS = ('+', '-', '*', '/', 'floor', 'mod', 'expt')
+CMP_OPS = ('CMP_eq', 'CMP_eql', 'CMP_equal', 'CMP_equalp', 'CMP_=', 'CMP_/=',
+           'CMP_>', 'CMP_>=', 'CMP_<', 'CMP_<=')
+
+# Superinstruções (ver fuse): comparação com salto e chamadas com os argumentos
+BRANCH_OPS = tuple('IF_' + op for op in CMP_OPS)   # (IF_CMP_x, a, b, label): salta se verdadeira
+BRANCH_NOT_OPS = tuple('IF_NOT_' + op for op in CMP_OPS)   # (IF_NOT_CMP_x, a, b, label): salta se falsa
+ARGS_OPS = frozenset(('CALL_ARGS', 'TAIL_CALL_ARGS'))   # (op, nome, (args...), res)
+
+# Instruções cujo campo a1 é um nome (função ou arquivo) ou vazio, não um operando
+# (em CALL, TAIL_CALL e LIST o a2 é o número de argumentos empilhados por PARAM)
+NAME_OPS = frozenset(('CALL', 'TAIL_CALL', 'FUNC_BEGIN', 'FUNC_END', 'PARAM_DEF', 'LOAD', 'LIST')) | ARGS_OPS
+
+# Instruções de salto (campo res é a label de destino) e as que têm label no res
+JUMP_OPS = frozenset(('GOTO', 'IF_TRUE_GOTO', 'IF_FALSE_GOTO') + BRANCH_OPS + BRANCH_NOT_OPS)
+LABEL_OPS = JUMP_OPS | {'LABEL'}
+
+
+# Aritmética e comparações (inclusive fundidas com o salto) podem falhar em
+# tempo de execução: (< nil 0) é TypeError, (expt 0 -1) é ZeroDivisionError
+FALLIBLE_OPS = frozenset(ARITH_OPS + CMP_OPS + BRANCH_OPS + BRANCH_NOT_OPS)
+
+
+def is_temp(val):
+    return isinstance(val, str) and _TEMP.match(val) is not None
+
+
+def is_int(val):
+    return isinstance(val, int) and not isinstance(val, bool)
+
+
+def may_fail(instr):
+    """Se a instrução pode lançar erro em tempo de execução (e não pode sumir do código)."""
+    op, a1, a2, _ = instr
+    if op not in FALLIBLE_OPS:
+        return False
+    if not (is_int(a1) and is_int(a2)):
+        return True
+    return op == 'expt' and a2 < 0
+
+
 class CodeGenerator:
     def __init__(self):
         self.code = []		# Array para guardar o código inntermediário (CI)
@@ -11,7 +65,7 @@ class CodeGenerator:
     # Gerador de variáveis temporárias
     def new_temp(self):
         self.temp_count += 1
-        return f"t{self.temp_count}"
+        return f"%t{self.temp_count}"
     
     # Gerador de labels
     def new_label(self):
@@ -38,7 +92,7 @@ class CodeGenerator:
             # Iteração pela AST
             for node in ast:
                 # Tratamento para função
-                if node[0] == 'defun':
+                if node.kind == DEFUN:
                     self.gen_function(node)
                 # Tratamento para expressão solta
                 else:
@@ -58,7 +112,7 @@ class CodeGenerator:
     
     def gen_function(self, func_node):
 	# Separação dos campos da declaração de função
-        _, name, params, body = func_node
+        name, params, body = func_node.name, func_node.params, func_node.body
 
 	# Insere no array do CI o começo da função
         self.insert("FUNC_BEGIN", name, None, None)
@@ -67,132 +121,35 @@ class CodeGenerator:
         for p in params:
             self.insert("PARAM_DEF", p, None, None)
 
-	# Geração para o corpo da função
-        result = self.gen_expression(body)
+	# Geração para o corpo da função (em posição de cauda)
+        self.gen_tail(body)
 
-        # Tratamento para guardar o resultado em temporário para RETURN
-        if not (isinstance(result, str) and result.startswith("t")):
-            tmp = self.new_temp()
-            self.insert("ASSIGN", result, None, tmp)
-            result = tmp
-
-        self.insert("RETURN", result, None, None)
         self.insert("FUNC_END", name, None, None)
 
     # ==============================
-    #         Expressões
+    #       Posição de cauda
     # ==============================
     
-    def gen_expression(self, expr):
-        # -------- Literais e IDs --------
-        if isinstance(expr, (int, str)):
-            return expr
-
-        # Operador da expressão (cdr, if, +, ...)
-        op = expr[0]
-
-        # -------- Aritmética --------
-        if op in ['+', '-', '*', '/', 'floor', 'mod', 'expt']:
-            left = self.gen_expression(expr[1])		# Primeiro operando
-            right = self.gen_expression(expr[2])	# Segundo operando
-            tmp = self.new_temp()			# Variável temporária para o resultado
-            self.insert(op, left, right, tmp)		# Inserção no array do CI
-            return tmp
-
-        # -------- Comparações --------
-        if op in ['eq', 'eql', 'equal', 'equalp', 'num_eq', 'num_neq', '>', '>=', '<', '<=']:
-            left = self.gen_expression(expr[1])		
-            right = self.gen_expression(expr[2])	
-            tmp = self.new_temp()
-            self.insert("CMP_" + op, left, right, tmp)
-            return tmp
-
-	# -------- CONS, CAR, CDR --------
-        if op == 'cons':
-            a = self.gen_expression(expr[1])
-            b = self.gen_expression(expr[2])
-            tmp = self.new_temp()
-            self.insert("CONS", a, b, tmp)
-            return tmp
-        
-        if op == 'list':
-            # (list 1 2 3) -> cria lista [1, 2, 3]
-            args = expr[1]  # Lista de argumentos
-            if not args:  # (list) -> lista vazia
-                return 'nil'
-            
-            # Constrói lista recursivamente: (list a b c) -> (cons a (cons b (cons c nil)))
-            result = 'nil'
-            for arg in reversed(args):  # Processa de trás para frente
-                arg_val = self.gen_expression(arg)
-                tmp = self.new_temp()
-                self.insert("CONS", arg_val, result, tmp)
-                result = tmp
-            return result
-
-        if op == 'car':
-            val = self.gen_expression(expr[1])
-            tmp = self.new_temp()
-            self.insert("CAR", val, None, tmp)
-            return tmp
-
-        if op == 'cdr':
-            val = self.gen_expression(expr[1])
-            tmp = self.new_temp()
-            self.insert("CDR", val, None, tmp)
-            return tmp
-
-        # -------- IF --------
-        if op == 'if':
-            cond_expr = expr[1]	# Condição
-            then_expr = expr[2]	# Caso seja verdadeira 
-            else_expr = expr[3]	# Caso seja falsa
+    # Gera código que retorna o valor de expr da função atual. Chamadas em
+    # posição de cauda (inclusive nos ramos de if e cond) viram TAIL_CALL,
+    # que reaproveita o frame atual em vez de empilhar um novo.
+    def gen_tail(self, expr):
+        kind = expr.kind
 
-            cond_tmp = self.gen_expression(cond_expr)	# t1 Guarda a variavel temporaria do teste de condição (t?)
+        # -------- IF: os dois ramos estão em posição de cauda --------
+        if kind == IF:
+            cond_tmp = self.gen_expression(expr.cond)
+            label_then = self.new_label()
 
-            label_then = self.new_label() # Label para true
-            label_else = self.new_label() # Label para false
-            label_end  = self.new_label() # Label para o fim do bloco IF
-
-            result_temp = self.new_temp() # t2 Temporário para guardar o retorno do bloco IF
-
-	    # if t? -> l?
             self.insert("IF_TRUE_GOTO", cond_tmp, None, label_then)
-
-            # else
-            else_val = self.gen_expression(else_expr)
-	    # Caso ELSE seja literal ou ID
-            if not (isinstance(else_val, str) and else_val.startswith("t")):
-                tmp = self.new_temp() #t3
-                self.insert("ASSIGN", else_val, None, tmp)
-		# Atribui a variavel aleatoria para o ELSE
-                else_val = tmp
-	    # Codigo de atribuiçao de ELSE para a variavel de retorno do bloco
-            self.insert("ASSIGN", else_val, None, result_temp)
-	    # Desvio para o label do fim do  bloco
-            self.insert("GOTO", None, None, label_end)
-
-            # then
+            self.gen_tail(expr.else_)
             self.insert("LABEL", None, None, label_then)
-            then_val = self.gen_expression(then_expr)
-            if not (isinstance(then_val, str) and then_val.startswith("t")):
-                tmp = self.new_temp()
-                self.insert("ASSIGN", then_val, None, tmp)
-                then_val = tmp
-            self.insert("ASSIGN", then_val, None, result_temp)
-
-            # end
-            self.insert("LABEL", None, None, label_end)
-            return result_temp
-
-        # -------- COND --------
-        if op == 'cond':
-            clauses = expr[1]		   # Lista de clausulas
-            end_label = self.new_label()   # Label para o fim
-            result_temp = self.new_temp()  # Temporario para o bloco
-
-	    # Iteraçao pelas clausulas
-            for cond_expr, body_expr in clauses:
+            self.gen_tail(expr.then)
+            return
+
+        # -------- COND: o corpo de cada cláusula está em posição de cauda --------
+        if kind == COND:
+            for cond_expr, body_expr in expr.clauses:
                 label_clause = self.new_label()
                 label_next   = self.new_label()
 
@@ -200,45 +157,480 @@ class CodeGenerator:
                 self.insert("IF_TRUE_GOTO", cond_tmp, None, label_clause)
                 self.insert("GOTO", None, None, label_next)
 
-                
                 self.insert("LABEL", None, None, label_clause)
-                body_tmp = self.gen_expression(body_expr)
-                if not (isinstance(body_tmp, str) and body_tmp.startswith("t")):
-                    tmp = self.new_temp()
-                    self.insert("ASSIGN", body_tmp, None, tmp)
-                    body_tmp = tmp
-
-                self.insert("ASSIGN", body_tmp, None, result_temp)
-                self.insert("GOTO", None, None, end_label)
+                self.gen_tail(body_expr)
 
-                # next clause
                 self.insert("LABEL", None, None, label_next)
 
-            self.insert("LABEL", None, None, end_label)
-            return result_temp
+            # Nenhuma cláusula verdadeira: retorna nil
+            self.insert("RETURN", 'nil', None, None)
+            return
 
+        # -------- Chamada de função em posição de cauda --------
+        if kind == CALL:
+            self.gen_params(expr.args)
 
-        # -------- LOAD --------
-        if op == 'load':
-            filename = expr[1]  # Nome do arquivo
-            tmp = self.new_temp()
-            self.insert("LOAD", filename, None, tmp)
-            return tmp
+            self.insert("TAIL_CALL", expr.name, len(expr.args), None)
+            return
 
-        # -------- Chamada de função --------
-        # Verifica se é uma tupla com 2 elementos onde o segundo é uma lista
-        if len(expr) == 2 and isinstance(op, str) and isinstance(expr[1], list):
-            func_name = op
-            args = expr[1]
+        # -------- Demais expressões: calcula e retorna --------
+        result = self.gen_expression(expr)
 
-            for a in args:
-                val = self.gen_expression(a)
-                self.insert("PARAM", val, None, None)
+        # Tratamento para guardar o resultado em temporário para RETURN
+        if not is_temp(result):
+            tmp = self.new_temp()
+            self.insert("ASSIGN", result, None, tmp)
+            result = tmp
 
+        self.insert("RETURN", result, None, None)
+
+    # ==============================
+    #         Expressões
+    # ==============================
+    
+    # Despacho pela tag do nó: uma indexação na tabela GENERATORS
+    def gen_expression(self, expr):
+        return self.GENERATORS[expr.kind](self, expr)
+
+    # -------- Literais e IDs --------
+    def gen_num(self, expr):
+        return expr.value
+
+    def gen_symbol(self, expr):
+        return expr.name
+
+    def gen_nil(self, expr):
+        return 'nil'
+
+    def gen_true(self, expr):
+        return 'T'
+
+    # -------- Aritmética --------
+    def gen_arith(self, expr):
+        left = self.gen_expression(expr.left)		# Primeiro operando
+        right = self.gen_expression(expr.right)	# Segundo operando
+        tmp = self.new_temp()			# Variável temporária para o resultado
+        self.insert(expr.op, left, right, tmp)		# Inserção no array do CI
+        return tmp
+
+    # -------- Comparações --------
+    def gen_compare(self, expr):
+        left = self.gen_expression(expr.left)		
+        right = self.gen_expression(expr.right)	
+        tmp = self.new_temp()
+        self.insert("CMP_" + expr.op, left, right, tmp)
+        return tmp
+
+    # -------- CONS, CAR, CDR --------
+    def gen_cons(self, expr):
+        a = self.gen_expression(expr.car)
+        b = self.gen_expression(expr.cdr)
+        tmp = self.new_temp()
+        self.insert("CONS", a, b, tmp)
+        return tmp
+        
+    def gen_list(self, expr):
+        # (list 1 2 3) -> PARAM de cada elemento e uma única instrução LIST
+        args = expr.items  # Lista de argumentos
+        if not args:  # (list) -> lista vazia
+            return 'nil'
+        
+        self.gen_params(args)
+        
+        tmp = self.new_temp()
+        self.insert("LIST", None, len(args), tmp)
+        return tmp
+
+    def gen_car(self, expr):
+        val = self.gen_expression(expr.expr)
+        tmp = self.new_temp()
+        self.insert("CAR", val, None, tmp)
+        return tmp
+
+    def gen_cdr(self, expr):
+        val = self.gen_expression(expr.expr)
+        tmp = self.new_temp()
+        self.insert("CDR", val, None, tmp)
+        return tmp
+
+    # -------- IF --------
+    def gen_if(self, expr):
+        cond_expr = expr.cond	# Condição
+        then_expr = expr.then	# Caso seja verdadeira 
+        else_expr = expr.else_	# Caso seja falsa
+
+        cond_tmp = self.gen_expression(cond_expr)	# t1 Guarda a variavel temporaria do teste de condição (t?)
+
+        label_then = self.new_label() # Label para true
+        label_else = self.new_label() # Label para false
+        label_end  = self.new_label() # Label para o fim do bloco IF
+
+        result_temp = self.new_temp() # t2 Temporário para guardar o retorno do bloco IF
+
+        # if t? -> l?
+        self.insert("IF_TRUE_GOTO", cond_tmp, None, label_then)
+
+        # else
+        else_val = self.gen_expression(else_expr)
+        # Caso ELSE seja literal ou ID
+        if not is_temp(else_val):
+            tmp = self.new_temp() #t3
+            self.insert("ASSIGN", else_val, None, tmp)
+            # Atribui a variavel aleatoria para o ELSE
+            else_val = tmp
+        # Codigo de atribuiçao de ELSE para a variavel de retorno do bloco
+        self.insert("ASSIGN", else_val, None, result_temp)
+        # Desvio para o label do fim do  bloco
+        self.insert("GOTO", None, None, label_end)
+
+        # then
+        self.insert("LABEL", None, None, label_then)
+        then_val = self.gen_expression(then_expr)
+        if not is_temp(then_val):
             tmp = self.new_temp()
-            self.insert("CALL", func_name, len(args), tmp)
-            return tmp
+            self.insert("ASSIGN", then_val, None, tmp)
+            then_val = tmp
+        self.insert("ASSIGN", then_val, None, result_temp)
+
+        # end
+        self.insert("LABEL", None, None, label_end)
+        return result_temp
+
+    # -------- COND --------
+    def gen_cond(self, expr):
+        clauses = expr.clauses		   # Lista de clausulas
+        end_label = self.new_label()   # Label para o fim
+        result_temp = self.new_temp()  # Temporario para o bloco
+
+        # Iteraçao pelas clausulas
+        for cond_expr, body_expr in clauses:
+            label_clause = self.new_label()
+            label_next   = self.new_label()
 
+            cond_tmp = self.gen_expression(cond_expr)
+            self.insert("IF_TRUE_GOTO", cond_tmp, None, label_clause)
+            self.insert("GOTO", None, None, label_next)
 
-        # ERRO
-        raise NotImplementedError(f"Operação não reconhecida na geração de código intermediário: {expr}")
\ No newline at end of file
+            
+            self.insert("LABEL", None, None, label_clause)
+            body_tmp = self.gen_expression(body_expr)
+            if not is_temp(body_tmp):
+                tmp = self.new_temp()
+                self.insert("ASSIGN", body_tmp, None, tmp)
+                body_tmp = tmp
+
+            self.insert("ASSIGN", body_tmp, None, result_temp)
+            self.insert("GOTO", None, None, end_label)
+
+            # next clause
+            self.insert("LABEL", None, None, label_next)
+
+        # Nenhuma cláusula verdadeira: o bloco vale nil
+        self.insert("ASSIGN", 'nil', None, result_temp)
+        self.insert("LABEL", None, None, end_label)
+        return result_temp
+
+    # -------- LOAD --------
+    def gen_load(self, expr):
+        filename = expr.filename  # Nome do arquivo
+        tmp = self.new_temp()
+        self.insert("LOAD", filename, None, tmp)
+        return tmp
+
+    # -------- Chamada de função --------
+    def gen_params(self, args):
+        # Avalia todos os argumentos antes de empilhar: os PARAM ficam juntos,
+        # logo antes do CALL (e viram uma superinstrução, ver fuse)
+        values = [self.gen_expression(a) for a in args]
+        for val in values:
+            self.insert("PARAM", val, None, None)
+
+    def gen_call(self, expr):
+        func_name = expr.name
+        args = expr.args
+
+        self.gen_params(args)
+
+        tmp = self.new_temp()
+        self.insert("CALL", func_name, len(args), tmp)
+        return tmp
+
+    # -------- DEFUN fora do nível superior --------
+    def gen_defun(self, expr):
+        raise NotImplementedError(f"Definição de função só é permitida no nível superior: {expr.name}")
+
+    # Tabela de despacho indexada pela tag do nó (ordem de nodes.KIND_NAMES)
+    GENERATORS = (
+        gen_num,       # NUM
+        gen_symbol,    # SYMBOL
+        gen_nil,       # NIL
+        gen_true,      # TRUE
+        gen_defun,     # DEFUN
+        gen_if,        # IF
+        gen_arith,     # ARITH
+        gen_compare,   # COMPARE
+        gen_cons,      # CONS
+        gen_list,      # LIST
+        gen_car,       # CAR
+        gen_cdr,       # CDR
+        gen_cond,      # COND
+        gen_call,      # CALL
+        gen_load,      # LOAD
+    )
+
+
+# ==============================
+#     Superinstruções
+# ==============================
+#
+# Sequências comuns do codegen viram uma instrução só (menos despachos):
+#   CMP_x t a b ; IF_TRUE_GOTO t L     ->  IF_CMP_x a b L
+#       (se t não é lido em nenhum outro lugar)
+#   CMP_x t a b ; IF_FALSE_GOTO t L    ->  IF_NOT_CMP_x a b L
+#       (os saltos invertidos do cfg.simplify_cfg; a comparação continua a
+#       mesma, então um erro nela é o mesmo do código sem fusão)
+#   PARAM a ; PARAM b ; CALL f 2 r     ->  CALL_ARGS f (a, b) r
+#   PARAM a ; TAIL_CALL f 1            ->  TAIL_CALL_ARGS f (a,)
+
+def fuse(code):
+    """Funde comparação+salto e PARAM+chamada em superinstruções."""
+    reads = {}
+    for instr in code:
+        for val in _read_fields(instr):
+            if is_temp(val):
+                reads[val] = reads.get(val, 0) + 1
+
+    result = []
+    for instr in code:
+        op, a1, a2, res = instr
+        prev = result[-1] if result else None
+        if (op == 'IF_TRUE_GOTO' and prev is not None and prev[0] in CMP_OPS
+                and prev[3] == a1 and reads.get(a1) == 1):
+            result[-1] = ('IF_' + prev[0], prev[1], prev[2], res)
+            continue
+        if (op == 'IF_FALSE_GOTO' and prev is not None and prev[0] in CMP_OPS
+                and prev[3] == a1 and reads.get(a1) == 1):
+            result[-1] = ('IF_NOT_' + prev[0], prev[1], prev[2], res)
+            continue
+        if (op == 'CALL' or op == 'TAIL_CALL') and a2:
+            params = result[len(result) - a2:]
+            if len(params) == a2 and all(p[0] == 'PARAM' for p in params):
+                del result[len(result) - a2:]
+                instr = (op + '_ARGS', a1, tuple(p[1] for p in params), res)
+        result.append(instr)
+    return result
+
+
+# Campos lidos pela instrução (antes da alocação)
+def _read_fields(instr):
+    op, a1, a2, res = instr
+    if type(a2) is tuple:
+        return a2
+    if op in NAME_OPS:
+        return ()
+    return (a1, a2)
+
+
+# ==============================
+#     Alocação de slots
+# ==============================
+#
+# Depois da otimização, cada operando vira um índice de slot (Slot) no frame
+# da função (ou do nível superior). O frame tem três partes:
+#   parâmetros    slots 0..n-1, na ordem de declaração
+#   temporários   reaproveitados quando mortos (intervalos de vida)
+#   constantes    literais, nil, T e símbolos livres, um slot por valor
+# O molde do frame (tupla com as constantes nos seus slots e None nos
+# demais) vai no campo a2 do FUNC_BEGIN; o do nível superior é retornado.
+
+class Slot(int):
+    """Índice de um operando (parâmetro, temporário ou constante) no frame."""
+    __slots__ = ()
+
+    def __repr__(self):
+        return f"%{int(self)}"
+
+    __str__ = __repr__
+
+
+# Campos da instrução que podem conter parâmetros e temporários
+def _variable_fields(instr):
+    op, a1, a2, res = instr
+    fields = list(a2) if op in ARGS_OPS else [a2]
+    if op not in NAME_OPS:
+        fields.append(a1)
+    if op not in LABEL_OPS:
+        fields.append(res)
+    return fields
+
+
+def _rewrite(instr, slots, constant):
+    op, a1, a2, res = instr
+    if op in ARGS_OPS:
+        a2 = tuple(slots[val] if val in slots else constant(val) for val in a2)
+    elif op not in NAME_OPS:
+        if a1 is not None:
+            a1 = slots[a1] if a1 in slots else constant(a1)
+        if a2 is not None:
+            a2 = slots[a2] if a2 in slots else constant(a2)
+    if op not in LABEL_OPS and isinstance(res, str):
+        res = slots.get(res, res)
+    return (op, a1, a2, res)
+
+
+def _allocate_region(code, indices, result):
+    """Aloca os slots de uma região (uma função ou o nível superior).
+
+    Retorna o molde do frame da região.
+    """
+    # Parâmetros ocupam os primeiros slots, na ordem de declaração
+    params = [code[i][1] for i in indices if code[i][0] == 'PARAM_DEF']
+    slots = {p: Slot(k) for k, p in enumerate(params)}
+    size = len(params)
+
+    # Intervalo de vida de cada temporário: primeira e última ocorrência
+    first = {}
+    last = {}
+    labels = {}
+    for pos, i in enumerate(indices):
+        instr = code[i]
+        if instr[0] == 'LABEL':
+            labels[instr[3]] = pos
+        for val in _variable_fields(instr):
+            if is_temp(val) and val not in slots:
+                first.setdefault(val, pos)
+                last[val] = pos
+
+    # O codegen só gera saltos para frente, então um temporário está vivo
+    # exatamente entre a primeira e a última ocorrência. Com saltos para trás
+    # isso não vale: cada temporário fica com um slot próprio.
+    reuse = not any(code[i][0] in LABEL_OPS and labels.get(code[i][3], pos) < pos
+                    for pos, i in enumerate(indices))
+
+    free = []   # Slots livres (heap: reaproveita sempre o menor)
+    for pos, i in enumerate(indices):
+        names = [v for v in dict.fromkeys(_variable_fields(code[i])) if v in first]
+
+        # Operandos lidos pela última vez liberam o slot antes da escrita do resultado
+        if reuse:
+            for name in names:
+                if last[name] == pos and first[name] < pos:
+                    heappush(free, slots[name])
+
+        dead = []
+        for name in names:
+            if first[name] == pos:
+                if free:
+                    slot = heappop(free)
+                else:
+                    slot = Slot(size)
+                    size += 1
+                slots[name] = slot
+                if reuse and last[name] == pos:
+                    dead.append(slot)   # Resultado nunca lido
+        for slot in dead:
+            heappush(free, slot)
+
+    # Constantes: depois de parâmetros e temporários (1 e True são distintos)
+    constants = {}
+    values = []
+
+    def constant(val):
+        key = (type(val), val)
+        slot = constants.get(key)
+        if slot is None:
+            slot = constants[key] = Slot(size + len(values))
+            values.append(val)
+        return slot
+
+    for i in indices:
+        result[i] = _rewrite(code[i], slots, constant)
+
+    return (None,) * size + tuple(values)
+
+
+def allocate_slots(code):
+    """Troca os operandos por índices de slot (Slot) no frame.
+
+    Antes, funde as sequências comuns em superinstruções (fuse). Cada
+    função (FUNC_BEGIN..FUNC_END) tem um frame próprio, cujo molde vai no
+    campo a2 do FUNC_BEGIN; as instruções de nível superior formam outro.
+    Os temporários mortos têm o slot reaproveitado. Retorna (código, molde
+    do frame de nível superior).
+    """
+    code = fuse(code)
+    result = list(code)
+    top = []
+    functions = []
+    current = None
+    for i, instr in enumerate(code):
+        op = instr[0]
+        if op == 'FUNC_BEGIN':
+            current = [i]
+            functions.append(current)
+        elif current is not None:
+            current.append(i)
+            if op == 'FUNC_END' and instr[1] == code[current[0]][1]:
+                current = None
+        else:
+            top.append(i)
+
+    for indices in functions:
+        template = _allocate_region(code, indices, result)
+        op, name, _, res = code[indices[0]]
+        result[indices[0]] = (op, name, template, res)
+
+    return result, _allocate_region(code, top, result)
+
+
+# ==============================
+#     Ligação
+# ==============================
+#
+# Último passo antes da execução: as labels viram posições. Cada salto
+# (GOTO, IF_TRUE_GOTO, IF_CMP_x...) passa a ter no campo res o índice da instrução de
+# destino, e as instruções LABEL saem do código executado. Saltos para um
+# GOTO (comum na saída do cond) vão direto ao destino final. O FUNC_BEGIN
+# recebe no campo res a posição seguinte ao seu FUNC_END (onde continua a
+# execução do nível superior).
+
+def link(code):
+    """Resolve os saltos para índices de instrução e remove as LABEL."""
+    linked = []
+    positions = {}   # Label -> índice da instrução seguinte
+    for instr in code:
+        if instr[0] == 'LABEL':
+            positions[instr[3]] = len(linked)
+        else:
+            linked.append(instr)
+
+    def resolve(label):
+        if label not in positions:
+            raise ValueError(f"Label '{label}' não encontrada")
+        return positions[label]
+
+    def target(label):
+        # Segue a cadeia de GOTOs até a primeira instrução que não é GOTO
+        pos = resolve(label)
+        seen = set()
+        while pos < len(linked) and pos not in seen:
+            instr = linked[pos]
+            if instr[0] != 'GOTO':
+                break
+            seen.add(pos)
+            pos = resolve(instr[3])
+        return pos
+
+    result = []
+    begins = []      # FUNC_BEGIN ainda sem o FUNC_END correspondente
+    for i, instr in enumerate(linked):
+        op = instr[0]
+        if op in JUMP_OPS:
+            instr = instr[:3] + (target(instr[3]),)
+        elif op == 'FUNC_BEGIN':
+            begins.append(i)
+        elif op == 'FUNC_END' and begins and result[begins[-1]][1] == instr[1]:
+            begin = begins.pop()
+            result[begin] = result[begin][:3] + (i + 1,)
+        result.append(instr)
+    return result
@@ -1,26 +1,91 @@
 # compiler.py - Liga parser, codegen e interpreter
-from parser import parser
-from tokens import lexer
-from codegen import CodeGenerator
+from parser import get_parser
+from tokens import get_lexer
+from fastlexer import FastLexer, TokenStream, TokenRecorder, scan
+from codegen import CodeGenerator, allocate_slots
 from interpreter import Interpreter
+from pybackend import PyBackend
+from closures import ClosureBackend
+from stackvm import StackVM
+from reader import iter_top_level_forms
+from cache import CompileCache, DEFAULT_CACHE_DIR
+from optimizer import optimize, options_tag, OPT_LEVELS, INLINE_SIZE
+from bytecode import BYTECODE_SUFFIX
+import bytecode
 import os
 import sys
 
 class LispCompiler:
-    def __init__(self):
-        self.parser = parser
+    # Backends de análise léxica disponíveis
+    LEXER_BACKENDS = ('ply', 'fast')
+    # Backends de execução: interpretador do código intermediário, tradução
+    # para Python, closures ou bytecode de pilha compilados direto da AST
+    EXEC_BACKENDS = ('interp', 'python', 'closure', 'stack')
+    # Backends que executam a AST (sem código intermediário nem cache)
+    AST_BACKENDS = ('closure', 'stack')
+    
+    def __init__(self, lexer_backend='ply', capture_tokens=True, cache=False, opt_level=0, backend='interp',
+                 inline_size=INLINE_SIZE):
+        if lexer_backend not in self.LEXER_BACKENDS:
+            raise ValueError(f"Backend de lexer desconhecido: '{lexer_backend}'")
+        if backend not in self.EXEC_BACKENDS:
+            raise ValueError(f"Backend de execução desconhecido: '{backend}'")
+        if opt_level not in OPT_LEVELS:
+            raise ValueError(f"Nível de otimização inválido: {opt_level}")
+        if inline_size < 0:
+            raise ValueError(f"Tamanho de expansão em linha inválido: {inline_size}")
+        self.opt_level = opt_level
+        self.inline_size = inline_size   # Funções de até inline_size instruções são expandidas em -O1
+        self.lexer_backend = lexer_backend
+        self.backend = backend
+        self.lexer = FastLexer() if lexer_backend == 'fast' else None   # PLY: criado no primeiro uso
+        self.parser = None                                               # Criado no primeiro parse
+        self.capture_tokens = capture_tokens   # Grava os tokens durante o parse
+        self.current_tokens = None             # TokenStream do último parse
+        # Cache de código intermediário: desligado por padrão; True usa __lispcache__
+        # no diretório de trabalho, ou um CompileCache já configurado
+        self.cache = CompileCache() if cache is True else (cache or None)
         self.codegen = CodeGenerator()
-        self.interpreter = Interpreter()
+        self.count_hits = False   # Acertos do quickening contados (no REPL, para :stats)
+        self.interpreter = self.new_interpreter()
         self.current_ast = None
         self.current_code = None
         self.current_filename = None 
+        self.last_opt_stats = None      # Estatísticas da última otimização
+    
+    # Lexer e parser são construídos só no primeiro uso (partida rápida)
+    def get_lexer(self):
+        if self.lexer is None:
+            self.lexer = get_lexer()
+        return self.lexer
+    
+    def get_parser(self):
+        if self.parser is None:
+            self.parser = get_parser()
+        return self.parser
     
     # Analisa o código Lisp e retorna a AST
-    def parse(self, lisp_code):
-        lexer.input(lisp_code)
-        self.current_ast = self.parser.parse(lisp_code, lexer=lexer)
+    def parse(self, lisp_code, capture=None):
+        if capture is None:
+            capture = self.capture_tokens
+        
+        if not capture:
+            self.current_tokens = None
+            self.current_ast = self.get_parser().parse(lisp_code, lexer=self.get_lexer())
+            return self.current_ast
+        
+        # O FastLexer já monta um TokenStream; o PLY é envolvido por um gravador
+        lexer = self.lexer if self.lexer_backend == 'fast' else TokenRecorder(self.get_lexer())
+        self.current_ast = self.get_parser().parse(lisp_code, lexer=lexer)
+        self.current_tokens = lexer.stream
         return self.current_ast
     
+    # Gera o fluxo compacto de tokens (colunas) do código Lisp
+    def tokenize(self, lisp_code):
+        if self.lexer_backend == 'fast':
+            return scan(lisp_code)
+        return TokenStream.from_lexer(self.get_lexer(), lisp_code)
+    
     # Gera código intermediário a partir da AST
     def generate_code(self, ast=None):
         if ast is None:
@@ -28,6 +93,27 @@ class LispCompiler:
         self.current_code = self.codegen.generate(ast)
         return self.current_code
     
+    # Otimiza o código intermediário conforme o nível -O
+    def optimize_code(self, code=None):
+        if code is None:
+            code = self.current_code
+        code, self.last_opt_stats = optimize(code, self.opt_level, self.inline_size)
+        self.current_code = code
+        return code
+    
+    # Cria um interpretador com as mesmas opções do compilador (os backends têm a mesma interface)
+    def new_interpreter(self):
+        if self.backend == 'python':
+            interpreter = PyBackend(cache=self.cache, opt_level=self.opt_level, inline_size=self.inline_size)
+        elif self.backend == 'closure':
+            interpreter = ClosureBackend(cache=self.cache, opt_level=self.opt_level, inline_size=self.inline_size)
+        elif self.backend == 'stack':
+            interpreter = StackVM(cache=self.cache, opt_level=self.opt_level, inline_size=self.inline_size)
+        else:
+            interpreter = Interpreter(cache=self.cache, opt_level=self.opt_level, inline_size=self.inline_size)
+        interpreter.count_hits = self.count_hits
+        return interpreter
+    
     # Executa o código intermediário e retorna o resultado
     def execute(self, code=None):
         if code is None:
@@ -36,27 +122,63 @@ class LispCompiler:
         return result
     
     # Compila e executa o código Lisp completo
-    def compile_and_execute(self, lisp_code):
+    def compile_and_execute(self, lisp_code, use_cache=False):
         print(f"\n{'='*60}")
         print(f"Compilando: {lisp_code[:50]}{'...' if len(lisp_code) > 50 else ''}")
         print('='*60)
         
         try:
-            # 1. Análise léxica e sintática
-            print("\n1. Análise léxica/sintática...")
-            ast = self.parse(lisp_code)
-            
-            if ast is None:
-                print("ERRO: Falha na análise sintática")
-                return None
+            # 0. Código intermediário do cache, se o fonte não mudou (backends da AST não usam)
+            cache = self.cache if use_cache and self.backend not in self.AST_BACKENDS else None
+            key = cache.key(lisp_code, options_tag(self.opt_level, self.inline_size)) if cache else None
+            intermediate_code = cache.get(key) if cache else None
             
-            print(f" AST gerada com {len(ast)} elemento(s)")
-            
-            # 2. Geração de código intermediário
-            print("\n2. Gerando código intermediário...")
-            intermediate_code = self.generate_code(ast)
+            if intermediate_code is not None:
+                print("\n1-2. Código intermediário lido do cache")
+                self.current_ast = None
+                self.current_tokens = None
+                self.current_code = intermediate_code
+            else:
+                # 1. Análise léxica e sintática
+                print("\n1. Análise léxica/sintática...")
+                ast = self.parse(lisp_code)
+                
+                if ast is None:
+                    print("ERRO: Falha na análise sintática")
+                    return None
+                
+                print(f" AST gerada com {len(ast)} elemento(s)")
+                
+                # 2-3. Closures ou bytecode de pilha: executa a AST sem código intermediário
+                if self.backend in self.AST_BACKENDS:
+                    self.current_code = None
+                    print(f"\n2-3. Compilando ({self.backend}) e executando...")
+                    print("-" * 40)
+                    result = self.interpreter.execute_ast(ast)
+                    print(f"\n Execução concluída")
+                    return result
+                
+                # 2. Geração de código intermediário (unidade nova: o cache guarda só ela)
+                print("\n2. Gerando código intermediário...")
+                if cache:
+                    self.codegen = CodeGenerator()
+                intermediate_code = self.generate_code(ast)
+                print(f" Gerado {len(intermediate_code)} instruções")
+                
+                # 2b. Otimização (opcional)
+                if self.opt_level > 0:
+                    intermediate_code = self.optimize_code(intermediate_code)
+                    stats = self.last_opt_stats
+                    print(f" Otimização -O{self.opt_level}: {stats['before'] - stats['after']} instruções removidas "
+                          f"({stats['before']} -> {stats['after']}; {stats['folded']} dobradas, "
+                          f"{stats['propagated']} cópias propagadas, "
+                          f"{sum(stats['inlined'].values())} chamadas expandidas em linha, "
+                          f"{sum(blocks for blocks, _ in stats['cfg'].values())} blocos removidos)")
+                
+                if cache:
+                    cache.put(key, intermediate_code)
             
-            print(f" Gerado {len(intermediate_code)} instruções")
+            print(f" Executando {len(intermediate_code)} instruções")
             
             # 3. Execução
             print("\n3. Executando...")
@@ -93,7 +215,7 @@ class LispCompiler:
             print(f"{'-'*40}")
             
             # Processa todo o arquivo como uma única unidade
-            result = self.compile_and_execute(lisp_code)
+            result = self.compile_and_execute(lisp_code, use_cache=True)
             
             # Salvar outputs
             self.save_outputs()
@@ -106,6 +228,62 @@ class LispCompiler:
             traceback.print_exc()
             return None
     
+    # Compila e executa o arquivo bloco a bloco (modo streaming).
+    # Cada bloco roda antes do próximo ser lido: chamar uma função antes do
+    # seu defun dá "Função não definida", ao contrário do arquivo inteiro.
+    def compile_and_execute_file_stream(self, filename):
+        if not os.path.exists(filename):
+            print(f"ERRO: Arquivo '{filename}' não encontrado")
+            return None
+        
+        self.current_filename = filename
+        print(f"\n Arquivo (streaming): {filename}")
+        print(f" Tamanho: {os.path.getsize(filename)} bytes")
+        print('-' * 40)
+        
+        result = None
+        forms = 0
+        errors = 0
+        
+        try:
+            for form in iter_top_level_forms(filename):
+                forms += 1
+                
+                # 1. Análise léxica e sintática de um único bloco
+                ast = self.parse(form, capture=False)
+                if ast is None:
+                    print(f"ERRO: Falha na análise sintática do bloco {forms}")
+                    errors += 1
+                    continue
+                
+                # 2. Geração de código: o codegen é reaproveitado para manter
+                # temporários e labels únicos no arquivo inteiro
+                self.codegen.code = []
+                try:
+                    if self.backend in self.AST_BACKENDS:
+                        # 2-3. Closures ou bytecode de pilha direto da AST
+                        result = self.interpreter.execute_ast(ast)
+                        continue
+                    code = self.generate_code(ast)
+                    if self.opt_level > 0:
+                        code = self.optimize_code(code)
+                except NotImplementedError as e:
+                    print(f"ERRO no bloco {forms}: {e}")
+                    errors += 1
+                    continue
+                
+                # 3. Execução: só o código de funções fica retido
+                result = self.interpreter.execute(code)
+        except Exception as e:
+            print(f"ERRO ao processar arquivo: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+        
+        print('-' * 40)
+        print(f" {forms} bloco(s) processado(s), {errors} com erro")
+        return result
+    
     # Salva tokens, AST e código intermediário em arquivos
     def save_outputs(self, base_name=None):
         if base_name is None:
@@ -126,12 +304,18 @@ class LispCompiler:
                 ast_file = f"{base_name}_ast.txt"
                 self.save_ast(ast_file)
                 print(f" AST salva em: {ast_file}")
+            elif self.current_code is not None:
+                print(" Tokens e AST não gerados: código intermediário veio do cache")
             
             # Salvar código intermediário
             if self.current_code is not None:
                 code_file = f"{base_name}_instr.txt"
                 self.save_intermediate_code(code_file)
                 print(f" Código intermediário salvo em: {code_file}")
+                
+                bytecode_file = f"{base_name}{BYTECODE_SUFFIX}"
+                self.save_bytecode(bytecode_file)
+                print(f" Programa pré-compilado salvo em: {bytecode_file}")
             
             # Salvar resultado da execução
             if self.interpreter.last_result is not None:
@@ -150,20 +334,15 @@ class LispCompiler:
             return
         
         try:
-            # Recria tokens a partir do código atual
-            from tokens import lexer
-            with open(self.current_filename, 'r', encoding='utf-8') as f:
-                code = f.read()
+            tokens = self.current_tokens
             
-            lexer.input(code)
-            tokens = []
-            while True:
-                tok = lexer.token()
-                if not tok:
-                    break
-                tokens.append(tok)
+            # Sem captura durante o parse, recria tokens a partir do arquivo atual
+            if tokens is None:
+                with open(self.current_filename, 'r', encoding='utf-8') as f:
+                    code = f.read()
+                tokens = self.tokenize(code)
             
-            # Escreve no arquivo a lista de tokens
+            # Escreve no arquivo os tokens, materializando um por vez
             with open(filename, 'w', encoding='utf-8') as f:
                 f.write("=== TOKENS ===\n")
                 for tok in tokens:
@@ -201,6 +380,41 @@ class LispCompiler:
             f.write(f"Instruções: {len(self.current_code)}\n\n")
             for i, instr in enumerate(self.current_code):
                 f.write(f"{i:4d}: {instr}\n")
+    
+    # Salva o código intermediário no formato binário (.lispc), já com os slots alocados
+    def save_bytecode(self, filename):
+        if self.current_code is None:
+            return
+        
+        code, template = allocate_slots(self.current_code)
+        bytecode.encode(code, template).save(filename)
+    
+    # Executa um programa pré-compilado (.lispc), sem análise léxica/sintática nem codegen
+    def execute_bytecode_file(self, filename):
+        if not os.path.exists(filename):
+            print(f"ERRO: Arquivo '{filename}' não encontrado")
+            return None
+        
+        try:
+            program = bytecode.load(filename)
+        except ValueError as e:
+            print(f"ERRO: {e}")
+            return None
+        
+        self.current_filename = filename
+        self.current_ast = None
+        self.current_tokens = None
+        self.current_code = program.decode()
+        
+        print(f"\n Programa pré-compilado: {filename}")
+        print(f" {len(program)} instruções, {len(program.pool)} constantes")
+        print('-' * 40)
+        # .lispc é código intermediário: com o bytecode de pilha, roda no Interpreter
+        interpreter = self.interpreter
+        if not isinstance(interpreter, Interpreter):
+            interpreter = self.interpreter = Interpreter(cache=self.cache, opt_level=self.opt_level,
+                                                         inline_size=self.inline_size)
+        return interpreter.execute_allocated(self.current_code, program.frame)
 
 
     
@@ -273,8 +487,9 @@ class LispCompiler:
         try:
             # Reinicia o compilador para o novo arquivo
             self.codegen = CodeGenerator()
-            self.interpreter = Interpreter()
+            self.interpreter = self.new_interpreter()
             self.current_ast = None
+            self.current_tokens = None
             self.current_code = None
             
             # Compila e executa
@@ -301,9 +516,15 @@ class LispCompiler:
         print("  :mem     - Mostrar estado da memória")
         print("  :reset   - Reiniciar ambiente de execução")
         print("  :save    - Salvar outputs em arquivo")
+        print("  :stream  - Executar arquivo bloco a bloco (:stream arquivo)")
+        print("  :cache   - Estatísticas do cache (:cache clear para limpar)")
+        print("  :stats   - Especialização de instruções (quickening)")
         print("  :quit    - Sair do programa")
         print("="*60)
         
+        # :stats mostra os acertos: no REPL vale o incremento por execução
+        self.count_hits = self.interpreter.count_hits = True
+        
         while True:
             try:
 				# Lê a opção removendo espaços em branco do início e final
@@ -311,7 +532,9 @@ class LispCompiler:
                 
                 # Comandos especiais
                 if user_input.startswith(':'):
-                    cmd = user_input[1:].lower()
+                    cmd, _, arg = user_input[1:].partition(' ')
+                    cmd = cmd.lower()
+                    arg = arg.strip()
                     
                     if cmd in ['quit', 'q', 'exit']:
                         print(" Saindo do programa...")
@@ -328,6 +551,15 @@ class LispCompiler:
                         self.reset_compiler()
                     elif cmd == 'save':
                         self.save_repl_outputs()
+                    elif cmd == 'stream':
+                        if arg:
+                            self.compile_and_execute_file_stream(arg)
+                        else:
+                            print(" Uso: :stream arquivo")
+                    elif cmd == 'cache':
+                        self.show_cache_state(arg)
+                    elif cmd == 'stats':
+                        self.show_quicken_stats()
                     elif cmd == 'help':
                         self.show_repl_help()
                     else:
@@ -371,19 +603,14 @@ class LispCompiler:
             print("\n Tokens da última expressão:")
             print("-" * 40)
             
-            # Gera tokens da última entrada
-            from tokens import lexer
-            lexer.input(self.last_input)
-            tokens = []
-            while True:
-                tok = lexer.token()
-                if not tok:
-                    break
-                tokens.append(tok)
+            # Usa os tokens capturados no parse ou gera a partir da última entrada
+            tokens = self.current_tokens
+            if tokens is None or tokens.source != self.last_input:
+                tokens = self.tokenize(self.last_input)
             
             # Exibe tokens formatados
-            for i, tok in enumerate(tokens, 1):
-                print(f"{i:3d}: {tok.type:12} '{tok.value}'")
+            for i in range(len(tokens)):
+                print(f"{i + 1:3d}: {tokens.type(i):12} '{tokens.value(i)}'")
             
             print(f"\nTotal: {len(tokens)} tokens")
         else:
@@ -413,19 +640,52 @@ class LispCompiler:
     def show_memory_state(self):
         print("\n Estado da Memória:")
         print(f"  Último resultado: {self.interpreter.last_result}")
-        print(f"  Variáveis temporárias: {len([k for k in self.interpreter.memory if k.startswith('t')])}")
+        print(f"  Slots do frame: {len(self.interpreter.frame)}")
         print(f"  Funções definidas: {list(self.interpreter.functions.keys())}")
+
+        if self.interpreter.frame:
+            print("\n  Conteúdo do frame:")
+            for slot, value in enumerate(self.interpreter.frame):
+                print(f"    %{slot}: {value}")
+    
+    # Opção ':cache' : Mostra (ou limpa) o cache de código intermediário
+    def show_cache_state(self, arg=''):
+        if self.cache is None:
+            print(" Cache desativado")
+            return
         
-        if self.interpreter.memory:
-            print("\n  Conteúdo da memória:")
-            for key, value in sorted(self.interpreter.memory.items()):
-                print(f"    {key}: {value}")
+        if arg == 'clear':
+            self.cache.clear()
+            print(f" Cache limpo: {self.cache.directory}")
+            return
+        
+        stats = self.cache.stats()
+        print(f"\n Cache: {self.cache.directory} (limite {self.cache.max_bytes // 2**20} MiB)")
+        print(f"  Acertos: {stats['hits']}  Falhas: {stats['misses']}")
+        print(f"  Gravações: {stats['writes']}  Descartes: {stats['evictions']}")
+    
+    # Opção ':stats' : Mostra as estatísticas de quickening do interpretador
+    def show_quicken_stats(self):
+        rows = self.interpreter.quicken_report()
+        if not rows:
+            print(" Nenhuma instrução executada vezes suficientes para especializar")
+            return
+        
+        print("\n Quickening (formas especializadas para operandos int):")
+        print(f"  {'operação':12} {'espec.':>6} {'genér.':>6} {'acertos':>10} {'falhas':>8} {'taxa':>7} {'desotim.':>8}")
+        for op, specialized, generic, hits, misses, deopts in rows:
+            if hits is None:
+                hits = rate = '-'   # Acertos não contados (count_hits desligado)
+            else:
+                rate = f"{hits / (hits + misses):.1%}" if hits + misses else '-'
+            print(f"  {op:12} {specialized:6} {generic:6} {hits:>10} {misses:8} {rate:>7} {deopts:8}")
     
     # Opção ':reset' : Reseta  compilador
     def reset_compiler(self):
         self.codegen = CodeGenerator()
-        self.interpreter = Interpreter()
+        self.interpreter = self.new_interpreter()
         self.current_ast = None
+        self.current_tokens = None
         self.current_code = None
         print(" Compilador reiniciado")
     
@@ -448,14 +708,34 @@ class LispCompiler:
         print("  :mem     - Mostrar estado da memória")
         print("  :reset   - Reiniciar interpretador")
         print("  :save    - Salvar outputs em arquivo")
+        print("  :stream  - Executar arquivo bloco a bloco (:stream arquivo)")
+        print("  :cache   - Estatísticas do cache (:cache clear para limpar)")
+        print("  :stats   - Especialização de instruções (quickening)")
         print("  :quit    - Sair do programa")
         print("  :help    - Mostrar esta ajuda")
     
 
 
 def main():
-
+    import argparse
     
+    # Argumentos de linha de comando
+    arg_parser = argparse.ArgumentParser(description="Compilador Lisp")
+    arg_parser.add_argument('arquivo', nargs='?', help="arquivo Lisp ou .lispc para executar (sem ele, inicia o REPL)")
+    arg_parser.add_argument('--stream', action='store_true', help="executa o arquivo bloco a bloco, sem carregá-lo inteiro; "
+                                 "uma chamada antes do defun da função falha (no modo normal, funciona)")
+    arg_parser.add_argument('--lexer', choices=LispCompiler.LEXER_BACKENDS, default='ply', help="backend de análise léxica")
+    arg_parser.add_argument('--no-capture-tokens', action='store_true', help="não grava os tokens durante o parse")
+    arg_parser.add_argument('--cache', action='store_true',
+                            help=f"guarda o código intermediário em {DEFAULT_CACHE_DIR}/, ao lado do arquivo "
+                                 "(ou no diretório atual, no REPL); desligado por padrão")
+    arg_parser.add_argument('--no-cache', action='store_true',
+                            help="não usa o cache de código intermediário (o padrão; mantida por compatibilidade)")
+    arg_parser.add_argument('--backend', choices=LispCompiler.EXEC_BACKENDS, default='interp', help="backend de execução")
+    arg_parser.add_argument('-O', dest='opt_level', type=int, choices=OPT_LEVELS, default=0, help="nível de otimização do código intermediário")
+    arg_parser.add_argument('--inline', dest='inline_size', type=int, default=INLINE_SIZE, metavar='N',
+                            help="em -O1, expande em linha funções de até N instruções (0 desliga)")
+    args = arg_parser.parse_args()
     
     # Verifica dependências
     try:
@@ -467,7 +747,26 @@ def main():
         print("Instale com: pip install ply")
         return
     
-    compiler = LispCompiler() # Cria o compilador
+    # O cache de um arquivo fica no diretório dele, como o __pycache__
+    cache = None
+    if args.cache and not args.no_cache:
+        directory = os.path.dirname(os.path.abspath(args.arquivo)) if args.arquivo else ''
+        cache = CompileCache(os.path.join(directory, DEFAULT_CACHE_DIR))
+    
+    compiler = LispCompiler(lexer_backend=args.lexer, capture_tokens=not args.no_capture_tokens,
+                            cache=cache, opt_level=args.opt_level, inline_size=args.inline_size,
+                            backend=args.backend) # Cria o compilador
+    
+    # Execução direta de arquivo
+    if args.arquivo:
+        if args.arquivo.endswith(BYTECODE_SUFFIX):
+            compiler.execute_bytecode_file(args.arquivo)
+        elif args.stream:
+            compiler.compile_and_execute_file_stream(args.arquivo)
+        else:
+            compiler.compile_and_execute_file(args.arquivo)
+        return
+    
     compiler.repl_menu() # Inicia diretamente no modo interativo
     
     print("\n Programa finalizado.")
@@ -0,0 +1,314 @@
+# fastlexer.py - Lexer alternativo ao PLY, baseado em uma única regex combinada
+import re
+from array import array
+from tokens import reserved, tokens
+
+# ===========================================
+#       TABELAS PRÉ-COMPUTADAS
+# ===========================================
+
+# Regex mestre: cada alternativa é um grupo nomeado, testado em uma única passagem.
+# Mesmas regras de tokens.py (operadores de dois caracteres antes dos de um)
+_MASTER = re.compile(r'''
+    (?P<NEWLINE>\n+)
+  | (?P<IGNORE>[ \t]+)
+  | (?P<COMMENT>;.*)
+  | (?P<NUM>\d+)
+  | (?P<STRING>"[^"]*")
+  | (?P<SYMBOL>[a-zA-Z_][a-zA-Z_0-9-]*)
+  | (?P<OP>/=|>=|<=|[-+*/=<>()])
+  | (?P<ERROR>.)
+''', re.VERBOSE)
+
+# Tipo de token para cada operador
+_OPERATORS = {
+    '+'  : 'PLUS',
+    '-'  : 'MINUS',
+    '*'  : 'TIMES',
+    '/'  : 'DIVIDE',
+    '='  : 'NUM_EQ',
+    '/=' : 'NUM_NEQ',
+    '>'  : 'GT',
+    '>=' : 'GTE',
+    '<'  : 'LT',
+    '<=' : 'LTE',
+    '('  : 'LPAREN',
+    ')'  : 'RPAREN',
+}
+
+# Identificador numérico de cada tipo de token (coluna de tipos do TokenStream)
+TOKEN_TYPES = tuple(tokens)
+TYPE_IDS = {name: i for i, name in enumerate(TOKEN_TYPES)}
+
+# Cache de classificação de identificadores: texto -> (tipo, valor)
+_symbol_cache = {}
+
+def classify_symbol(text):
+    """Classifica um identificador como em t_SYMBOL, com cache por texto."""
+    entry = _symbol_cache.get(text)
+    if entry is None:
+        lower_val = text.lower()
+        if lower_val == 't':
+            entry = ('T', 'T')
+        elif lower_val == 'nil':
+            entry = ('NIL', 'nil')
+        else:
+            entry = (reserved.get(text, 'ID'), text)
+        _symbol_cache[text] = entry
+    return entry
+
+
+# ===========================================
+#                 TOKENS
+# ===========================================
+
+class Token:
+    """Token compatível com o LexToken do PLY, mas sem __dict__."""
+    __slots__ = ('type', 'value', 'lineno', 'lexpos', 'lexer')
+
+    def __init__(self, type, value, lineno, lexpos):
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+    def __str__(self):
+        return 'LexToken(%s,%r,%d,%d)' % (self.type, self.value, self.lineno, self.lexpos)
+
+    __repr__ = __str__
+
+
+def tokenize(data, batch_size=4096):
+    """Gera os tokens de data em lotes (listas) de até batch_size tokens."""
+    batch = []
+    lineno = 1
+    operators = _OPERATORS
+    classify = classify_symbol
+
+    for m in _MASTER.finditer(data):
+        kind = m.lastgroup
+
+        if kind == 'IGNORE' or kind == 'COMMENT':
+            continue
+        if kind == 'NEWLINE':
+            lineno += m.end() - m.start()
+            continue
+
+        text = m.group()
+        if kind == 'SYMBOL':
+            tok_type, value = classify(text)
+        elif kind == 'OP':
+            tok_type, value = operators[text], text
+        elif kind == 'NUM':
+            tok_type, value = 'NUM', int(text)
+        elif kind == 'STRING':
+            tok_type, value = 'STRING', text[1:-1]
+        else:
+            # Mesmo tratamento de t_error: avisa e descarta um caractere
+            print(f"Illegal character '{text}' at line {lineno}")
+            continue
+
+        batch.append(Token(tok_type, value, lineno, m.start()))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+# ===========================================
+#        FLUXO DE TOKENS EM COLUNAS
+# ===========================================
+
+class TokenStream:
+    """Sequência de tokens guardada em colunas compactas (array).
+
+    Para cada token são guardados o id do tipo, a posição inicial, o
+    comprimento no texto fonte e a linha. O valor só é extraído do texto
+    fonte quando pedido, então nenhum objeto é criado por token.
+    """
+    __slots__ = ('source', 'types', 'starts', 'lengths', 'lines')
+
+    def __init__(self, source):
+        self.source = source
+        self.types = array('B')      # Id do tipo (índice em TOKEN_TYPES)
+        self.starts = array('I')     # Posição inicial no texto fonte
+        self.lengths = array('I')    # Comprimento do lexema
+        self.lines = array('I')      # Linha do token
+
+    def append(self, type_id, start, length, line):
+        self.types.append(type_id)
+        self.starts.append(start)
+        self.lengths.append(length)
+        self.lines.append(line)
+
+    def __len__(self):
+        return len(self.types)
+
+    def type(self, i):
+        return TOKEN_TYPES[self.types[i]]
+
+    def text(self, i):
+        start = self.starts[i]
+        return self.source[start:start + self.lengths[i]]
+
+    def value(self, i):
+        """Valor do token i, com as mesmas conversões do lexer do PLY."""
+        text = self.text(i)
+        tok_type = TOKEN_TYPES[self.types[i]]
+        if tok_type == 'NUM':
+            return int(text)
+        if tok_type == 'STRING':
+            return text[1:-1]
+        if text[:1].isalpha() or text[:1] == '_':
+            return classify_symbol(text)[1]
+        return text
+
+    def token(self, i):
+        """Materializa o token i como objeto Token."""
+        return Token(TOKEN_TYPES[self.types[i]], self.value(i), self.lines[i], self.starts[i])
+
+    def __getitem__(self, i):
+        return self.token(i)
+
+    def __iter__(self):
+        for i in range(len(self.types)):
+            yield self.token(i)
+
+    def nbytes(self):
+        """Memória ocupada pelas colunas (sem contar o texto fonte)."""
+        return sum(col.itemsize * len(col) for col in (self.types, self.starts, self.lengths, self.lines))
+
+    @classmethod
+    def from_lexer(cls, lexer, source):
+        """Monta o fluxo a partir de um lexer com interface input/token (ex.: PLY)."""
+        stream = cls(source)
+        lexer.input(source)
+        while True:
+            tok = lexer.token()
+            if not tok:
+                break
+            # Após token(), lexer.lexpos aponta para o fim do lexema
+            stream.append(TYPE_IDS[tok.type], tok.lexpos, lexer.lexpos - tok.lexpos, tok.lineno)
+        return stream
+
+
+class TokenRecorder:
+    """Envolve um lexer (input/token) e grava cada token entregue em um TokenStream.
+
+    Permite capturar os tokens como subproduto do parse, sem uma segunda
+    análise léxica.
+    """
+
+    def __init__(self, lexer):
+        self.lexer = lexer
+        self.stream = TokenStream('')
+
+    def input(self, data):
+        self.stream = TokenStream(data)
+        self.lexer.input(data)
+
+    def token(self):
+        lexer = self.lexer
+        tok = lexer.token()
+        if tok:
+            self.stream.append(TYPE_IDS[tok.type], tok.lexpos, lexer.lexpos - tok.lexpos, tok.lineno)
+        return tok
+
+    # Atributos consultados pelo parser (lineno, lexpos) vêm do lexer envolvido
+    def __getattr__(self, name):
+        return getattr(self.lexer, name)
+
+
+def scan(source):
+    """Analisa source inteiro e retorna um TokenStream, sem criar objetos Token."""
+    stream = TokenStream(source)
+    types = stream.types.append
+    starts = stream.starts.append
+    lengths = stream.lengths.append
+    lines = stream.lines.append
+    type_ids = TYPE_IDS
+    operator_ids = {op: type_ids[name] for op, name in _OPERATORS.items()}
+    num_id = type_ids['NUM']
+    string_id = type_ids['STRING']
+    classify = classify_symbol
+    lineno = 1
+
+    for m in _MASTER.finditer(source):
+        kind = m.lastgroup
+
+        if kind == 'IGNORE' or kind == 'COMMENT':
+            continue
+        if kind == 'NEWLINE':
+            lineno += m.end() - m.start()
+            continue
+
+        start, end = m.span()
+        if kind == 'SYMBOL':
+            type_id = type_ids[classify(m.group())[0]]
+        elif kind == 'OP':
+            type_id = operator_ids[m.group()]
+        elif kind == 'NUM':
+            type_id = num_id
+        elif kind == 'STRING':
+            type_id = string_id
+        else:
+            print(f"Illegal character '{m.group()}' at line {lineno}")
+            continue
+
+        types(type_id)
+        starts(start)
+        lengths(end - start)
+        lines(lineno)
+
+    return stream
+
+
+# ===========================================
+#           INTERFACE DE LEXER
+# ===========================================
+
+class FastLexer:
+    """Lexer com a mesma interface usada pelo parser do PLY (input/token).
+
+    input() monta um TokenStream e token() materializa um token por vez,
+    então o parser nunca mantém a lista inteira de objetos Token.
+    """
+
+    def __init__(self):
+        self.stream = TokenStream('')
+        self.lineno = 1
+        self.lexpos = 0
+        self._index = 0
+
+    def input(self, data):
+        self.stream = scan(data)
+        self.lineno = 1
+        self.lexpos = 0
+        self._index = 0
+
+    def token(self):
+        i = self._index
+        if i >= len(self.stream):
+            return None
+        self._index = i + 1
+        tok = self.stream.token(i)
+        self.lineno = tok.lineno
+        self.lexpos = tok.lexpos + self.stream.lengths[i]
+        return tok
+
+    # Texto fonte, com o mesmo nome do atributo do lexer do PLY
+    @property
+    def lexdata(self):
+        return self.stream.source
+
+    # Permite "for tok in lexer", como no PLY
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        tok = self.token()
+        if tok is None:
+            raise StopIteration
+        return tok
@@ -0,0 +1,188 @@
+# inline.py - Expansão em linha de funções pequenas (nível -O1)
+#
+# Roda sobre a unidade inteira antes dos demais passos do otimizador, quando
+# todas as definições da unidade (FUNC_BEGIN ... FUNC_END) já são conhecidas.
+# Uma chamada
+#     PARAM a1 ... PARAM an ; CALL f n t
+# vira o corpo de f, com:
+#   - cada parâmetro trocado por um temporário novo, atribuído do argumento
+#   - temporários e labels do corpo renomeados (números novos na unidade)
+#   - RETURN v       -> ASSIGN v t ; GOTO fim
+#   - TAIL_CALL g k  -> CALL g k t ; GOTO fim
+# Em TAIL_CALL f, o corpo entra como está: seus RETURN e TAIL_CALL já
+# retornam do chamador. Os passos seguintes (propagação de cópias, fluxo de
+# controle) limpam as atribuições e saltos que sobram.
+#
+# A definição de f continua no código: chamadas de outras unidades, de LOAD
+# e de call_function a encontram pelo nome. Como em outros compiladores
+# Lisp, redefinir f depois não muda os pontos já expandidos.
+import re
+
+from cfg import regions
+from codegen import is_temp, LABEL_OPS, NAME_OPS
+
+# Tamanho máximo (instruções do corpo) de uma função expandida; 0 desliga
+INLINE_SIZE = 12
+
+_NUMBERED = re.compile(r'(%t|L)(\d+)$')
+
+
+# ==============================
+#     Candidatas
+# ==============================
+
+def _recursive(graph):
+    """Funções que alcançam a si mesmas no grafo de chamadas (nome -> chamadas)."""
+    result = set()
+    for name in graph:
+        seen = set()
+        stack = list(graph[name])
+        while stack:
+            callee = stack.pop()
+            if callee == name:
+                result.add(name)
+                break
+            if callee not in seen and callee in graph:
+                seen.add(callee)
+                stack.extend(graph[callee])
+    return result
+
+
+def candidates(code, size=INLINE_SIZE):
+    """Funções expansíveis da unidade: nome -> (parâmetros, corpo).
+
+    O corpo tem até size instruções, a função é definida uma só vez na
+    unidade, não tem parâmetros repetidos e não chama a si mesma, direta
+    ou indiretamente.
+    """
+    definitions = {}
+    counts = {}
+    for name, params, start, end in regions(code):
+        if name is not None:
+            counts[name] = counts.get(name, 0) + 1
+            definitions[name] = (params, code[start:end])
+
+    graph = {name: {instr[1] for instr in body if instr[0] in ('CALL', 'TAIL_CALL')}
+             for name, (_, body) in definitions.items()}
+    recursive = _recursive(graph)
+    return {name: (params, body) for name, (params, body) in definitions.items()
+            if counts[name] == 1 and name not in recursive and len(body) <= size
+            and len(set(params)) == len(params)}
+
+
+def _constants(params, body):
+    """Nomes lidos pelo corpo como constantes (símbolos fora dos parâmetros)."""
+    names = set()
+    for op, a1, a2, res in body:
+        fields = () if op in NAME_OPS else (a1, a2)
+        for val in fields:
+            if isinstance(val, str) and not is_temp(val) and val not in params:
+                names.add(val)
+    return names
+
+
+# ==============================
+#     Expansão
+# ==============================
+
+def expand(params, body, args, result, tail, new_temp, new_label):
+    """Corpo renomeado para o ponto de chamada (ver o comentário do módulo)."""
+    variables = {p: new_temp() for p in params}
+    code = [('ASSIGN', arg, None, variables[p]) for p, arg in zip(params, args)]
+    renamed = {}    # Temporário do corpo -> temporário novo
+    labels = {}
+
+    def operand(val):
+        # Parâmetros antes dos temporários: um nome nunca pode valer pelos dois
+        if isinstance(val, str) and val in params:
+            return variables[val]
+        if is_temp(val):
+            if val not in renamed:
+                renamed[val] = new_temp()
+            return renamed[val]
+        return val
+
+    def label(name):
+        if name not in labels:
+            labels[name] = new_label()
+        return labels[name]
+
+    end = None if tail else new_label()
+    for op, a1, a2, res in body:
+        if op in LABEL_OPS:
+            instr = (op, operand(a1), operand(a2), label(res))
+        elif op in NAME_OPS:
+            instr = (op, a1, a2, operand(res))
+        else:
+            instr = (op, operand(a1), operand(a2), operand(res))
+
+        if not tail and op == 'RETURN':
+            code.append(('ASSIGN', instr[1], None, result))
+            code.append(('GOTO', None, None, end))
+        elif not tail and op == 'TAIL_CALL':
+            code.append(('CALL', a1, a2, result))
+            code.append(('GOTO', None, None, end))
+        else:
+            code.append(instr)
+    if not tail:
+        code.append(('LABEL', None, None, end))
+    return code
+
+
+def inline_functions(code, size=INLINE_SIZE, stats=None):
+    """Expande as chamadas das funções pequenas da unidade.
+
+    stats (dicionário) recebe, por função, o número de chamadas expandidas.
+    """
+    # LOAD pode redefinir funções no meio da unidade: nada é expandido
+    if size <= 0 or any(instr[0] == 'LOAD' for instr in code):
+        return code
+    inlinable = candidates(code, size)
+    if not inlinable:
+        return code
+
+    # Temporários e labels novos continuam a numeração da unidade
+    counters = {'%t': 0, 'L': 0}
+    for instr in code:
+        for val in instr[1:]:
+            match = _NUMBERED.match(val) if isinstance(val, str) else None
+            if match:
+                kind, number = match.group(1), int(match.group(2))
+                counters[kind] = max(counters[kind], number)
+
+    def new_name(kind):
+        counters[kind] += 1
+        return f"{kind}{counters[kind]}"
+
+    def new_temp():
+        return new_name('%t')
+
+    def new_label():
+        return new_name('L')
+
+    result = []
+    pos = 0
+    for _, caller_params, start, end in regions(code):
+        result.extend(code[pos:start])
+        region = []
+        for instr in code[start:end]:
+            op, name, argc = instr[0], instr[1], instr[2]
+            target = inlinable.get(name) if op in ('CALL', 'TAIL_CALL') else None
+            if target is not None:
+                params, body = target
+                # Os argumentos são os argc PARAM logo antes da chamada
+                pushed = region[len(region) - argc:] if argc else []
+                if (argc == len(params) and len(pushed) == argc
+                        and all(p[0] == 'PARAM' for p in pushed)
+                        and not _constants(params, body) & set(caller_params)):
+                    del region[len(region) - argc:]
+                    region.extend(expand(params, body, [p[1] for p in pushed], instr[3],
+                                         op == 'TAIL_CALL', new_temp, new_label))
+                    if stats is not None:
+                        stats[name] = stats.get(name, 0) + 1
+                    continue
+            region.append(instr)
+        result.extend(region)
+        pos = end
+    result.extend(code[pos:])
+    return result
@@ -1,477 +1,636 @@
-from parser import parser
-from tokens import lexer
-from codegen import CodeGenerator
+from parser import get_parser
+from tokens import get_lexer
+from codegen import CodeGenerator, Slot, allocate_slots, link, ARGS_OPS
+from optimizer import optimize, options_tag, INLINE_SIZE
+from runtime import Pair, from_list, format_value
+from types import MethodType
+import operator
             
 
 # interpreter.py
+
+# ==============================
+#     Tabelas de operações
+# ==============================
+
+# Divisão inteira e resto: divisor zero resulta em 0
+def _divide(left, right):
+    return left // right if right != 0 else 0
+
+def _modulo(left, right):
+    return left % right if right != 0 else 0
+
+def _equalp(left, right):
+    # Pelo texto, sem distinguir maiúsculas (1 e 1.0 são diferentes)
+    return str(left).lower() == str(right).lower()
+
+def _false(left, right):
+    return False
+
+def runtime_value(val):
+    """Valor em tempo de execução de uma constante do código intermediário."""
+    if isinstance(val, str):
+        # nil ou NIL -> lista vazia; T -> True; outros símbolos valem o próprio nome
+        if val.lower() == 'nil':
+            return []
+        if val.upper() == 'T':
+            return True
+        return val
+    if isinstance(val, list):
+        return from_list([runtime_value(item) for item in val])
+    return val
+
+def make_template(template):
+    """Molde do frame com as constantes já convertidas (copiado a cada frame novo)."""
+    return [runtime_value(val) for val in template]
+
+# Operações aritméticas: nome -> função
+ARITHMETIC = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': _divide,
+    'floor': _divide,
+    'mod': _modulo,
+    'expt': operator.pow,
+}
+
+# Comparações: instrução -> função (num_eq/num_neq são nomes antigos de = e /=)
+COMPARISONS = {
+    'CMP_=': operator.eq,
+    'CMP_eq': operator.eq,
+    'CMP_num_eq': operator.eq,
+    'CMP_/=': operator.ne,
+    'CMP_num_neq': operator.ne,
+    'CMP_>': operator.gt,
+    'CMP_>=': operator.ge,
+    'CMP_<': operator.lt,
+    'CMP_<=': operator.le,
+    'CMP_eql': operator.eq,
+    'CMP_equal': operator.eq,
+    'CMP_equalp': _equalp,
+}
+
+# Forma especializada das comparações para dois ints
+INT_COMPARISONS = dict(COMPARISONS, CMP_equalp=operator.eq)
+
+# Quickening: aritmética e comparações começam em aquecimento. Depois de
+# QUICKEN_AFTER execuções com dois ints a instrução é reescrita no segmento
+# na forma especializada (operandos já extraídos, guarda de tipo); depois de
+# QUICKEN_AFTER execuções com outros tipos, ou de DEOPT_AFTER falhas da
+# guarda, fica de vez no caminho genérico.
+QUICKEN_AFTER = 8
+DEOPT_AFTER = 16
+
+# Campos das estatísticas de quickening de cada operação. Durante a execução,
+# HITS conta as execuções da forma especializada, e só com count_hits ligado
+# (custa um incremento por execução); quicken_report desconta as falhas.
+SPECIALIZED, GENERIC, HITS, MISSES, DEOPTS = range(5)
+
+
+class Segment:
+    """Trecho de código ligado e imutável: uma entrada do REPL, um arquivo carregado...
+
+    Os saltos apontam para posições dentro do próprio segmento; as funções
+    definidas nele guardam uma referência ao segmento, que fica vivo
+    enquanto alguma delas existir. Só os handlers mudam, quando uma
+    instrução é especializada (quicken).
+    """
+    __slots__ = ('code', 'handlers')
+
+    def __init__(self, code, handlers):
+        self.code = code           # Instruções ligadas: Tupla
+        self.handlers = handlers   # Handler pré-decodificado de cada instrução: List
+
+
 class Interpreter:
-    def __init__(self):
-        self.memory = {}           # Memória para variáveis temporárias e parâmetros: Dicionário {string: int/array/boolean/etc.}
-        self.functions = {}        # Dicionário de funções definidas: Dicionário {string: int}
-        self.call_stack = []       # Pilha de argumentos para chamadas de função: Array [int/array/boolean/etc.]
-        self.label_positions = {}  # Cache de posições de labels: Dicionário {string: int}
-        self.return_stack = []     # Pilha de retorno (PC, memória): Aray [dicionário]
-        self.pc = 0                # Contador de programa: Int
-        self.code = None           # Código atual sendo executado: List ou None
+    def __init__(self, cache=None, opt_level=0, inline_size=INLINE_SIZE):
+        self.cache = cache         # Cache de código intermediário para LOAD: CompileCache ou None
+        self.opt_level = opt_level # Nível de otimização do código carregado por LOAD: Int
+        self.inline_size = inline_size # Tamanho máximo das funções expandidas em linha no código carregado: Int
+        self.frame = []            # Frame atual: slots de parâmetros, temporários e constantes: List [int/array/boolean/etc.]
+        self.functions = {}        # Dicionário de funções definidas: Dicionário {string: dicionário}
+        self.call_stack = []       # Pilha de argumentos (compartilhada por todas as chamadas): Array [int/array/boolean/etc.]
+        self.return_stack = []     # Pilha de retorno: Array [tupla (segmento, PC do CALL, frame do chamador, slot do resultado)]
+        self.pc = 0                # Contador de programa (posição em self.segment): Int
+        self.segment = None        # Segmento em execução: Segment ou None
         self.last_result = None    # Último resultado calculado: int/array/boolean/etc.
+        self.error = None          # Erro que encerrou a última execução (None se terminou): Exception
+        self.quicken_stats = {}    # Quickening por operação: Dicionário {string: lista [especializadas, genéricas, acertos, falhas, desotimizadas]}
+        self.count_hits = False    # Conta os acertos das formas especializadas (para :stats e benchmarks): Bool
 
     # ==============================
     #     Método Principal
     # ==============================
     
     def execute(self, code):
-        """Executa o código intermediário."""
-        # Preserva funções já definidas e código anterior
-        preserved_functions = self.functions.copy()
-        preserved_code = self.code if self.code else []
-        
-        # Mescla código anterior com novo código
-        self.code = preserved_code + code
-        self.memory = {}
+        """Executa o código intermediário.
+
+        O código vira um segmento próprio: o custo não depende do código
+        executado antes. Depois da execução só fica retido o segmento que
+        define funções (referenciado por elas).
+        """
+        # Troca os operandos por slots do frame
+        code, template = allocate_slots(code)
+        return self.execute_allocated(code, template)
+    
+    def execute_allocated(self, code, template):
+        """Executa código já alocado (ex.: lido de um .lispc), com o molde do frame de nível superior."""
+        # Liga o código e registra suas funções (só o código novo é percorrido)
+        return self.run_segment(self.add_segment(code), template)
+    
+    def run_segment(self, segment, template):
+        """Executa um segmento já registrado do início, com um frame novo."""
+        self.segment = segment
+        self.frame = make_template(template)
         self.call_stack = []
         self.return_stack = []
-        self.label_positions = {}
-        self.pc = len(preserved_code)  # Começa após código copiado
+        self.pc = 0
         self.last_result = None
+        self.error = None
         
-        # Restaura funções copiadas
-        self.functions = preserved_functions
-        
-        # PRIMEIRA PASSAGEM: Mapear labels
-        self.map_labels(code)
-        
-        # PRIMEIRA PASSAGEM: Registrar funções
-        self.register_functions(code)
-        
-        # SEGUNDA PASSAGEM: Executar
-        while self.pc < len(self.code):
-            instr = self.code[self.pc]
-            op = instr[0]
-            
-            # Pular definições de função durante execução principal
-            if op == 'FUNC_BEGIN':
-                self.jump_to_function_end(instr[1])
-                continue
-            
-            # Executar instrução
-            try:
-                should_continue = self.execute_instruction(instr)
-                if should_continue:
-                    self.pc += 1
-            except Exception as e:
-                print(f"Erro na instrução {self.pc}: {instr}")
-                print(f"Erro: {e}")
-                break
+        try:
+            self.run()
+        except Exception as e:
+            self.error = e
+            print(f"Erro na instrução {self.pc}: {self.segment.code[self.pc]}")
+            print(f"Erro: {e}")
         
         return self.last_result
+    
+    def run(self):
+        """Laço principal: executa a partir de self.pc até o fim do segmento.
+
+        Cada passo é uma única chamada ao handler pré-decodificado da
+        instrução, que retorna True se o PC deve avançar, False se já o
+        mudou e None se também mudou o segmento (chamadas e retornos).
+        """
+        segment = self.segment
+        code = segment.code
+        handlers = segment.handlers
+        end = len(code)
+        while self.pc < end:
+            pc = self.pc
+            step = handlers[pc](code[pc])
+            if step:
+                self.pc = pc + 1
+            elif step is None:
+                segment = self.segment
+                code = segment.code
+                handlers = segment.handlers
+                end = len(code)
 
     # ==============================
-    #     Mapeamento e Registro
+    #     Segmentos e Registro
     # ==============================
     
-    def map_labels(self, code):
-        """Mapeia todas as labels para suas posições no código."""
-        self.label_positions = {}
-        for i, instr in enumerate(self.code):
-            if instr[0] == 'LABEL':
-                label = instr[3]
-                self.label_positions[label] = i
+    def add_segment(self, code):
+        """Liga o código já alocado em um segmento novo e registra suas funções."""
+        code = tuple(link(code))
+        segment = Segment(code, [self.decode(instr) for instr in code])
+        self.register_functions(segment)
+        return segment
     
-    def register_functions(self, code):
-        """Registra todas as funções definidas no código."""
+    def register_functions(self, segment):
+        """Registra as funções definidas no segmento."""
         current_func = None
-        for i, instr in enumerate(self.code):
+        for i, instr in enumerate(segment.code):
             op = instr[0]
             
             if op == 'FUNC_BEGIN':
                 current_func = {
                     'name': instr[1],
+                    'segment': segment,
                     'start': i,
                     'params': [],
+                    'template': make_template(instr[2] or ()),
                     'end': -1
                 }
             elif op == 'PARAM_DEF' and current_func:
                 current_func['params'].append(instr[1])
             elif op == 'FUNC_END' and current_func and instr[1] == current_func['name']:
                 current_func['end'] = i
+                # Primeira instrução do corpo (após FUNC_BEGIN e os PARAM_DEF)
+                current_func['entry'] = current_func['start'] + 1 + len(current_func['params'])
+                current_func['arity'] = len(current_func['params'])
                 self.functions[current_func['name']] = current_func
-                # Armazena descritor na memória para persistência
-                self.memory[current_func['name']] = {
-                    '__type__': 'function',
-                    'name': current_func['name'],
-                    'start': current_func['start'],
-                    'end': current_func['end'],
-                    'params': list(current_func['params'])
-                }
                 current_func = None
     
     # ==============================
     #     Execução de Instruções
     # ==============================
     
+    def decode(self, instr):
+        """Pré-decodifica a instrução: retorna o handler que a executa.
+
+        O handler recebe a instrução e retorna True se o PC deve avançar.
+        """
+        op = instr[0]
+        handler = self.HANDLERS.get(op)
+        if handler is not None:
+            return MethodType(handler, self)
+        if op in ARITHMETIC:
+            return self.make_arithmetic(instr)
+        if op.startswith('CMP_'):
+            return self.make_comparison(instr)
+        if op.startswith('IF_CMP_') or op.startswith('IF_NOT_CMP_'):
+            return self.make_branch(instr)
+        if op in ARGS_OPS:
+            return self.make_call(instr)
+        return self.execute_unknown
+    
     def execute_instruction(self, instr):
         """Executa uma única instrução. Retorna True se deve continuar."""
-        op = instr[0]
-        
-        if op == 'RESULT':
-            result = self.get_value(instr[1])
-            self.last_result = result
-            print(f"=> {self.format_result(result)}")
-            return True
-            
-        elif op == 'ASSIGN':
-            self.memory[instr[3]] = self.get_value(instr[1])
-            return True
-            
-        elif op in ['+', '-', '*', '/', 'floor', 'mod', 'expt']:
-            self.execute_arithmetic(instr)
-            return True
-            
-        elif op.startswith('CMP_'):
-            self.execute_comparison(instr)
-            return True
-            
-        elif op == 'CONS':
-            self.execute_cons(instr)
-            return True
-            
-        elif op == 'CAR':
-            self.execute_car(instr)
-            return True
-            
-        elif op == 'CDR':
-            self.execute_cdr(instr)
-            return True
-            
-        elif op == 'IF_TRUE_GOTO':
-            return self.execute_if_true_goto(instr)
-            
-        elif op == 'GOTO':
-            return self.execute_goto(instr)
-            
-        elif op == 'LABEL':
-            # Labels não fazem nada na execução
-            return True
-            
-        elif op == 'PARAM':
-            self.execute_param(instr)
-            return True
-            
-        elif op == 'CALL':
-            self.execute_call(instr)
-            return True
-            
-        elif op == 'LOAD':
-            self.execute_load(instr)
-            return True
-            
-        elif op == 'RETURN':
-            self.execute_return(instr)
-            return False  # Não incrementa PC após RETURN
-            
-        elif op == 'FUNC_BEGIN':
-            # Não deve acontecer aqui - tratado no execute principal
-            return True
-            
-        elif op == 'FUNC_END':
-            # Não deve acontecer aqui - tratado no execute principal
-            return True
-            
-        elif op == 'PARAM_DEF':
-            # Não deve acontecer aqui - tratado no register_functions
-            return True
-            
-        else:
-            print(f"AVISO: Instrução não reconhecida: {op}")
-            return True
+        return self.decode(instr)(instr)
 
     # ==============================
     #     Execução Específica
     # ==============================
     
-    def execute_arithmetic(self, instr):
-        """Executa operação aritmética."""
-        op = instr[0]
-        left = self.get_value(instr[1])
-        right = self.get_value(instr[2])
-        result_var = instr[3]
-        
-        # Garantir que são números
-        if not isinstance(left, (int, float)):
-            left = 0
-        if not isinstance(right, (int, float)):
-            right = 0
-        
-        if op == '+':
-            result = left + right
-        elif op == '-':
-            result = left - right
-        elif op == '*':
-            result = left * right
-        elif op == '/':
-            result = left // right if right != 0 else 0
-        elif op == 'floor':
-            result = left // right if right != 0 else 0
-        elif op == 'mod':
-            result = left % right if right != 0 else 0
-        elif op == 'expt':
-            result = left ** right
-        else:
-            result = 0
-        
-        self.memory[result_var] = result
+    def execute_result(self, instr):
+        """Executa RESULT (imprime o valor de uma expressão de nível superior)."""
+        result = self.frame[instr[1]]
+        self.last_result = result
+        print(f"=> {self.format_result(result)}")
+        return True
     
-    def execute_comparison(self, instr):
-        """Executa operação de comparação."""
-        op = instr[0]
-        left = self.get_value(instr[1])
-        right = self.get_value(instr[2])
-        result_var = instr[3]
-        
-        cmp_op = op[4:]  # Remove 'CMP_'
-        
-        if cmp_op == '=' or cmp_op == 'eq' or cmp_op == 'num_eq':
-            result = left == right
-        elif cmp_op == '/=' or cmp_op == 'num_neq':
-            result = left != right
-        elif cmp_op == '>':
-            result = left > right
-        elif cmp_op == '>=':
-            result = left >= right
-        elif cmp_op == '<':
-            result = left < right
-        elif cmp_op == '<=':
-            result = left <= right
-        elif cmp_op == 'eql':
-            result = left == right
-        elif cmp_op == 'equal':
-            result = left == right
-        elif cmp_op == 'equalp':
-            result = str(left).lower() == str(right).lower()
-        else:
-            result = False
+    def execute_assign(self, instr):
+        """Executa ASSIGN (cópia de valor)."""
+        frame = self.frame
+        frame[instr[3]] = frame[instr[1]]
+        return True
+    
+    def execute_nop(self, instr):
+        """PARAM_DEF e FUNC_END não fazem nada na execução."""
+        return True
+    
+    def execute_unknown(self, instr):
+        print(f"AVISO: Instrução não reconhecida: {instr[0]}")
+        return True
+    
+    def make_arithmetic(self, instr):
+        """Handler de uma operação aritmética, com a operação já resolvida."""
+        func = ARITHMETIC[instr[0]]
+        
+        def arithmetic(instr):
+            frame = self.frame
+            left = frame[instr[1]]
+            right = frame[instr[2]]
+            
+            # Garantir que são números
+            if not isinstance(left, (int, float)):
+                left = 0
+            if not isinstance(right, (int, float)):
+                right = 0
+            
+            frame[instr[3]] = func(left, right)
+            return True
+        return self.make_warmup(instr, arithmetic, self.make_int_arithmetic)
+    
+    def make_comparison(self, instr):
+        """Handler de uma comparação, com a operação já resolvida."""
+        func = COMPARISONS.get(instr[0], _false)
         
-        self.memory[result_var] = result
+        def comparison(instr):
+            frame = self.frame
+            frame[instr[3]] = func(frame[instr[1]], frame[instr[2]])
+            return True
+        if instr[0] not in COMPARISONS:
+            return comparison
+        return self.make_warmup(instr, comparison, self.make_int_comparison)
+    
+    # ==============================
+    #     Quickening
+    # ==============================
+    
+    def make_warmup(self, instr, generic, specialize):
+        """Handler de aquecimento: executa o genérico e observa os tipos dos operandos.
+
+        Depois de QUICKEN_AFTER execuções com dois ints troca a si mesmo pela
+        forma especializada; depois de QUICKEN_AFTER com outros tipos, pelo genérico.
+        """
+        a1 = instr[1]
+        a2 = instr[2]
+        stats = self.quicken_stats.setdefault(instr[0], [0] * 5)
+        ints = others = 0
+        
+        def warmup(instr):
+            nonlocal ints, others
+            frame = self.frame
+            if type(frame[a1]) is int and type(frame[a2]) is int:
+                ints += 1
+                if ints == QUICKEN_AFTER:
+                    stats[SPECIALIZED] += 1
+                    handler = specialize(instr, generic, stats)
+                    if self.count_hits:
+                        handler = self.count_executions(handler, stats)
+                    self.quicken(instr, handler)
+            else:
+                others += 1
+                if others == QUICKEN_AFTER:
+                    stats[GENERIC] += 1
+                    self.quicken(instr, generic)
+            return generic(instr)
+        return warmup
+    
+    def make_int_arithmetic(self, instr, generic, stats):
+        """Forma especializada de uma operação aritmética para dois ints."""
+        func = ARITHMETIC[instr[0]]
+        a1, a2, res = instr[1], instr[2], instr[3]
+        misses = 0
+        
+        def int_arithmetic(instr):
+            frame = self.frame
+            left = frame[a1]
+            right = frame[a2]
+            if type(left) is int and type(right) is int:
+                frame[res] = func(left, right)
+                return True
+            # Falha da guarda: caminho genérico (e, após DEOPT_AFTER falhas, de vez)
+            nonlocal misses
+            misses += 1
+            stats[MISSES] += 1
+            if misses == DEOPT_AFTER:
+                stats[DEOPTS] += 1
+                self.quicken(instr, generic)
+            return generic(instr)
+        return int_arithmetic
+    
+    def make_int_comparison(self, instr, generic, stats):
+        """Forma especializada de uma comparação para dois ints."""
+        func = INT_COMPARISONS[instr[0]]
+        a1, a2, res = instr[1], instr[2], instr[3]
+        misses = 0
+        
+        def int_comparison(instr):
+            frame = self.frame
+            left = frame[a1]
+            right = frame[a2]
+            if type(left) is int and type(right) is int:
+                frame[res] = func(left, right)
+                return True
+            nonlocal misses
+            misses += 1
+            stats[MISSES] += 1
+            if misses == DEOPT_AFTER:
+                stats[DEOPTS] += 1
+                self.quicken(instr, generic)
+            return generic(instr)
+        return int_comparison
+    
+    def count_executions(self, handler, stats):
+        """Forma especializada que conta as próprias execuções (ver HITS)."""
+        def counted(instr):
+            stats[HITS] += 1
+            return handler(instr)
+        return counted
+    
+    def quicken(self, instr, handler):
+        """Troca o handler da instrução em execução (self.pc no segmento atual)."""
+        segment = self.segment
+        if segment is not None and self.pc < len(segment.code) and segment.code[self.pc] is instr:
+            segment.handlers[self.pc] = handler
+    
+    def quicken_report(self):
+        """Estatísticas de quickening por operação.
+
+        Retorna tuplas (operação, especializadas, genéricas, acertos, falhas, desotimizadas);
+        acertos é None se count_hits estava desligado.
+        """
+        rows = []
+        for op, (specialized, generic, executed, misses, deopts) in sorted(self.quicken_stats.items()):
+            if specialized or generic or misses or deopts:
+                hits = executed - misses if self.count_hits else None
+                rows.append((op, specialized, generic, hits, misses, deopts))
+        return rows
     
     def execute_cons(self, instr):
-        """Executa CONS (construção de lista)."""
-        a = self.get_value(instr[1])
-        b = self.get_value(instr[2])
-        result_var = instr[3]
-        
-        # Se b é uma lista, adiciona a no início
-        if isinstance(b, list):
-            result = [a] + b
-        # Se b é nil, cria lista com um elemento
-        elif b == [] or b == 'nil':
-            result = [a]
-        # Caso contrário, cria par (cons cell)
-        else:
-            result = [a, b]
-        
-        self.memory[result_var] = result
+        """Executa CONS (novo par; o cdr é compartilhado, não copiado)."""
+        frame = self.frame
+        frame[instr[3]] = Pair(frame[instr[1]], frame[instr[2]])
+        return True
+    
+    def execute_list(self, instr):
+        """Executa LIST (lista com os argumentos empilhados por PARAM)."""
+        self.frame[instr[3]] = from_list(self.pop_args(instr[2]))
+        return True
     
     def execute_car(self, instr):
-        """Executa CAR (primeiro elemento da lista)."""
-        val = self.get_value(instr[1])
-        result_var = instr[3]
-        
-        if isinstance(val, list) and len(val) > 0:
-            result = val[0]
-        else:
-            result = []
-        
-        self.memory[result_var] = result
+        """Executa CAR (primeiro elemento do par; de nil ou átomo, nil)."""
+        frame = self.frame
+        val = frame[instr[1]]
+        frame[instr[3]] = val.car if type(val) is Pair else []
+        return True
     
     def execute_cdr(self, instr):
-        """Executa CDR (resto da lista)."""
-        val = self.get_value(instr[1])
-        result_var = instr[3]
-        
-        if isinstance(val, list) and len(val) > 0:
-            result = val[1:] if len(val) > 1 else []
-        else:
-            result = []
-        
-        self.memory[result_var] = result
+        """Executa CDR (resto da lista; de nil ou átomo, nil)."""
+        frame = self.frame
+        val = frame[instr[1]]
+        frame[instr[3]] = val.cdr if type(val) is Pair else []
+        return True
     
     def execute_if_true_goto(self, instr):
-        """Executa IF_TRUE_GOTO (salto condicional)."""
-        cond = self.get_value(instr[1])
-        label = instr[3]
-        
-        if cond:
-            self.jump_to_label(label)
+        """Executa IF_TRUE_GOTO (salto condicional para a posição já ligada)."""
+        if self.frame[instr[1]]:
+            self.pc = instr[3]
+            return False  # Não incrementa PC
+        return True  # Incrementa PC normalmente
+    
+    def execute_if_false_goto(self, instr):
+        """Executa IF_FALSE_GOTO (salta se a condição for falsa)."""
+        if not self.frame[instr[1]]:
+            self.pc = instr[3]
             return False  # Não incrementa PC
         return True  # Incrementa PC normalmente
     
     def execute_goto(self, instr):
-        """Executa GOTO (salto incondicional)."""
-        label = instr[3]
-        self.jump_to_label(label)
+        """Executa GOTO (salto incondicional para a posição já ligada)."""
+        self.pc = instr[3]
         return False  # Não incrementa PC
     
     def execute_param(self, instr):
         """Empilha parâmetro para chamada de função."""
-        val = self.get_value(instr[1])
-        self.call_stack.append(val)
+        self.call_stack.append(self.frame[instr[1]])
+        return True
     
     def execute_call(self, instr):
         """Executa CALL (chamada de função)."""
         func_name = instr[1]
         num_args = instr[2]
         result_var = instr[3]
+        args = self.pop_args(num_args)
         
         # Verifica se função existe
-        if func_name not in self.functions:
+        func = self.functions.get(func_name)
+        if func is None:
             print(f"ERRO: Função '{func_name}' não definida")
-            self.memory[result_var] = []
+            self.frame[result_var] = []
             return True
         
-        # Desempilha argumentos (em ordem reversa pois foi empilhado)
-        args = []
-        for _ in range(num_args):
-            if self.call_stack:
-                args.insert(0, self.call_stack.pop())
-            else:
-                args.insert(0, [])
+        # Pilha de retorno: só o ponto de retorno e o frame do chamador, que
+        # a chamada não altera (os argumentos já saíram de call_stack)
+        self.return_stack.append((self.segment, self.pc, self.frame, result_var))
         
-        # Salva estado atual
-        saved_pc = self.pc
-        saved_memory = self.memory.copy()
-        saved_call_stack = self.call_stack.copy()
+        # Novo frame: só os parâmetros e temporários da função chamada
+        self.frame = self.new_frame(func, args)
         
-        # Adiciona à pilha de retorno
-        self.return_stack.append({
-            'pc': saved_pc,
-            'memory': saved_memory,
-            'call_stack': saved_call_stack,
-            'result_var': result_var
-        })
+        # Pula para a primeira instrução do corpo, no segmento da função
+        self.segment = func['segment']
+        self.pc = func['entry']
+        return None  # Não incrementa PC; segmento mudou
+    
+    def execute_tail_call(self, instr):
+        """Executa TAIL_CALL: chamada em posição de cauda, reaproveitando o frame atual."""
+        func_name = instr[1]
+        args = self.pop_args(instr[2])
         
-        # Configura novo ambiente (preserva funções)
-        func_descriptors = {k: v for k, v in self.memory.items() 
-                           if isinstance(v, dict) and v.get('__type__') == 'function'}
-        self.memory = func_descriptors
-        self.call_stack = []
+        func = self.functions.get(func_name)
+        if func is None:
+            print(f"ERRO: Função '{func_name}' não definida")
+            # Sem função, a chamada vale nil e retorna direto ao chamador
+            return self.return_value([])
+        
+        # Novo frame no lugar do atual: nada é empilhado em return_stack,
+        # então o RETURN da função chamada volta direto ao chamador original
+        self.frame = self.new_frame(func, args)
+        self.segment = func['segment']
+        self.pc = func['entry']
+        return None  # Não incrementa PC; segmento mudou
+    
+    def make_branch(self, instr):
+        """Handler de IF_CMP_x (salta se a comparação é verdadeira) e de
+        IF_NOT_CMP_x (salta se é falsa): compara sem temporário."""
+        op = instr[0]
+        a1, a2, target = instr[1], instr[2], instr[3]
+        
+        if op.startswith('IF_NOT_'):
+            func = COMPARISONS[op[7:]]
+            
+            def branch_not(instr):
+                frame = self.frame
+                if not func(frame[a1], frame[a2]):
+                    self.pc = target
+                    return False  # Não incrementa PC
+                return True
+            return branch_not
         
-        # Mapeia parâmetros para variáveis locais
-        func = self.functions[func_name]
-        for param, arg in zip(func['params'], args):
-            self.memory[param] = arg
+        func = COMPARISONS[op[3:]]
         
-        # Pula para início da função (próxima instrução após FUNC_BEGIN)
-        self.pc = func['start'] + 1
-        return False  # Não incrementa PC
+        def branch(instr):
+            frame = self.frame
+            if func(frame[a1], frame[a2]):
+                self.pc = target
+                return False  # Não incrementa PC
+            return True
+        return branch
+    
+    def make_call(self, instr):
+        """Handler de CALL_ARGS/TAIL_CALL_ARGS: os argumentos vêm direto do frame
+        do chamador para o novo frame, sem passar por call_stack."""
+        name, args, result_var = instr[1], instr[2], instr[3]
+        argc = len(args)
+        first = args[0] if args else None
+        
+        def new_frame(func):
+            frame = self.frame
+            if func['arity'] != argc:
+                return self.new_frame(func, [frame[a] for a in args])
+            new = func['template'].copy()
+            if argc == 1:
+                new[0] = frame[first]
+            else:
+                new[:argc] = [frame[a] for a in args]
+            return new
+        
+        def call(instr):
+            func = self.functions.get(name)
+            if func is None:
+                print(f"ERRO: Função '{name}' não definida")
+                self.frame[result_var] = []
+                return True
+            # Como em execute_call
+            new = new_frame(func)
+            self.return_stack.append((self.segment, self.pc, self.frame, result_var))
+            self.frame = new
+            self.segment = func['segment']
+            self.pc = func['entry']
+            return None  # Não incrementa PC; segmento mudou
+        
+        def tail_call(instr):
+            func = self.functions.get(name)
+            if func is None:
+                print(f"ERRO: Função '{name}' não definida")
+                return self.return_value([])
+            # Como em execute_tail_call
+            self.frame = new_frame(func)
+            self.segment = func['segment']
+            self.pc = func['entry']
+            return None  # Não incrementa PC; segmento mudou
+        
+        return tail_call if instr[0] == 'TAIL_CALL_ARGS' else call
     
     def execute_return(self, instr):
         """Executa RETURN (retorno de função)."""
-        return_value = self.get_value(instr[1])
-        
+        return self.return_value(self.frame[instr[1]])
+    
+    def return_value(self, return_value):
+        """Retorna da função atual com o valor dado."""
         if not self.return_stack:
             # RETURN no nível principal
             self.last_result = return_value
-            self.pc = len(self.code)  # Termina execução
-            return
-        
-        # Restaura estado anterior
-        saved_state = self.return_stack.pop()
-        
-        # Restaura memória e pilha
-        self.memory = saved_state['memory']
-        self.call_stack = saved_state['call_stack']
-        
-        # Armazena valor de retorno
-        self.memory[saved_state['result_var']] = return_value
+            self.pc = len(self.segment.code)  # Termina execução
+            return None
         
-        # Retorna para ponto de chamada
-        self.pc = saved_state['pc'] + 1
+        # Restaura o segmento e o frame do chamador, guarda o valor de
+        # retorno e volta para a instrução seguinte ao CALL
+        self.segment, pc, self.frame, result_var = self.return_stack.pop()
+        self.frame[result_var] = return_value
+        self.pc = pc + 1
+        return None  # Não incrementa PC; segmento mudou
+    
+    def execute_func_begin(self, instr):
+        """Definições de função são puladas na execução do nível superior."""
+        self.pc = instr[3]  # Posição após o FUNC_END (ver codegen.link)
+        return False
     
     # ==============================
     #     Utilitários
     # ==============================
     
-    def jump_to_label(self, label):
-        """Salta para uma label."""
-        if label in self.label_positions:
-            self.pc = self.label_positions[label]
-        else:
-            print(f"ERRO: Label '{label}' não encontrada")
-            self.pc = len(self.code)  # Termina execução
-    
-    def jump_to_function_end(self, func_name):
-        """Pula para o final de uma função."""
-        if func_name in self.functions:
-            func = self.functions[func_name]
-            self.pc = func['end'] + 1
-        else:
-            # Procura FUNC_END correspondente
-            while self.pc < len(self.code):
-                instr = self.code[self.pc]
-                if instr[0] == 'FUNC_END' and instr[1] == func_name:
-                    self.pc += 1
-                    break
-                self.pc += 1
+    def pop_args(self, num_args):
+        """Desempilha os num_args argumentos do topo de call_stack, na ordem de empilhamento."""
+        call_stack = self.call_stack
+        if not num_args:
+            return []
+        args = call_stack[-num_args:]
+        del call_stack[-num_args:]
+        # Argumentos faltando valem nil
+        if len(args) < num_args:
+            args[:0] = [[]] * (num_args - len(args))
+        return args
+    
+    def new_frame(self, func, args):
+        """Cria o frame de uma chamada, com os argumentos nos slots dos parâmetros."""
+        frame = func['template'].copy()
+        num_params = len(func['params'])
+        if len(args) < num_params:
+            # Parâmetros sem argumento valem nil
+            args = args + [[]] * (num_params - len(args))
+        frame[:num_params] = args[:num_params]
+        return frame
     
     def get_value(self, val):
-        """Resolve o valor real de uma variável ou literal."""
-        # Se for None, retorna None
-        if val is None:
-            return None
-        
-        # Se for número ou booleano Python
-        if isinstance(val, (int, float, bool)):
-            return val
-        
-        # Se for string
-        if isinstance(val, str):
-            # nil ou NIL -> lista vazia
-            if val.lower() == 'nil':
-                return []
-            # T -> True
-            if val.upper() == 'T':
-                return True
-            # Variável temporária ou parâmetro
-            if val in self.memory:
-                # Resolve recursivamente
-                resolved = self.memory[val]
-                if resolved == val:  # Evitar loop infinito
-                    return resolved
-                return self.get_value(resolved)
-            # Outra string literal
-            return val
-        
-        # Se for lista
-        if isinstance(val, list):
-            return [self.get_value(item) for item in val]
-        
-        # Tipo não reconhecido
-        return val
+        """Resolve o valor real de um operando: slot do frame ou constante.
+
+        Fora do caminho de execução: os handlers leem os slots diretamente.
+        """
+        if type(val) is Slot:
+            return self.frame[val]
+        return runtime_value(val)
     
     def format_result(self, result):
         """Formata resultado para impressão no estilo Lisp."""
-        if result is None:
-            return "NIL"
-        elif result == []:
-            return "NIL"
-        elif result is True:
-            return "T"
-        elif isinstance(result, list):
-            return self.format_list(result)
-        else:
-            return str(result)
-    
-    def format_list(self, lst):
-        """Formata lista no estilo Lisp."""
-        if not lst:
-            return "NIL"
-        
-        # Verifica se é uma lista própria ou cons cell
-        if len(lst) == 2 and not isinstance(lst[1], list):
-            return f"({lst[0]} . {self.format_result(lst[1])})"
-        
-        items = [self.format_result(item) for item in lst]
-        return f"({' '.join(items)})"
+        return format_value(result)
     
     # ==============================
     #     Interface Pública
@@ -483,31 +642,33 @@ class Interpreter:
             print(f"ERRO: Função '{func_name}' não definida")
             return []
         
-        # Simula CALL
-        temp_result = "t_result"
+        # Simula CALL, com o resultado no único slot de um frame temporário
+        temp_result = Slot(0)
         fake_instr = ('CALL', func_name, len(args), temp_result)
+        self.frame = [None]
         
-        # Empilha argumentos em ordem reversa
-        for arg in reversed(args):
-            self.call_stack.append(arg)
+        # Empilha argumentos na ordem (execute_call desempilha do fim);
+        # listas do Python viram listas encadeadas
+        for arg in args:
+            self.call_stack.append(runtime_value(arg))
         
         # Executa a chamada
+        depth = len(self.return_stack)
         self.execute_call(fake_instr)
         
-        # Continua execução até RETURN
-        while self.pc < len(self.code):
-            instr = self.code[self.pc]
-            if instr[0] == 'RETURN':
-                self.execute_return(instr)
-                break
-            self.execute_instruction(instr)
-            self.pc += 1
+        # Continua execução até o RETURN desta chamada (chamadas internas,
+        # inclusive as de cauda, empilham e desempilham seus próprios frames)
+        while len(self.return_stack) > depth:
+            segment = self.segment
+            pc = self.pc
+            if segment.handlers[pc](segment.code[pc]):
+                self.pc = pc + 1
         
         # Obtém resultado
         result = self.get_value(temp_result)
         
         # Limpa para próxima execução
-        self.memory = {}
+        self.frame = []
         self.call_stack = []
         self.return_stack = []
         
@@ -515,21 +676,28 @@ class Interpreter:
     
     def reset(self):
         """Reseta o interpretador para estado inicial."""
-        self.__init__()
+        self.__init__(self.cache, self.opt_level, self.inline_size)
     
     def print_state(self):
         """Imprime estado atual do interpretador (para debug)."""
         print(f"\n=== Estado do Interpretador ===")
         print(f"PC: {self.pc}")
-        print(f"Memória: {self.memory}")
+        print(f"Frame: {self.frame}")
         print(f"Pilha de Chamada: {self.call_stack}")
         print(f"Pilha de Retorno: {len(self.return_stack)} frames")
         print(f"Funções: {list(self.functions.keys())}")
     
     def execute_load(self, instr):
         """Executa LOAD (carregamento de arquivo)."""
-        filename = self.get_value(instr[1])
+        filename = instr[1]
         result_var = instr[3]
+        saved_segment = self.segment
+        saved_pc = self.pc
+        saved_frame = self.frame
+        # Profundidade das pilhas: um erro no arquivo pode deixar chamadas e
+        # argumentos (PARAM) dele empilhados
+        saved_returns = len(self.return_stack)
+        saved_args = len(self.call_stack)
         
         try:
             # Adicionar extensão .lisp se não tiver
@@ -540,8 +708,8 @@ class Interpreter:
             import os
             if not os.path.exists(filename):
                 print(f"ERRO: Arquivo '{filename}' não encontrado")
-                self.memory[result_var] = []
-                return
+                self.frame[result_var] = []
+                return True
             
             # Ler arquivo
             with open(filename, 'r', encoding='utf-8') as f:
@@ -549,52 +717,75 @@ class Interpreter:
             
             print(f"Carregando arquivo: {filename}")
             
-            # Compilar código do arquivo
-           
-            lexer.input(lisp_code)
-            ast = parser.parse(lisp_code, lexer=lexer)
+            # Código intermediário do cache, se o arquivo não mudou
+            key = self.cache.key(lisp_code, options_tag(self.opt_level, self.inline_size)) if self.cache else None
+            new_code = self.cache.get(key) if self.cache else None
             
-            if ast is None:
-                print(f"ERRO: Falha ao analisar arquivo '{filename}'")
-                self.memory[result_var] = []
-                return
-            
-            # Gerar código intermediário
-            codegen = CodeGenerator()
-            new_code = codegen.generate(ast)
-            
-            # Mesclar com código atual
-            old_pc = self.pc
-            self.code.extend(new_code)
+            if new_code is None:
+                # Compilar código do arquivo
+                ast = get_parser().parse(lisp_code, lexer=get_lexer())
+                
+                if ast is None:
+                    print(f"ERRO: Falha ao analisar arquivo '{filename}'")
+                    self.frame[result_var] = []
+                    return True
+                
+                # Gerar código intermediário
+                codegen = CodeGenerator()
+                new_code = codegen.generate(ast)
+                new_code, _ = optimize(new_code, self.opt_level, self.inline_size)
+                
+                if self.cache:
+                    self.cache.put(key, new_code)
             
-            # Mapear labels e registrar funções do novo código
-            self.map_labels(new_code)
-            self.register_functions(new_code)
+            # Slots do código carregado: o nível superior do arquivo tem frame próprio
+            new_code, template = allocate_slots(new_code)
+            self.frame = make_template(template)
             
-            # Executar novo código
-            saved_pc = self.pc
-            self.pc = len(self.code) - len(new_code)  # Início do novo código
+            # O arquivo vira um segmento próprio, com suas funções registradas
+            self.segment = self.add_segment(new_code)
             
-            while self.pc < len(self.code):
-                instr = self.code[self.pc]
-                op = instr[0]
-                
-                if op == 'FUNC_BEGIN':
-                    self.jump_to_function_end(instr[1])
-                    continue
-                
-                should_continue = self.execute_instruction(instr)
-                if should_continue:
-                    self.pc += 1
-                else:
-                    break
+            # Executar o segmento do início ao fim
+            self.pc = 0
+            self.run()
             
-            # Restaurar PC
+            # Restaurar segmento, PC e frame
+            self.segment = saved_segment
             self.pc = saved_pc
+            self.frame = saved_frame
             
             print(f"Arquivo '{filename}' carregado com sucesso")
-            self.memory[result_var] = True  # Sucesso
+            self.frame[result_var] = True  # Sucesso
             
         except Exception as e:
             print(f"ERRO ao carregar arquivo '{filename}': {e}")
-            self.memory[result_var] = []
+            self.segment = saved_segment
+            self.pc = saved_pc
+            self.frame = saved_frame
+            del self.return_stack[saved_returns:]
+            del self.call_stack[saved_args:]
+            self.frame[result_var] = []
+        
+        return True
+    
+    # Tabela de despacho: operação -> handler (aritmética e comparações são
+    # montadas por make_arithmetic/make_comparison, já com a operação resolvida)
+    HANDLERS = {
+        'RESULT': execute_result,
+        'ASSIGN': execute_assign,
+        'CONS': execute_cons,
+        'LIST': execute_list,
+        'CAR': execute_car,
+        'CDR': execute_cdr,
+        'IF_TRUE_GOTO': execute_if_true_goto,
+        'IF_FALSE_GOTO': execute_if_false_goto,
+        'GOTO': execute_goto,
+        'PARAM': execute_param,
+        'CALL': execute_call,
+        'TAIL_CALL': execute_tail_call,
+        'LOAD': execute_load,
+        'RETURN': execute_return,
+        'FUNC_BEGIN': execute_func_begin,
+        'FUNC_END': execute_nop,
+        'PARAM_DEF': execute_nop,
+    }
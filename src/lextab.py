@@ -0,0 +1,10 @@
+# lextab.py. This file automatically created by PLY (version 3.11). Don't edit!
+_tabversion   = '3.10'
+_lextokens    = set(('AND', 'CAR', 'CDR', 'COND', 'CONS', 'DEFUN', 'DIVIDE', 'EQ', 'EQL', 'EQUAL', 'EQUALP', 'EXPT', 'FLOOR', 'GT', 'GTE', 'ID', 'IF', 'LIST', 'LOAD', 'LPAREN', 'LT', 'LTE', 'MINUS', 'MOD', 'NIL', 'NOT', 'NUM', 'NUM_EQ', 'NUM_NEQ', 'OR', 'PLUS', 'RPAREN', 'STRING', 'STRING_EQ', 'STRING_EQUAL', 'T', 'TIMES'))
+_lexreflags   = 64
+_lexliterals  = ''
+_lexstateinfo = {'INITIAL': 'inclusive'}
+_lexstatere   = {'INITIAL': [('(?P<t_NUM>\\d+)|(?P<t_STRING>\\"[^\\"]*\\")|(?P<t_SYMBOL>[a-zA-Z_][a-zA-Z_0-9-]*)|(?P<t_coment>;.*)|(?P<t_newline>\\n+)|(?P<t_GTE>>=)|(?P<t_LPAREN>\\()|(?P<t_LTE><=)|(?P<t_NUM_NEQ>/=)|(?P<t_PLUS>\\+)|(?P<t_RPAREN>\\))|(?P<t_TIMES>\\*)|(?P<t_DIVIDE>/)|(?P<t_GT>>)|(?P<t_LT><)|(?P<t_MINUS>-)|(?P<t_NUM_EQ>=)', [None, ('t_NUM', 'NUM'), ('t_STRING', 'STRING'), ('t_SYMBOL', 'SYMBOL'), ('t_coment', 'coment'), ('t_newline', 'newline'), (None, 'GTE'), (None, 'LPAREN'), (None, 'LTE'), (None, 'NUM_NEQ'), (None, 'PLUS'), (None, 'RPAREN'), (None, 'TIMES'), (None, 'DIVIDE'), (None, 'GT'), (None, 'LT'), (None, 'MINUS'), (None, 'NUM_EQ')])]}
+_lexstateignore = {'INITIAL': ' \t'}
+_lexstateerrorf = {'INITIAL': 't_error'}
+_lexstateeoff = {}
@@ -0,0 +1,217 @@
+# nodes.py - Nós da árvore sintática abstrata (AST)
+#
+# Cada nó tem uma tag inteira (kind), usada pelo codegen para despachar em
+# O(1), e o trecho do código fonte que o originou (start, end).
+
+# ===========================================
+#              TAGS DOS NÓS
+# ===========================================
+
+(NUM, SYMBOL, NIL, TRUE, DEFUN, IF, ARITH, COMPARE,
+ CONS, LIST, CAR, CDR, COND, CALL, LOAD) = range(15)
+
+KIND_NAMES = ('NUM', 'SYMBOL', 'NIL', 'TRUE', 'DEFUN', 'IF', 'ARITH', 'COMPARE',
+              'CONS', 'LIST', 'CAR', 'CDR', 'COND', 'CALL', 'LOAD')
+
+
+# ===========================================
+#                 BASE
+# ===========================================
+
+class Node:
+    __slots__ = ('start', 'end')
+    kind = None
+    fields = ()   # Campos mostrados no repr, na ordem do construtor
+
+    def span(self, start, end):
+        """Define o trecho do código fonte (offsets) e retorna o próprio nó."""
+        self.start = start
+        self.end = end
+        return self
+
+    def __repr__(self):
+        args = ', '.join(repr(getattr(self, f)) for f in self.fields)
+        return f"{type(self).__name__}({args})"
+
+
+# ===========================================
+#                 TERMOS
+# ===========================================
+
+class Num(Node):
+    __slots__ = ('value',)
+    kind = NUM
+    fields = ('value',)
+
+    def __init__(self, value, start=None, end=None):
+        self.value = value
+        self.start = start
+        self.end = end
+
+
+class Symbol(Node):
+    __slots__ = ('name',)
+    kind = SYMBOL
+    fields = ('name',)
+
+    def __init__(self, name, start=None, end=None):
+        self.name = name
+        self.start = start
+        self.end = end
+
+
+class Nil(Node):
+    __slots__ = ()
+    kind = NIL
+
+    def __init__(self, start=None, end=None):
+        self.start = start
+        self.end = end
+
+
+class T(Node):
+    __slots__ = ()
+    kind = TRUE
+
+    def __init__(self, start=None, end=None):
+        self.start = start
+        self.end = end
+
+
+# ===========================================
+#                 FUNÇÕES
+# ===========================================
+
+class Defun(Node):
+    __slots__ = ('name', 'params', 'body')
+    kind = DEFUN
+    fields = ('name', 'params', 'body')
+
+    def __init__(self, name, params, body, start=None, end=None):
+        self.name = name       # Nome da função (str)
+        self.params = params   # Parâmetros formais (lista de str)
+        self.body = body       # Corpo (nó)
+        self.start = start
+        self.end = end
+
+
+# ===========================================
+#                OPERAÇÕES
+# ===========================================
+
+class If(Node):
+    __slots__ = ('cond', 'then', 'else_')
+    kind = IF
+    fields = ('cond', 'then', 'else_')
+
+    def __init__(self, cond, then, else_, start=None, end=None):
+        self.cond = cond
+        self.then = then
+        self.else_ = else_
+        self.start = start
+        self.end = end
+
+
+class Arith(Node):
+    __slots__ = ('op', 'left', 'right')
+    kind = ARITH
+    fields = ('op', 'left', 'right')
+
+    def __init__(self, op, left, right, start=None, end=None):
+        self.op = op           # '+', '-', '*', '/', 'floor', 'mod' ou 'expt'
+        self.left = left
+        self.right = right
+        self.start = start
+        self.end = end
+
+
+class Compare(Node):
+    __slots__ = ('op', 'left', 'right')
+    kind = COMPARE
+    fields = ('op', 'left', 'right')
+
+    def __init__(self, op, left, right, start=None, end=None):
+        self.op = op           # 'eq', 'eql', 'equal', 'equalp', '=', '/=', '>', '>=', '<' ou '<='
+        self.left = left
+        self.right = right
+        self.start = start
+        self.end = end
+
+
+class Cons(Node):
+    __slots__ = ('car', 'cdr')
+    kind = CONS
+    fields = ('car', 'cdr')
+
+    def __init__(self, car, cdr, start=None, end=None):
+        self.car = car
+        self.cdr = cdr
+        self.start = start
+        self.end = end
+
+
+class List(Node):
+    __slots__ = ('items',)
+    kind = LIST
+    fields = ('items',)
+
+    def __init__(self, items, start=None, end=None):
+        self.items = items     # Lista de nós
+        self.start = start
+        self.end = end
+
+
+class Car(Node):
+    __slots__ = ('expr',)
+    kind = CAR
+    fields = ('expr',)
+
+    def __init__(self, expr, start=None, end=None):
+        self.expr = expr
+        self.start = start
+        self.end = end
+
+
+class Cdr(Node):
+    __slots__ = ('expr',)
+    kind = CDR
+    fields = ('expr',)
+
+    def __init__(self, expr, start=None, end=None):
+        self.expr = expr
+        self.start = start
+        self.end = end
+
+
+class Cond(Node):
+    __slots__ = ('clauses',)
+    kind = COND
+    fields = ('clauses',)
+
+    def __init__(self, clauses, start=None, end=None):
+        self.clauses = clauses  # Lista de tuplas (teste, corpo)
+        self.start = start
+        self.end = end
+
+
+class Call(Node):
+    __slots__ = ('name', 'args')
+    kind = CALL
+    fields = ('name', 'args')
+
+    def __init__(self, name, args, start=None, end=None):
+        self.name = name       # Nome da função chamada (str)
+        self.args = args       # Lista de nós
+        self.start = start
+        self.end = end
+
+
+class Load(Node):
+    __slots__ = ('filename',)
+    kind = LOAD
+    fields = ('filename',)
+
+    def __init__(self, filename, start=None, end=None):
+        self.filename = filename
+        self.start = start
+        self.end = end
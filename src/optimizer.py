@@ -0,0 +1,190 @@
+# optimizer.py - Otimizações sobre o código intermediário de três endereços
+#
+# Antes dos passos, as chamadas de funções pequenas da unidade são expandidas
+# em linha (ver inline.py).
+#
+# Passos (nível -O1), repetidos até não haver mais mudanças:
+#   - dobra de constantes: (+ 1 2) vira ASSIGN 3
+#   - propagação de cópias: usos de um temporário atribuído por ASSIGN
+#     passam a usar diretamente o valor copiado
+#   - eliminação de temporários mortos: instruções sem efeito colateral cujo
+#     resultado nunca é lido são removidas (as que podem falhar, só com
+#     operandos inteiros conhecidos: o erro faz parte do resultado)
+#   - simplificação do fluxo de controle sobre os blocos básicos (ver cfg.py):
+#     saltos sobre constantes, saltos para saltos, blocos inalcançáveis,
+#     blocos em linha reta e saltos para a instrução seguinte
+from cfg import simplify_cfg
+from codegen import is_temp, is_int, may_fail, NAME_OPS, ARITH_OPS, CMP_OPS
+from inline import inline_functions, INLINE_SIZE
+
+# Instruções sem efeito colateral: podem ser removidas se o resultado não for usado
+# (LIST não entra: desempilha os argumentos dos PARAM anteriores)
+PURE_OPS = frozenset(ARITH_OPS + CMP_OPS + ('ASSIGN', 'CONS', 'CAR', 'CDR'))
+
+# Instruções cujo campo res é um destino (nas demais é label ou vazio)
+WRITE_OPS = PURE_OPS | {'CALL', 'LOAD', 'LIST'}
+
+# Níveis de otimização disponíveis
+OPT_LEVELS = (0, 1)
+
+
+def options_tag(level, inline_size=INLINE_SIZE):
+    """Opções que mudam o código otimizado (parte da chave do cache)."""
+    return f"O{level}" if level <= 0 else f"O{level}i{inline_size}"
+
+
+# ==============================
+#     Avaliação de constantes
+# ==============================
+
+# Mesma semântica de Interpreter.execute_arithmetic
+def fold_arithmetic(op, left, right):
+    if op == '+':
+        return left + right
+    if op == '-':
+        return left - right
+    if op == '*':
+        return left * right
+    if op == '/' or op == 'floor':
+        return left // right if right != 0 else 0
+    if op == 'mod':
+        return left % right if right != 0 else 0
+    if op == 'expt':
+        # Expoente negativo gera float: deixa para o interpretador
+        return left ** right if right >= 0 else None
+    return None
+
+
+# Mesma semântica de Interpreter.execute_comparison
+def fold_comparison(op, left, right):
+    cmp_op = op[4:]
+    if cmp_op in ('=', 'eq', 'eql', 'equal'):
+        return left == right
+    if cmp_op == '/=':
+        return left != right
+    if cmp_op == '>':
+        return left > right
+    if cmp_op == '>=':
+        return left >= right
+    if cmp_op == '<':
+        return left < right
+    if cmp_op == '<=':
+        return left <= right
+    if cmp_op == 'equalp':
+        return str(left).lower() == str(right).lower()
+    return None
+
+
+# ==============================
+#     Passos
+# ==============================
+
+def operands(instr):
+    """Operandos lidos pela instrução."""
+    op = instr[0]
+    if op in NAME_OPS:
+        return ()
+    return (instr[1], instr[2])
+
+
+def constant_folding(code, stats):
+    result = []
+    for instr in code:
+        op, a1, a2, res = instr
+        if (op in ARITH_OPS or op in CMP_OPS) and is_int(a1) and is_int(a2):
+            value = fold_arithmetic(op, a1, a2) if op in ARITH_OPS else fold_comparison(op, a1, a2)
+            if value is not None:
+                instr = ('ASSIGN', value, None, res)
+                stats['folded'] += 1
+        result.append(instr)
+    return result
+
+
+def copy_propagation(code, stats):
+    # Temporários com uma única definição
+    defs = {}
+    for op, a1, a2, res in code:
+        if op in WRITE_OPS and is_temp(res):
+            defs[res] = defs.get(res, 0) + 1
+
+    # Cópias substituíveis: ASSIGN para um temporário de definição única, vindo
+    # de um literal, de um parâmetro (nunca reatribuído) ou de outro
+    # temporário de definição única
+    copies = {}
+    for op, a1, a2, res in code:
+        if op == 'ASSIGN' and defs.get(res) == 1 and a1 is not None:
+            if not is_temp(a1) or defs.get(a1) == 1:
+                copies[res] = a1
+
+    if not copies:
+        return code
+
+    def resolve(val):
+        # Segue cadeias de cópias (t3 -> t2 -> 5)
+        seen = 0
+        while is_temp(val) and val in copies and seen < len(copies):
+            val = copies[val]
+            seen += 1
+        return val
+
+    result = []
+    for instr in code:
+        op, a1, a2, res = instr
+        if op not in NAME_OPS:
+            new_a1 = resolve(a1)
+            new_a2 = resolve(a2)
+            if new_a1 is not a1 or new_a2 is not a2:
+                stats['propagated'] += (new_a1 is not a1) + (new_a2 is not a2)
+                instr = (op, new_a1, new_a2, res)
+        result.append(instr)
+    return result
+
+
+def dead_temp_elimination(code, stats):
+    used = set()
+    for instr in code:
+        for val in operands(instr):
+            if is_temp(val):
+                used.add(val)
+
+    result = []
+    for instr in code:
+        op, res = instr[0], instr[3]
+        if op in PURE_OPS and is_temp(res) and res not in used and not may_fail(instr):
+            stats['removed'] += 1
+            continue
+        result.append(instr)
+    return result
+
+
+# ==============================
+#     Entrada principal
+# ==============================
+
+def optimize(code, level=1, inline_size=INLINE_SIZE):
+    """Otimiza o código intermediário. Retorna (código, estatísticas).
+
+    inline_size é o tamanho máximo das funções expandidas em linha (0 desliga).
+    stats['inlined'] guarda, por função, as chamadas expandidas; stats['cfg'],
+    por função, (blocos removidos, instruções removidas) pela simplificação
+    do fluxo de controle.
+    """
+    stats = {'before': len(code), 'after': len(code), 'folded': 0, 'propagated': 0, 'removed': 0,
+             'inlined': {}, 'cfg': {}}
+    if level <= 0:
+        return code, stats
+
+    code = inline_functions(code, inline_size, stats['inlined'])
+
+    while True:
+        size = len(code)
+        changes = stats['folded'] + stats['propagated']
+        code = constant_folding(code, stats)
+        code = copy_propagation(code, stats)
+        code = dead_temp_elimination(code, stats)
+        code = simplify_cfg(code, stats['cfg'])
+        if len(code) == size and stats['folded'] + stats['propagated'] == changes:
+            break
+
+    stats['after'] = len(code)
+    return code, stats
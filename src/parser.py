@@ -1,5 +1,10 @@
+import os
+import re
+import sys
 from ply.yacc import yacc
-from tokens import tokens, lexer
+from tokens import tokens, TABLES_DIR, build_lexer
+from nodes import (Num, Symbol, Nil, T, Defun, If, Arith, Compare,
+                   Cons, List, Car, Cdr, Cond, Call, Load)
 
 # ===========================================
 #                 PROGRAMA
@@ -18,11 +23,13 @@ def p_program(p):
 # ===========================================
 
 # Uma sequência de código é uma sequência de código seguida de um bloco de código
+# (recursão à esquerda + append: tempo linear e pilha do parser constante)
 def p_sequence_list(p):
     '''
     sequence : sequence block
     '''
-    p[0] = p[1] + [p[2]]
+    p[1].append(p[2])
+    p[0] = p[1]
 
 # Uma sequência de código é um bloco de código
 def p_sequence_single(p):
@@ -48,20 +55,15 @@ def p_function(p):
     '''
     function : LPAREN DEFUN ID LPAREN param_list RPAREN expression RPAREN
     '''
-    p[0] = ('defun', p[3], p[5], p[7])
+    p[0] = Defun(p[3], p[5], p[7], p.lexpos(1), p.lexpos(8) + 1)
 
 # Lista de parâmetros
 def p_param_list_multi(p):
     '''
-    param_list : ID param_list
-    '''
-    p[0] = [p[1]] + p[2]
-
-def p_param_list_single(p):
-    '''
-    param_list : ID
+    param_list : param_list ID
     '''
-    p[0] = [p[1]]
+    p[1].append(p[2])
+    p[0] = p[1]
 
 def p_param_list_empty(p):
     '''
@@ -85,12 +87,16 @@ def p_expression_operation(p):
     '''
     expression : LPAREN operation RPAREN
     '''
-    p[0] = p[2]
+    # O trecho da operação inclui os parênteses
+    p[0] = p[2].span(p.lexpos(1), p.lexpos(3) + 1)
 
 # ===========================================
 #                TERMOS
 # ===========================================
 
+# Lexema de NUM: o fim do span vem do texto, não do valor ("007" vale 7)
+_DIGITS = re.compile(r'\d+')
+
 def p_term(p):
     '''
     term : NUM
@@ -99,10 +105,17 @@ def p_term(p):
          | T
          | LPAREN RPAREN
     '''
+    start = p.lexpos(1)
     if len(p) == 3:  # () -> nil se a lista estiver vazia retorna NIL
-        p[0] = 'nil'
+        p[0] = Nil(start, p.lexpos(2) + 1)
+    elif p.slice[1].type == 'NUM':
+        p[0] = Num(p[1], start, _DIGITS.match(p.lexer.lexdata, start).end())
+    elif p.slice[1].type == 'ID':
+        p[0] = Symbol(p[1], start, start + len(p[1]))
+    elif p.slice[1].type == 'NIL':
+        p[0] = Nil(start, start + 3)
     else:
-        p[0] = p[1]
+        p[0] = T(start, start + 1)
 
 # ===========================================
 #                OPERAÇÕES
@@ -125,7 +138,7 @@ def p_if(p):
     '''
     if : IF expression expression expression
     '''
-    p[0] = ('if', p[2], p[3], p[4])
+    p[0] = If(p[2], p[3], p[4])
 
 # Aritméticas
 def p_arith(p):
@@ -138,7 +151,7 @@ def p_arith(p):
           | MOD expression expression
           | EXPT expression expression
     '''
-    p[0] = (p[1], p[2], p[3])
+    p[0] = Arith(p[1], p[2], p[3])
 
 # Comparações
 def p_comparation(p):
@@ -154,20 +167,21 @@ def p_comparation(p):
                 | LT expression expression
                 | LTE expression expression
     '''
-    p[0] = (p[1], p[2], p[3])
+    p[0] = Compare(p[1], p[2], p[3])
 
 # Chamada de funções
 def p_call(p):
     '''
     call : ID arglist
     '''
-    p[0] = (p[1], p[2])
+    p[0] = Call(p[1], p[2])
 
 def p_arglist_list(p):
     '''
-    arglist : expression arglist
+    arglist : arglist expression
     '''
-    p[0] = [p[1]] + p[2]
+    p[1].append(p[2])
+    p[0] = p[1]
 
 def p_arglist_empty(p):
     '''
@@ -183,10 +197,12 @@ def p_especial_1(p):
                | COND cond_clauses
     '''
     op = p[1]
-    if op in ['car', 'cdr']:
-        p[0] = (op, p[2])
+    if op == 'car':
+        p[0] = Car(p[2])
+    elif op == 'cdr':
+        p[0] = Cdr(p[2])
     else:
-        p[0] = ('cond', p[2])
+        p[0] = Cond(p[2])
 
 # -------------------------------------------
 # Cláusulas COND
@@ -199,9 +215,10 @@ def p_cond_clauses_empty(p):
 
 def p_cond_clauses_nonempty(p):
     '''
-    cond_clauses : cond_clause cond_clauses
+    cond_clauses : cond_clauses cond_clause
     '''
-    p[0] = [p[1]] + p[2]
+    p[1].append(p[2])
+    p[0] = p[1]
 
 def p_cond_clause(p):
     '''
@@ -216,9 +233,9 @@ def p_especial_2(p):
                | LIST arglist
     '''
     if p[1] == 'cons':
-        p[0] = ('cons', p[2], p[3])
+        p[0] = Cons(p[2], p[3])
     elif p[1] == 'list':
-        p[0] = ('list', p[2])
+        p[0] = List(p[2])
 
 
 
@@ -227,7 +244,7 @@ def p_load_op(p):
     '''
     load_op : LOAD STRING
     '''
-    p[0] = ('load', p[2])
+    p[0] = Load(p[2])
 
 
 # ERROS
@@ -238,4 +255,44 @@ def p_error(p):
     else:
         print("Erro de sintaxe: EOF inesperado")
 
-parser = yacc()
\ No newline at end of file
+# ===========================================
+#            CONSTRUÇÃO DO PARSER
+# ===========================================
+
+def build_parser(optimize=True):
+    # Em modo otimizado as tabelas LALR vêm de parsetab.py sem conferir a
+    # assinatura da gramática; se a tabela não existir ela é gerada
+    return yacc(module=sys.modules[__name__], optimize=optimize, debug=False,
+                tabmodule='parsetab', outputdir=TABLES_DIR)
+
+_parser = None
+
+def get_parser():
+    # O parser só é construído no primeiro parse
+    global _parser
+    if _parser is None:
+        _parser = build_parser()
+    return _parser
+
+# Mantém "from parser import parser" funcionando, agora de forma preguiçosa
+def __getattr__(name):
+    if name == 'parser':
+        return get_parser()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def write_tables():
+    # Valida tokens e gramática e regrava lextab.py e parsetab.py.
+    # Deve ser executado sempre que tokens.py ou a gramática mudarem.
+    for name in ('lextab', 'parsetab'):
+        path = os.path.join(TABLES_DIR, name + '.py')
+        if os.path.exists(path):
+            os.remove(path)
+        sys.modules.pop(name, None)
+
+    build_lexer(optimize=False)   # Validação completa das regras
+    build_lexer(optimize=True)    # Gera lextab.py
+    build_parser(optimize=False)  # Validação da gramática e geração de parsetab.py
+
+if __name__ == "__main__":
+    write_tables()
+    print(f"Tabelas gravadas em {TABLES_DIR}")
\ No newline at end of file
@@ -0,0 +1,82 @@
+
+# parsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'AND CAR CDR COND CONS DEFUN DIVIDE EQ EQL EQUAL EQUALP EXPT FLOOR GT GTE ID IF LIST LOAD LPAREN LT LTE MINUS MOD NIL NOT NUM NUM_EQ NUM_NEQ OR PLUS RPAREN STRING STRING_EQ STRING_EQUAL T TIMES\n    program : sequence\n    \n    sequence : sequence block\n    \n    sequence : block\n    \n    block : function\n          | expression\n    \n    function : LPAREN DEFUN ID LPAREN param_list RPAREN expression RPAREN\n    \n    param_list : param_list ID\n    \n    param_list :\n    \n    expression : term\n    \n    expression : LPAREN operation RPAREN\n    \n    term : NUM\n         | ID\n         | NIL\n         | T\n         | LPAREN RPAREN\n    \n    operation : if\n              | arith\n              | comparation\n              | call\n              | especial_1\n              | especial_2\n              | load_op\n    \n    if : IF expression expression expression\n    \n    arith : PLUS expression expression\n          | MINUS expression expression\n          | TIMES expression expression\n          | DIVIDE expression expression\n          | FLOOR expression expression\n          | MOD expression expression\n          | EXPT expression expression\n    \n    comparation : EQ expression expression\n                | EQL expression expression\n                | EQUAL expression expression\n                | EQUALP expression expression\n                | NUM_EQ expression expression\n                | NUM_NEQ expression expression\n                | GT expression expression\n                | GTE expression expression\n                | LT expression expression\n                | LTE expression expression\n    \n    call : ID arglist\n    \n    arglist : arglist expression\n    \n    arglist :\n    \n    especial_1 : CAR expression\n               | CDR expression\n               | COND cond_clauses\n    \n    cond_clauses :\n    \n    cond_clauses : cond_clauses cond_clause\n    \n    cond_clause : LPAREN expression expression RPAREN\n    \n    especial_2 : CONS expression expression\n               | LIST arglist\n    \n    load_op : LOAD STRING\n    '
+    
+_lr_action_items = {'LPAREN':([0,2,3,4,5,7,8,9,10,11,12,14,15,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,48,49,50,51,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,72,73,74,77,78,96,97,101,103,106,107,],[6,6,-3,-4,-5,-12,-9,-11,-13,-14,-2,-43,-15,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,-47,52,-43,76,52,-10,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,97,52,52,-42,52,-48,52,52,52,-49,-6,]),'NUM':([0,2,3,4,5,7,8,9,10,11,12,14,15,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,45,46,49,50,51,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,73,74,77,78,97,101,103,107,],[9,9,-3,-4,-5,-12,-9,-11,-13,-14,-2,-43,-15,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,-43,9,-10,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,-42,9,9,9,9,-6,]),'ID':([0,2,3,4,5,6,7,8,9,10,11,12,13,14,15,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,45,46,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,73,74,76,77,78,97,99,101,102,103,107,],[7,7,-3,-4,-5,14,-12,-9,-11,-13,-14,-2,48,-43,-15,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,-43,7,-10,7,14,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,-8,-42,7,7,102,7,-7,7,-6,]),'NIL':([0,2,3,4,5,7,8,9,10,11,12,14,15,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,45,46,49,50,51,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,73,74,77,78,97,101,103,107,],[10,10,-3,-4,-5,-12,-9,-11,-13,-14,-2,-43,-15,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,-43,10,-10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,-42,10,10,10,10,-6,]),'T':([0,2,3,4,5,7,8,9,10,11,12,14,15,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,45,46,49,50,51,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,73,74,77,78,97,101,103,107,],[11,11,-3,-4,-5,-12,-9,-11,-13,-14,-2,-43,-15,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,-43,11,-10,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,-42,11,11,11,11,-6,]),'$end':([1,2,3,4,5,7,8,9,10,11,12,15,50,107,],[0,-1,-3,-4,-5,-12,-9,-11,-13,-14,-2,-15,-10,-6,]),'DEFUN':([6,],[13,]),'RPAREN':([6,7,8,9,10,11,14,15,16,17,18,19,20,21,22,23,44,46,49,50,52,70,71,72,74,75,76,77,79,80,81,82,83,84,85,86,87,88,89,90,91,92,93,94,95,96,98,99,100,102,104,105,106,],[15,-12,-9,-11,-13,-14,-43,-15,50,-16,-17,-18,-19,-20,-21,-22,-47,-43,-41,-10,15,-44,-45,-46,-51,-52,-8,-42,-24,-25,-26,-27,-28,-29,-30,-31,-32,-33,-34,-35,-36,-37,-38,-39,-40,-48,-50,103,-23,-7,106,107,-49,]),'IF':([6,52,],[24,24,]),'PLUS':([6,52,],[25,25,]),'MINUS':([6,52,],[26,26,]),'TIMES':([6,52,],[27,27,]),'DIVIDE':([6,52,],[28,28,]),'FLOOR':([6,52,],[29,29,]),'MOD':([6,52,],[30,30,]),'EXPT':([6,52,],[31,31,]),'EQ':([6,52,],[32,32,]),'EQL':([6,52,],[33,33,]),'EQUAL':([6,52,],[34,34,]),'EQUALP':([6,52,],[35,35,]),'NUM_EQ':([6,52,],[36,36,]),'NUM_NEQ':([6,52,],[37,37,]),'GT':([6,52,],[38,38,]),'GTE':([6,52,],[39,39,]),'LT':([6,52,],[40,40,]),'LTE':([6,52,],[41,41,]),'CAR':([6,52,],[42,42,]),'CDR':([6,52,],[43,43,]),'COND':([6,52,],[44,44,]),'CONS':([6,52,],[45,45,]),'LIST':([6,52,],[46,46,]),'LOAD':([6,52,],[47,47,]),'STRING':([47,],[75,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'program':([0,],[1,]),'sequence':([0,],[2,]),'block':([0,2,],[3,12,]),'function':([0,2,],[4,4,]),'expression':([0,2,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,45,49,51,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,73,74,78,97,101,103,],[5,5,51,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,71,73,77,78,79,80,81,82,83,84,85,86,87,88,89,90,91,92,93,94,95,98,77,100,101,104,105,]),'term':([0,2,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,45,49,51,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,73,74,78,97,101,103,],[8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,]),'operation':([6,52,],[16,16,]),'if':([6,52,],[17,17,]),'arith':([6,52,],[18,18,]),'comparation':([6,52,],[19,19,]),'call':([6,52,],[20,20,]),'especial_1':([6,52,],[21,21,]),'especial_2':([6,52,],[22,22,]),'load_op':([6,52,],[23,23,]),'arglist':([14,46,],[49,74,]),'cond_clauses':([44,],[72,]),'cond_clause':([72,],[96,]),'param_list':([76,],[99,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> program","S'",1,None,None,None),
+  ('program -> sequence','program',1,'p_program','parser.py',15),
+  ('sequence -> sequence block','sequence',2,'p_sequence_list','parser.py',28),
+  ('sequence -> block','sequence',1,'p_sequence_single','parser.py',36),
+  ('block -> function','block',1,'p_element','parser.py',43),
+  ('block -> expression','block',1,'p_element','parser.py',44),
+  ('function -> LPAREN DEFUN ID LPAREN param_list RPAREN expression RPAREN','function',8,'p_function','parser.py',55),
+  ('param_list -> param_list ID','param_list',2,'p_param_list_multi','parser.py',62),
+  ('param_list -> <empty>','param_list',0,'p_param_list_empty','parser.py',69),
+  ('expression -> term','expression',1,'p_expression_term','parser.py',80),
+  ('expression -> LPAREN operation RPAREN','expression',3,'p_expression_operation','parser.py',87),
+  ('term -> NUM','term',1,'p_term','parser.py',98),
+  ('term -> ID','term',1,'p_term','parser.py',99),
+  ('term -> NIL','term',1,'p_term','parser.py',100),
+  ('term -> T','term',1,'p_term','parser.py',101),
+  ('term -> LPAREN RPAREN','term',2,'p_term','parser.py',102),
+  ('operation -> if','operation',1,'p_operation','parser.py',122),
+  ('operation -> arith','operation',1,'p_operation','parser.py',123),
+  ('operation -> comparation','operation',1,'p_operation','parser.py',124),
+  ('operation -> call','operation',1,'p_operation','parser.py',125),
+  ('operation -> especial_1','operation',1,'p_operation','parser.py',126),
+  ('operation -> especial_2','operation',1,'p_operation','parser.py',127),
+  ('operation -> load_op','operation',1,'p_operation','parser.py',128),
+  ('if -> IF expression expression expression','if',4,'p_if','parser.py',135),
+  ('arith -> PLUS expression expression','arith',3,'p_arith','parser.py',142),
+  ('arith -> MINUS expression expression','arith',3,'p_arith','parser.py',143),
+  ('arith -> TIMES expression expression','arith',3,'p_arith','parser.py',144),
+  ('arith -> DIVIDE expression expression','arith',3,'p_arith','parser.py',145),
+  ('arith -> FLOOR expression expression','arith',3,'p_arith','parser.py',146),
+  ('arith -> MOD expression expression','arith',3,'p_arith','parser.py',147),
+  ('arith -> EXPT expression expression','arith',3,'p_arith','parser.py',148),
+  ('comparation -> EQ expression expression','comparation',3,'p_comparation','parser.py',155),
+  ('comparation -> EQL expression expression','comparation',3,'p_comparation','parser.py',156),
+  ('comparation -> EQUAL expression expression','comparation',3,'p_comparation','parser.py',157),
+  ('comparation -> EQUALP expression expression','comparation',3,'p_comparation','parser.py',158),
+  ('comparation -> NUM_EQ expression expression','comparation',3,'p_comparation','parser.py',159),
+  ('comparation -> NUM_NEQ expression expression','comparation',3,'p_comparation','parser.py',160),
+  ('comparation -> GT expression expression','comparation',3,'p_comparation','parser.py',161),
+  ('comparation -> GTE expression expression','comparation',3,'p_comparation','parser.py',162),
+  ('comparation -> LT expression expression','comparation',3,'p_comparation','parser.py',163),
+  ('comparation -> LTE expression expression','comparation',3,'p_comparation','parser.py',164),
+  ('call -> ID arglist','call',2,'p_call','parser.py',171),
+  ('arglist -> arglist expression','arglist',2,'p_arglist_list','parser.py',177),
+  ('arglist -> <empty>','arglist',0,'p_arglist_empty','parser.py',184),
+  ('especial_1 -> CAR expression','especial_1',2,'p_especial_1','parser.py',191),
+  ('especial_1 -> CDR expression','especial_1',2,'p_especial_1','parser.py',192),
+  ('especial_1 -> COND cond_clauses','especial_1',2,'p_especial_1','parser.py',193),
+  ('cond_clauses -> <empty>','cond_clauses',0,'p_cond_clauses_empty','parser.py',208),
+  ('cond_clauses -> cond_clauses cond_clause','cond_clauses',2,'p_cond_clauses_nonempty','parser.py',214),
+  ('cond_clause -> LPAREN expression expression RPAREN','cond_clause',4,'p_cond_clause','parser.py',221),
+  ('especial_2 -> CONS expression expression','especial_2',3,'p_especial_2','parser.py',228),
+  ('especial_2 -> LIST arglist','especial_2',2,'p_especial_2','parser.py',229),
+  ('load_op -> LOAD STRING','load_op',2,'p_load_op','parser.py',241),
+]
@@ -0,0 +1,486 @@
+# pybackend.py - Backend que traduz o código intermediário para Python
+#
+# Cada unidade (uma entrada do REPL, um arquivo) vira código-fonte Python:
+# cada FUNC_BEGIN..FUNC_END vira uma função (def) e cada expressão de nível
+# superior vira uma função _main0, _main1... Parâmetros e temporários são variáveis locais, os saltos
+# viram if/else (os dois ramos se juntam no pós-dominador imediato do
+# salto, ver cfg.py) e a chamada de cauda de uma função a si mesma vira um
+# laço. CALL é uma chamada direta em Python. O fonte passa por compile() e
+# o código compilado fica em cache, indexado pelo código intermediário.
+#
+# PyBackend herda do Interpreter: o que não é traduzido (LOAD, código já
+# alocado de um .lispc...) roda nele. Se uma expressão falhar em Python (erro
+# de tipo, recursão mais funda que a pilha do Python), só a saída dela é
+# descartada e só ela é refeita no Interpreter, com o mesmo resultado (ou o
+# mesmo erro); as anteriores já terminaram e não rodam de novo.
+import contextlib
+import io
+import math
+import operator
+import re
+import sys
+
+from cfg import CFG, EXIT, EXIT_OPS, constant_truth, regions
+from codegen import allocate_slots, is_temp, LABEL_OPS
+from interpreter import Interpreter, ARITHMETIC, COMPARISONS, _equalp
+from optimizer import operands, INLINE_SIZE
+from runtime import Pair, from_list
+
+# LIST com mais elementos que isto vira uma chamada a from_list em vez de Pair(...) aninhados
+LIST_INLINE = 32
+
+# Códigos compilados guardados por PyBackend (os mais antigos saem primeiro)
+CACHE_SIZE = 256
+
+
+class Unsupported(Exception):
+    """Instrução ou estrutura que o backend não traduz: a unidade roda no Interpreter."""
+
+
+# ==============================
+#     Ambiente do código gerado
+# ==============================
+
+def _numeric(func):
+    """Operação aritmética com a coerção do Interpreter (o que não é número vale 0)."""
+    def arithmetic(left, right):
+        if not isinstance(left, (int, float)):
+            left = 0
+        if not isinstance(right, (int, float)):
+            right = 0
+        return func(left, right)
+    return arithmetic
+
+
+# Nome no código gerado de cada operação aritmética
+ARITH_NAMES = {'+': 'ADD', '-': 'SUB', '*': 'MUL', '/': 'DIV', 'floor': 'FLOOR',
+               'mod': 'MOD', 'expt': 'EXPT'}
+
+# Operações feitas direto pelo operador do Python quando os operandos são int
+INLINE_ARITH = {'+': '+', '-': '-', '*': '*'}
+
+# Comparações que viram operadores do Python
+CMP_OPERATORS = {operator.eq: '==', operator.ne: '!=', operator.gt: '>',
+                 operator.ge: '>=', operator.lt: '<', operator.le: '<='}
+
+# Nomes globais disponíveis para o código gerado (além das funções f_...)
+RUNTIME = {'NIL': [], 'Pair': Pair, 'LIST': from_list, 'EQUALP': _equalp}
+RUNTIME.update((ARITH_NAMES[op], _numeric(func)) for op, func in ARITHMETIC.items())
+
+
+def native_name(name):
+    """Nome da função Lisp no código gerado: f_ e o nome, com os caracteres especiais escapados."""
+    return 'f_' + re.sub(r'[^0-9A-Za-z]', lambda m: f'_{ord(m.group()):x}_', name)
+
+
+# ==============================
+#     Tradução
+# ==============================
+
+def statements(code):
+    """Trechos do nível superior da unidade, um por expressão (até o seu RESULT).
+
+    Um trecho só termina no RESULT se os saltos dele ficam dentro dele (senão
+    continua até o próximo RESULT); se um temporário passa de um trecho para
+    outro, todo o nível superior fica em um trecho só.
+    """
+    top = [instr for name, _, start, end in regions(code) if name is None for instr in code[start:end]]
+    chunks = []
+    current = []
+    labels = set()      # Labels definidas no trecho atual
+    targets = set()     # Labels de destino dos saltos do trecho atual
+    written = set()     # Temporários escritos no trecho atual
+    for instr in top:
+        current.append(instr)
+        op = instr[0]
+        if op == 'LABEL':
+            labels.add(instr[3])
+        elif op in LABEL_OPS:
+            targets.add(instr[3])
+        for val in operands(instr):
+            if is_temp(val) and val not in written:
+                return [top]    # Lido antes de escrito no trecho: vem de outro
+        if op not in LABEL_OPS and is_temp(instr[3]):
+            written.add(instr[3])
+        if op == 'RESULT' and targets <= labels:
+            chunks.append(current)
+            current = []
+            labels, targets, written = set(), set(), set()
+    if current:
+        if not targets <= labels:
+            return [top]    # Salto para uma label de outro trecho
+        chunks.append(current)
+    return chunks
+
+
+class Translator:
+    """Traduz uma unidade de código intermediário (antes da alocação) para fonte Python."""
+
+    def __init__(self, code):
+        self.code = code
+        self.statements = statements(code)   # Trechos do nível superior: _main0, _main1...
+        self.lines = []
+        self.calls = set()     # Funções chamadas (nomes Lisp)
+        self.labels = 0        # Labels novas dos blocos sem label (CFG.build)
+        self.func = None       # Função sendo traduzida (None: nível superior)
+        self.params = {}       # Parâmetro -> variável local (p0, p1...)
+        self.limit = 8 * len(code) + 64   # Linhas no máximo (ramos duplicados)
+
+        # Leituras de cada temporário: comparação lida só pelo salto seguinte
+        # vira a condição do if, sem temporário
+        self.reads = {}
+        for instr in code:
+            for val in operands(instr):
+                if is_temp(val):
+                    self.reads[val] = self.reads.get(val, 0) + 1
+
+    def translate(self):
+        """Retorna (fonte, nomes das funções chamadas)."""
+        code = self.code
+        for name, params, start, end in regions(code):
+            if name is not None:
+                self.function(name, params, code[start:end])
+
+        self.func = None
+        self.params = {}
+        for k, chunk in enumerate(self.statements):
+            self.out(0, f'def _main{k}():')
+            self.region(chunk, 1)
+        return '\n'.join(self.lines) + '\n', self.calls
+
+    def out(self, depth, line):
+        self.lines.append('    ' * depth + line)
+        if len(self.lines) > self.limit:
+            raise Unsupported("código gerado grande demais")
+
+    def new_label(self):
+        self.labels += 1
+        return f"N{self.labels}"
+
+    # -------- Funções e regiões --------
+
+    def function(self, name, params, body):
+        self.func = name
+        self.params = {p: f'p{k}' for k, p in enumerate(params)}
+        # Parâmetros faltando valem nil; os que sobram são ignorados
+        signature = ''.join(f'p{k}=NIL, ' for k in range(len(params)))
+        self.out(0, f'def {native_name(name)}({signature}*_):')
+        if any(instr[0] == 'TAIL_CALL' and instr[1] == name for instr in body):
+            # Chamada de cauda a si mesma: novos parâmetros e volta ao início
+            self.out(1, 'while True:')
+            self.region(body, 2)
+        else:
+            self.region(body, 1)
+
+    def region(self, code, depth):
+        cfg = CFG.build(code, self.new_label)
+        try:
+            ipdom = cfg.postdominators()
+        except ValueError as e:
+            raise Unsupported(str(e))
+        self.path(cfg, ipdom, cfg.entry.label if cfg.blocks else EXIT, EXIT, depth)
+
+    def path(self, cfg, ipdom, label, stop, depth):
+        """Traduz os blocos a partir de label até stop (a junção do if de fora) ou o fim."""
+        size = len(self.lines)
+        while label is not EXIT and label != stop:
+            block = cfg.by_label[label]
+            last = block.terminator
+            body = block.code if last is None else block.code[:-1]
+            pending = []    # Argumentos empilhados por PARAM (expressões)
+            cond = None
+            for i, instr in enumerate(body):
+                if (last is not None and i == len(body) - 1 and instr[0].startswith('CMP_')
+                        and last[0] in ('IF_TRUE_GOTO', 'IF_FALSE_GOTO') and last[1] == instr[3]
+                        and self.reads.get(instr[3]) == 1):
+                    cond = self.comparison(instr)
+                    continue
+                self.statement(instr, pending, depth)
+
+            if last is None or last[0] == 'GOTO':
+                self.check_pending(pending)
+                label = block.fallthrough if last is None else last[3]
+                continue
+            if last[0] in EXIT_OPS:
+                self.exit(last, pending, depth)
+                break
+            if last[0] not in ('IF_TRUE_GOTO', 'IF_FALSE_GOTO'):
+                raise Unsupported(f"instrução {last[0]}")
+            self.check_pending(pending)
+
+            then, else_ = last[3], block.fallthrough
+            if last[0] == 'IF_FALSE_GOTO':
+                then, else_ = else_, then
+            if cond is None:
+                truth = None if self.is_variable(last[1]) else constant_truth(last[1])
+                if truth is not None:
+                    # Condição constante (T, nil, números): segue só o ramo tomado
+                    label = then if truth else else_
+                    continue
+                cond = self.operand(last[1])
+            join = ipdom[label]
+            if then == join:
+                # Ramo então vazio: só o senão, com a condição negada
+                then, else_ = else_, then
+                cond = f'not ({cond})'
+            self.out(depth, f'if {cond}:')
+            self.path(cfg, ipdom, then, join, depth + 1)
+            if else_ != join:
+                self.out(depth, 'else:')
+                self.path(cfg, ipdom, else_, join, depth + 1)
+            label = join
+            if join is EXIT:
+                break   # Os dois ramos já saem da função (ou do nível superior)
+        else:
+            if label is EXIT and self.func is not None:
+                # Fim do corpo sem RETURN
+                self.out(depth, 'return NIL')
+        if len(self.lines) == size:
+            self.out(depth, 'pass')
+
+    # -------- Instruções --------
+
+    def statement(self, instr, pending, depth):
+        op, a1, a2, res = instr
+        if is_temp(res):
+            res = local_name(res)
+        if op == 'PARAM':
+            pending.append(self.operand(a1))
+            return
+        if op == 'CALL':
+            self.out(depth, f'{res} = {self.call(a1, self.arguments(pending, a2))}')
+            return
+        if op == 'LIST':
+            args = self.arguments(pending, a2)
+            if len(args) > LIST_INLINE:
+                # Pair(...) aninhado estoura o limite de parênteses do parser do Python
+                value = f"LIST(({', '.join(args)},))"
+            else:
+                value = 'NIL'
+                for arg in reversed(args):
+                    value = f'Pair({arg}, {value})'
+            self.out(depth, f'{res} = {value}')
+            return
+
+        # Entre um PARAM e a chamada só vêm outros PARAM
+        self.check_pending(pending)
+        if op == 'ASSIGN':
+            line = f'{res} = {self.operand(a1)}'
+        elif op == 'RESULT':
+            line = f'RESULT({self.operand(a1)})'
+        elif op == 'CONS':
+            line = f'{res} = Pair({self.operand(a1)}, {self.operand(a2)})'
+        elif op == 'CAR' or op == 'CDR':
+            val = self.operand(a1)
+            line = f'{res} = {val}.{op.lower()} if type({val}) is Pair else NIL'
+        elif op in ARITH_NAMES:
+            line = f'{res} = {self.arithmetic(op, a1, a2)}'
+        elif op.startswith('CMP_'):
+            line = f'{res} = {self.comparison(instr)}'
+        else:
+            raise Unsupported(f"instrução {op}")
+        self.out(depth, line)
+
+    def exit(self, instr, pending, depth):
+        """RETURN e TAIL_CALL: saem da função."""
+        op = instr[0]
+        if self.func is None:
+            raise Unsupported(f"{op} no nível superior")
+        if op == 'RETURN':
+            self.check_pending(pending)
+            self.out(depth, f'return {self.operand(instr[1])}')
+            return
+        if op != 'TAIL_CALL':
+            raise Unsupported(f"instrução {op}")
+        args = self.arguments(pending, instr[2])
+        if instr[1] != self.func:
+            self.out(depth, f'return {self.call(instr[1], args)}')
+            return
+        # A si mesma: troca os parâmetros (como new_frame) e recomeça o laço
+        params = list(self.params.values())
+        if params:
+            args = (args + ['NIL'] * len(params))[:len(params)]
+            self.out(depth, f"{', '.join(params)} = {', '.join(args)}")
+        self.out(depth, 'continue')
+
+    def arguments(self, pending, count):
+        if len(pending) < count:
+            raise Unsupported("argumentos fora do bloco da chamada")
+        args = pending[len(pending) - count:]
+        del pending[len(pending) - count:]
+        return args
+
+    def check_pending(self, pending):
+        if pending:
+            raise Unsupported("PARAM sem chamada em seguida")
+
+    def call(self, name, args):
+        self.calls.add(name)
+        return f"{native_name(name)}({', '.join(args)})"
+
+    def arithmetic(self, op, a1, a2):
+        """Expressão de uma operação aritmética: operador do Python se os dois são int."""
+        left, right = self.operand(a1), self.operand(a2)
+        helper = f'{ARITH_NAMES[op]}({left}, {right})'
+        if op not in INLINE_ARITH or not all(type(v) is int or self.is_variable(v) for v in (a1, a2)):
+            return helper
+        fast = f'{left} {INLINE_ARITH[op]} {right}'
+        guards = [f'type({self.operand(v)}) is int' for v in dict.fromkeys((a1, a2)) if self.is_variable(v)]
+        if not guards:
+            return fast
+        return f"{fast} if {' and '.join(guards)} else {helper}"
+
+    def comparison(self, instr):
+        op, a1, a2, _ = instr
+        func = COMPARISONS.get(op)
+        if func is None:
+            return 'False'   # Comparação desconhecida (como _false no Interpreter)
+        left, right = self.operand(a1), self.operand(a2)
+        if func in CMP_OPERATORS:
+            return f'{left} {CMP_OPERATORS[func]} {right}'
+        return f'EQUALP({left}, {right})'
+
+    # -------- Operandos --------
+
+    def is_variable(self, val):
+        return isinstance(val, str) and (val in self.params or is_temp(val))
+
+    def operand(self, val):
+        """Expressão Python de um operando: variável local ou constante."""
+        if isinstance(val, str) and val in self.params:
+            return self.params[val]
+        if is_temp(val):
+            return local_name(val)
+        return _constant(val)
+
+
+def local_name(temp):
+    """Variável local do Python para um temporário: %t1 vira t1 (os parâmetros são p0, p1...)."""
+    return temp[1:]
+
+
+def _constant(val):
+    """Literal Python com o valor em tempo de execução da constante (ver runtime_value)."""
+    if val is None or val is True or val is False:
+        return repr(val)
+    if type(val) is int or (type(val) is float and math.isfinite(val)):
+        return repr(val) if val >= 0 else f'({val!r})'
+    if isinstance(val, str):
+        if val.lower() == 'nil':
+            return 'NIL'
+        if val.upper() == 'T':
+            return 'True'
+        return repr(val)
+    raise Unsupported(f"constante {val!r}")
+
+
+def translate(code):
+    """Fonte Python de uma unidade de código intermediário (Unsupported se não traduz)."""
+    return Translator(code).translate()[0]
+
+
+# ==============================
+#     Execução
+# ==============================
+
+class PyBackend(Interpreter):
+    """Interpreter que executa cada unidade como Python nativo quando consegue traduzi-la."""
+
+    def __init__(self, cache=None, opt_level=0, inline_size=INLINE_SIZE):
+        super().__init__(cache, opt_level, inline_size)
+        self.namespace = dict(RUNTIME, RESULT=self.native_result)   # Globais do código gerado
+        self.programs = {}    # Código intermediário -> (código compilado, funções chamadas) ou None
+        self.native_stats = {'native': 0, 'interpreted': 0, 'fallbacks': 0}
+
+    def execute(self, code):
+        """Executa o código intermediário: em Python nativo se traduzível, senão no Interpreter.
+
+        As funções são registradas também no Interpreter (para LOAD, os
+        .lispc e a execução refeita depois de um erro).
+        """
+        program = self.program(code)
+        allocated, template = allocate_slots(code)
+        segment = self.add_segment(allocated)
+        if program is None:
+            self.native_stats['interpreted'] += 1
+            return self.run_segment(segment, template)
+
+        compiled, calls, chunks = program
+        namespace = self.namespace
+        exec(compiled, namespace)
+        for name in calls:
+            namespace.setdefault(native_name(name), self.undefined(name))
+
+        self.last_result = None
+        for k, chunk in enumerate(chunks):
+            try:
+                with contextlib.redirect_stdout(io.StringIO()) as out:
+                    namespace[f'_main{k}']()
+            except Exception:
+                # Inclusive RecursionError (o Interpreter não usa a pilha do
+                # Python): só esta expressão é refeita, sem a saída parcial
+                self.native_stats['fallbacks'] += 1
+                last_result = self.execute_statement(chunk)
+                if self.error is not None:
+                    return last_result   # Como no Interpreter: o erro encerra a unidade
+                continue
+            sys.stdout.write(out.getvalue())
+        self.native_stats['native'] += 1
+        return self.last_result
+
+    def execute_statement(self, chunk):
+        """Executa no Interpreter um trecho de nível superior (as funções já estão registradas)."""
+        allocated, template = allocate_slots(chunk)
+        return self.run_segment(self.add_segment(allocated), template)
+
+    def program(self, code):
+        """(código compilado, funções chamadas, trechos do nível superior) da unidade,
+        do cache se já traduzida; None se não traduz."""
+        try:
+            key = tuple(code)
+            program = self.programs.get(key)
+        except TypeError:
+            key = program = None   # Constante não hashable: sem cache
+        if program is not None or key in self.programs:
+            return program
+
+        try:
+            translator = Translator(code)
+            source, calls = translator.translate()
+            program = (compile(source, '<lisp>', 'exec'), frozenset(calls), translator.statements)
+        except (Unsupported, SyntaxError, RecursionError):
+            # SyntaxError/RecursionError: fonte gerado grande demais para o compile()
+            program = None
+        if key is not None:
+            if len(self.programs) >= CACHE_SIZE:
+                del self.programs[next(iter(self.programs))]
+            self.programs[key] = program
+        return program
+
+    def register_functions(self, segment):
+        """Registra as funções no Interpreter; no código gerado, passam a chamar essa versão
+        até serem redefinidas em Python (em execute)."""
+        super().register_functions(segment)
+        for instr in segment.code:
+            if instr[0] == 'FUNC_BEGIN':
+                self.namespace[native_name(instr[1])] = self.interpreted(instr[1])
+
+    # -------- Funções do ambiente do código gerado --------
+
+    def native_result(self, val):
+        """RESULT no código gerado."""
+        self.last_result = val
+        print(f"=> {self.format_result(val)}")
+
+    def interpreted(self, name):
+        """Função do código gerado que chama a versão do Interpreter."""
+        def call(*args):
+            return self.call_function(name, list(args))
+        return call
+
+    def undefined(self, name):
+        """Função do código gerado para um nome não definido (como CALL no Interpreter)."""
+        def call(*args):
+            print(f"ERRO: Função '{name}' não definida")
+            return []
+        return call
@@ -0,0 +1,65 @@
+# reader.py - Leitura incremental de arquivos Lisp, um bloco de nível superior por vez
+import mmap
+import re
+
+# Delimitadores que interessam para achar os limites dos blocos:
+# parênteses, strings (podem conter parênteses) e comentários
+_DELIMITERS = re.compile(rb'\(|\)|"[^"]*"|;[^\n]*')
+
+# Átomos soltos no nível superior (ex.: "42" ou "x" fora de parênteses)
+_ATOM = re.compile(rb'[^\s()";]+')
+
+
+def iter_top_level_forms(filename, encoding='utf-8'):
+    """Gera o texto de cada bloco de nível superior do arquivo, em ordem.
+
+    O arquivo é mapeado em memória e percorrido uma única vez; cada bloco é
+    decodificado somente quando completo, então o consumo de memória não
+    depende do tamanho do arquivo.
+    """
+    with open(filename, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Arquivo vazio não pode ser mapeado
+            return
+
+        with mm:
+            depth = 0        # Profundidade atual de parênteses
+            form_start = 0   # Início do bloco em construção
+            gap_start = 0    # Início do trecho no nível superior ainda não analisado
+
+            for m in _DELIMITERS.finditer(mm):
+                tok = m.group()
+
+                if depth == 0:
+                    # Átomos entre blocos são blocos por si só
+                    for atom in _ATOM.finditer(mm, gap_start, m.start()):
+                        yield atom.group().decode(encoding)
+                    gap_start = m.end()
+                    # String solta no nível superior: o parser decide se é válida
+                    if tok[:1] == b'"':
+                        yield tok.decode(encoding)
+                        continue
+
+                if tok == b'(':
+                    if depth == 0:
+                        form_start = m.start()
+                    depth += 1
+                elif tok == b')':
+                    if depth == 0:
+                        # Parêntese sem par: entrega para o parser reportar
+                        yield ')'
+                        continue
+                    depth -= 1
+                    if depth == 0:
+                        yield mm[form_start:m.end()].decode(encoding)
+                        gap_start = m.end()
+
+            # Final do arquivo
+            if depth > 0:
+                # Bloco incompleto: o parser reporta o EOF inesperado
+                yield mm[form_start:].decode(encoding)
+            else:
+                for atom in _ATOM.finditer(mm, gap_start):
+                    yield atom.group().decode(encoding)
@@ -0,0 +1,93 @@
+# runtime.py - Valores da linguagem em tempo de execução
+#
+# Representação usada pelo interpretador:
+#   números     int / float
+#   T           True
+#   nil         [] (lista vazia)
+#   símbolos    str
+#   pares       Pair (célula cons imutável)
+#
+# Uma lista é uma cadeia de Pair terminada em nil: (1 2 3) é
+# Pair(1, Pair(2, Pair(3, []))). CONS, CAR e CDR são O(1) e listas
+# compartilham estrutura: (cons 0 l) não copia l.
+
+
+class Pair:
+    """Célula cons imutável (car . cdr)."""
+    __slots__ = ('car', 'cdr')
+
+    def __init__(self, car, cdr):
+        self.car = car
+        self.cdr = cdr
+
+    def __iter__(self):
+        """Percorre os elementos da lista (para no primeiro cdr que não é par)."""
+        node = self
+        while type(node) is Pair:
+            yield node.car
+            node = node.cdr
+
+    def __eq__(self, other):
+        # Comparação estrutural, iterativa ao longo dos cdr (listas longas não estouram a pilha)
+        if type(other) is not Pair:
+            return NotImplemented
+        a, b = self, other
+        while type(a) is Pair and type(b) is Pair:
+            if a is b:
+                return True
+            if a.car != b.car:
+                return False
+            a, b = a.cdr, b.cdr
+        if type(a) is Pair or type(b) is Pair:
+            return False
+        return a == b
+
+    __hash__ = None
+
+    def __repr__(self):
+        return format_value(self)
+
+
+def is_nil(val):
+    return val is None or (type(val) is list and not val)
+
+
+# ==============================
+#     Conversões
+# ==============================
+
+def from_list(items, tail=None):
+    """Lista encadeada (Pair) com os elementos de items; tail é o último cdr (nil por padrão)."""
+    result = [] if tail is None else tail
+    for item in reversed(items):
+        result = Pair(item, result)
+    return result
+
+
+def to_list(val):
+    """Elementos de uma lista encadeada como lista do Python (nil -> [])."""
+    if type(val) is Pair:
+        return list(val)
+    return []
+
+
+# ==============================
+#     Impressão
+# ==============================
+
+def format_value(val):
+    """Formata um valor no estilo Lisp: NIL (também para falso), T, (1 2 3), (1 . 2)."""
+    if type(val) is Pair:
+        items = []
+        while type(val) is Pair:
+            items.append(format_value(val.car))
+            val = val.cdr
+        tail = '' if is_nil(val) else f" . {format_value(val)}"
+        return f"({' '.join(items)}{tail})"
+    if is_nil(val) or val is False:
+        return "NIL"
+    if val is True:
+        return "T"
+    if isinstance(val, list):
+        return f"({' '.join(format_value(item) for item in val)})"
+    return str(val)
@@ -0,0 +1,570 @@
+# stackvm.py - Bytecode de pilha e máquina virtual
+#
+# Alternativa ao código intermediário de três endereços: os valores
+# intermediários ficam numa pilha de operandos em vez de temporários com
+# nome, então (+ a 1) é LOCAL a; CONST 1; ADD, sem slots de resultado.
+#
+# StackCompiler lê a mesma AST que o CodeGenerator e gera um Chunk por
+# função e um para o nível superior. O código é uma lista plana de
+# inteiros, dois por instrução (operação, argumento); o argumento é um
+# índice no pool de constantes do Chunk, um índice do frame, um destino de
+# salto ou um contador, conforme a operação.
+#
+# StackVM executa os Chunks num único laço com a pilha de chamadas
+# explícita: recursão funda não usa a pilha do Python e chamadas de cauda
+# reaproveitam o frame. Funções são procuradas pelo nome na chamada
+# (redefinição vale para chamadas posteriores), como no Interpreter.
+import operator
+import os
+
+from interpreter import ARITHMETIC, COMPARISONS, runtime_value, _false
+from nodes import NUM, SYMBOL, NIL, TRUE, DEFUN, IF, COMPARE, COND, CALL
+from optimizer import INLINE_SIZE
+from parser import get_parser
+from runtime import Pair, from_list, format_value
+from tokens import get_lexer
+
+NUMBERS = (int, float)
+
+# Marca de operando que não é constante (None é um valor possível)
+NOT_CONSTANT = object()
+
+# Operações (a ordem define os códigos)
+OPNAMES = (
+    'LOCAL',          # empilha frame[arg]
+    'CONST',          # empilha consts[arg]
+    'JUMP_IF_FALSE',  # desempilha; salta para arg se falso
+    'JUMP',           # salta para arg
+    'COMPARE',        # b, a -> consts[arg](a, b)
+    'ADD',            # b, a -> a + b (int direto; o resto como no Interpreter)
+    'SUB',
+    'MUL',
+    'ARITH',          # b, a -> consts[arg](a, b), não números valem 0
+    'CALL',           # consts[arg] = (nome, nº de argumentos); argumentos na pilha
+    'TAIL_CALL',      # como CALL, no lugar do frame atual
+    'RETURN',         # volta ao chamador com o topo da pilha
+    'CAR',
+    'CDR',
+    'CONS',           # cdr, car -> Pair
+    'LIST',           # arg elementos -> lista encadeada
+    'RESULT',         # desempilha e imprime (expressão de nível superior)
+    'LOAD',           # carrega o arquivo consts[arg]; empilha T ou nil
+    'HALT',           # fim do nível superior
+    # Superinstruções: operando constante e comparação seguida de salto
+    'ADD_CONST',          # a -> a + consts[arg]
+    'SUB_CONST',          # a -> a - consts[arg]
+    'COMPARE_CONST',      # a -> func(a, valor); consts[arg] = (func, valor)
+    'JUMP_IF_NOT',        # b, a -> salta se não func(a, b); consts[arg] = (func, destino)
+    'JUMP_IF_NOT_CONST',  # a -> salta se não func(a, valor); consts[arg] = (func, valor, destino)
+)
+# Códigos com prefixo OP_ (CALL, LIST etc. já são tags dos nós)
+(OP_LOCAL, OP_CONST, OP_JUMP_IF_FALSE, OP_JUMP, OP_COMPARE, OP_ADD, OP_SUB,
+ OP_MUL, OP_ARITH, OP_CALL, OP_TAIL_CALL, OP_RETURN, OP_CAR, OP_CDR, OP_CONS,
+ OP_LIST, OP_RESULT, OP_LOAD, OP_HALT, OP_ADD_CONST, OP_SUB_CONST,
+ OP_COMPARE_CONST, OP_JUMP_IF_NOT, OP_JUMP_IF_NOT_CONST) = range(len(OPNAMES))
+
+# Operações aritméticas com instrução própria (e com operando constante)
+ARITH_OPCODES = {'+': OP_ADD, '-': OP_SUB, '*': OP_MUL}
+ARITH_CONST_OPCODES = {'+': OP_ADD_CONST, '-': OP_SUB_CONST}
+
+# Operações cujo argumento é um índice no pool de constantes
+CONST_ARG_OPS = frozenset((OP_CONST, OP_COMPARE, OP_ARITH, OP_CALL, OP_TAIL_CALL, OP_LOAD,
+                           OP_ADD_CONST, OP_SUB_CONST, OP_COMPARE_CONST, OP_JUMP_IF_NOT,
+                           OP_JUMP_IF_NOT_CONST))
+
+
+class Chunk:
+    """Bytecode de uma função (ou do nível superior): código, constantes e aridade."""
+    __slots__ = ('name', 'arity', 'code', 'consts')
+
+    def __init__(self, name, arity, code, consts):
+        self.name = name       # Nome da função; None no nível superior
+        self.arity = arity     # Número de parâmetros (tamanho do frame)
+        self.code = code       # Lista plana: operação, argumento, operação, argumento...
+        self.consts = consts   # Tupla de constantes
+
+    def instruction(self, pc):
+        """Instrução em pc como (operação, argumento resolvido), para mensagens e listagens."""
+        op, arg = self.code[pc], self.code[pc + 1]
+        if op in CONST_ARG_OPS:
+            arg = self.consts[arg]
+        return (OPNAMES[op], arg)
+
+    def disassemble(self):
+        """Linhas 'pc: OPERAÇÃO argumento'."""
+        return [f"{pc:4d}: {op} {arg!r}" for pc in range(0, len(self.code), 2)
+                for op, arg in (self.instruction(pc),)]
+
+
+# ==============================
+#     Compilação
+# ==============================
+
+class StackCompiler:
+    """Gera o bytecode de pilha a partir da AST do parser."""
+
+    def compile(self, ast):
+        """Retorna (funções, nível superior): Chunks da unidade."""
+        if ast is None:
+            raise TypeError("O parser retornou None. Verifique se o código LISP está sintaticamente correto.")
+        try:
+            functions = []
+            expressions = []
+            for node in ast:
+                if node.kind == DEFUN:
+                    self.begin({p: i for i, p in enumerate(node.params)})
+                    self.tail(node.body)
+                    functions.append(self.end(node.name, len(node.params)))
+                else:
+                    expressions.append(node)
+
+            # Nível superior: as funções da unidade valem desde o início,
+            # então as expressões formam um único Chunk
+            self.begin({})
+            for node in expressions:
+                self.expression(node)
+                self.emit(OP_RESULT)
+            self.emit(OP_HALT)
+            return functions, self.end(None, 0)
+        except (IndexError, KeyError, AttributeError) as e:
+            raise NotImplementedError(f"Código LISP mal formatado ou operação não suportada: {e}")
+
+    def begin(self, scope):
+        """Começa um Chunk novo com os parâmetros dados (nome -> índice do frame)."""
+        self.code = []
+        self.consts = []
+        self.const_ids = {}   # Chave do valor -> índice no pool
+        self.scope = scope
+
+    def end(self, name, arity):
+        return Chunk(name, arity, self.code, tuple(self.consts))
+
+    def emit(self, op, arg=0):
+        """Acrescenta uma instrução; retorna sua posição (para corrigir saltos)."""
+        self.code += (op, arg)
+        return len(self.code) - 2
+
+    def patch(self, pos, target=None):
+        """Aponta o salto em pos para target (padrão: a próxima instrução)."""
+        if target is None:
+            target = len(self.code)
+        op, arg = self.code[pos], self.code[pos + 1]
+        if op == OP_JUMP_IF_NOT or op == OP_JUMP_IF_NOT_CONST:
+            # Destino no fim da tupla do pool (própria deste salto)
+            self.consts[arg] = self.consts[arg][:-1] + (target,)
+        else:
+            self.code[pos + 1] = target
+
+    def constant(self, val):
+        """Índice de val no pool (nil e 1/True ficam separados)."""
+        key = (type(val), val) if type(val) is not list else (list,)
+        index = self.const_ids.get(key)
+        if index is None:
+            index = self.const_ids[key] = len(self.consts)
+            self.consts.append(val)
+        return index
+
+    def constant_operand(self, node):
+        """Valor de node se ele for constante (número, nil, T ou símbolo fora dos parâmetros); senão NOT_CONSTANT."""
+        kind = node.kind
+        if kind == NUM:
+            return node.value
+        if kind == NIL:
+            return []
+        if kind == TRUE:
+            return True
+        if kind == SYMBOL and node.name not in self.scope:
+            return runtime_value(node.name)
+        return NOT_CONSTANT
+
+    def branch(self, test):
+        """Código que salta se test for falso; retorna a posição do salto (para patch)."""
+        if test.kind != COMPARE:
+            self.expression(test)
+            return self.emit(OP_JUMP_IF_FALSE)
+        # Comparação e salto numa só instrução, sem o booleano na pilha
+        func = COMPARISONS.get('CMP_' + test.op, _false)
+        self.expression(test.left)
+        # O pool guarda uma tupla nova por salto: o destino é corrigido depois
+        value = self.constant_operand(test.right)
+        if value is not NOT_CONSTANT:
+            self.consts.append((func, value, None))
+            return self.emit(OP_JUMP_IF_NOT_CONST, len(self.consts) - 1)
+        self.expression(test.right)
+        self.consts.append((func, None))
+        return self.emit(OP_JUMP_IF_NOT, len(self.consts) - 1)
+
+    # Despacho pela tag do nó (como CodeGenerator.gen_expression)
+    def expression(self, node):
+        self.EMITTERS[node.kind](self, node)
+
+    # -------- Posição de cauda --------
+    def tail(self, node):
+        """Código que retorna o valor de node da função atual (chamadas viram TAIL_CALL)."""
+        kind = node.kind
+        if kind == IF:
+            jump = self.branch(node.cond)
+            self.tail(node.then)
+            self.patch(jump)
+            self.tail(node.else_)
+        elif kind == COND:
+            for test, body in node.clauses:
+                jump = self.branch(test)
+                self.tail(body)
+                self.patch(jump)
+            # Nenhuma cláusula verdadeira: retorna nil
+            self.emit(OP_CONST, self.constant([]))
+            self.emit(OP_RETURN)
+        elif kind == CALL:
+            for arg in node.args:
+                self.expression(arg)
+            self.emit(OP_TAIL_CALL, self.constant((node.name, len(node.args))))
+        else:
+            self.expression(node)
+            self.emit(OP_RETURN)
+
+    # -------- Literais e variáveis --------
+    def emit_num(self, node):
+        self.emit(OP_CONST, self.constant(node.value))
+
+    def emit_symbol(self, node):
+        index = self.scope.get(node.name)
+        if index is None:
+            # Fora dos parâmetros, o símbolo vale como constante (nil, T ou o nome)
+            self.emit(OP_CONST, self.constant(runtime_value(node.name)))
+        else:
+            self.emit(OP_LOCAL, index)
+
+    def emit_nil(self, node):
+        self.emit(OP_CONST, self.constant([]))
+
+    def emit_true(self, node):
+        self.emit(OP_CONST, self.constant(True))
+
+    # -------- Aritmética e comparações --------
+    def emit_arith(self, node):
+        func = ARITHMETIC[node.op]
+        self.expression(node.left)
+        if node.right.kind == NUM and type(node.right.value) is int and node.op in ARITH_CONST_OPCODES:
+            # Operando constante (n - 1): sem CONST na pilha
+            self.emit(ARITH_CONST_OPCODES[node.op], self.constant(node.right.value))
+            return
+        self.expression(node.right)
+        op = ARITH_OPCODES.get(node.op)
+        if op is None:
+            self.emit(OP_ARITH, self.constant(func))
+        else:
+            self.emit(op)
+
+    def emit_compare(self, node):
+        func = COMPARISONS.get('CMP_' + node.op, _false)
+        self.expression(node.left)
+        value = self.constant_operand(node.right)
+        if value is not NOT_CONSTANT:
+            # Tupla fora do pool compartilhado: (f, 1) e (f, True) são iguais para o dict
+            self.consts.append((func, value))
+            self.emit(OP_COMPARE_CONST, len(self.consts) - 1)
+            return
+        self.expression(node.right)
+        self.emit(OP_COMPARE, self.constant(func))
+
+    # -------- Listas --------
+    def emit_cons(self, node):
+        self.expression(node.car)
+        self.expression(node.cdr)
+        self.emit(OP_CONS)
+
+    def emit_list(self, node):
+        for item in node.items:
+            self.expression(item)
+        self.emit(OP_LIST, len(node.items))
+
+    def emit_car(self, node):
+        self.expression(node.expr)
+        self.emit(OP_CAR)
+
+    def emit_cdr(self, node):
+        self.expression(node.expr)
+        self.emit(OP_CDR)
+
+    # -------- Controle --------
+    def emit_if(self, node):
+        jump_else = self.branch(node.cond)
+        self.expression(node.then)
+        jump_end = self.emit(OP_JUMP)
+        self.patch(jump_else)
+        self.expression(node.else_)
+        self.patch(jump_end)
+
+    def emit_cond(self, node):
+        ends = []
+        for test, body in node.clauses:
+            jump_next = self.branch(test)
+            self.expression(body)
+            ends.append(self.emit(OP_JUMP))
+            self.patch(jump_next)
+        # Nenhuma cláusula verdadeira: nil
+        self.emit(OP_CONST, self.constant([]))
+        for jump in ends:
+            self.patch(jump)
+
+    # -------- Chamadas e carga --------
+    def emit_call(self, node):
+        for arg in node.args:
+            self.expression(arg)
+        self.emit(OP_CALL, self.constant((node.name, len(node.args))))
+
+    def emit_load(self, node):
+        self.emit(OP_LOAD, self.constant(node.filename))
+
+    def emit_defun(self, node):
+        raise NotImplementedError(f"Definição de função só é permitida no nível superior: {node.name}")
+
+    # Tabela de despacho indexada pela tag do nó (ordem de nodes.KIND_NAMES)
+    EMITTERS = (
+        emit_num,       # NUM
+        emit_symbol,    # SYMBOL
+        emit_nil,       # NIL
+        emit_true,      # TRUE
+        emit_defun,     # DEFUN (só no nível superior)
+        emit_if,        # IF
+        emit_arith,     # ARITH
+        emit_compare,   # COMPARE
+        emit_cons,      # CONS
+        emit_list,      # LIST
+        emit_car,       # CAR
+        emit_cdr,       # CDR
+        emit_cond,      # COND
+        emit_call,      # CALL
+        emit_load,      # LOAD
+    )
+
+
+# ==============================
+#     Máquina virtual
+# ==============================
+
+def _arith(func, a, b):
+    # Como no Interpreter: o que não é número vale 0
+    if not isinstance(a, NUMBERS):
+        a = 0
+    if not isinstance(b, NUMBERS):
+        b = 0
+    return func(a, b)
+
+
+class StackVM:
+    """Executa o bytecode de pilha; mesma interface de execução do Interpreter."""
+
+    def __init__(self, cache=None, opt_level=0, inline_size=INLINE_SIZE):
+        # cache, opt_level e inline_size valem para o código intermediário:
+        # aceitos pela interface comum dos backends, sem efeito no bytecode de pilha
+        self.cache = cache
+        self.opt_level = opt_level
+        self.inline_size = inline_size
+        self.compiler = StackCompiler()
+        self.functions = {}        # Funções definidas: nome -> Chunk
+        self.frame = []            # Frame do nível superior (vazio: não há variáveis globais)
+        self.last_result = None    # Último resultado calculado
+        self.error_at = None       # (Chunk, pc) da instrução que falhou
+
+    # ==============================
+    #     Método Principal
+    # ==============================
+
+    def execute_ast(self, ast):
+        """Compila a AST e executa o nível superior; retorna o último resultado."""
+        main = self.compile(ast)
+        self.last_result = None
+        try:
+            self.run(main, [])
+        except Exception as e:
+            chunk, pc = self.error_at
+            print(f"Erro na instrução {pc // 2}: {chunk.instruction(pc)}")
+            print(f"Erro: {e}")
+        return self.last_result
+
+    def compile(self, ast):
+        """Compila a unidade e registra suas funções; retorna o Chunk do nível superior."""
+        functions, main = self.compiler.compile(ast)
+        for chunk in functions:
+            self.functions[chunk.name] = chunk
+        return main
+
+    def run(self, chunk, frame):
+        """Laço principal: executa chunk até HALT e retorna o topo da pilha (ou None).
+
+        A pilha de operandos é compartilhada pelas chamadas: o chamado
+        consome seus argumentos e deixa só o valor de retorno.
+        """
+        code = chunk.code
+        consts = chunk.consts
+        functions = self.functions
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        calls = []   # Chamadores: (Chunk, pc de retorno, frame)
+        pc = 0
+        try:
+            while True:
+                op = code[pc]
+                arg = code[pc + 1]
+                pc += 2
+                # Operações mais frequentes primeiro
+                if op == OP_LOCAL:
+                    push(frame[arg])
+                elif op == OP_JUMP_IF_NOT_CONST:
+                    func, value, target = consts[arg]
+                    if not func(pop(), value):
+                        pc = target
+                elif op == OP_SUB_CONST:
+                    a = stack[-1]
+                    stack[-1] = a - consts[arg] if type(a) is int else _arith(operator.sub, a, consts[arg])
+                elif op == OP_CALL or op == OP_TAIL_CALL:
+                    name, argc = consts[arg]
+                    if argc == 1:
+                        args = [pop()]
+                    elif argc:
+                        args = stack[-argc:]
+                        del stack[-argc:]
+                    else:
+                        args = []
+                    func = functions.get(name)
+                    if func is None:
+                        print(f"ERRO: Função '{name}' não definida")
+                        push([])
+                        if op == OP_CALL:
+                            continue
+                        # Em posição de cauda, a chamada vale nil e retorna direto ao chamador
+                        chunk, pc, frame = calls.pop()
+                        code = chunk.code
+                        consts = chunk.consts
+                        continue
+                    if argc != func.arity:
+                        # Argumentos faltando valem nil; os que sobram são ignorados
+                        args = (args + [[]] * func.arity)[:func.arity]
+                    if op == OP_CALL:
+                        calls.append((chunk, pc, frame))
+                    # TAIL_CALL: nada é empilhado, o RETURN do chamado volta ao chamador original
+                    chunk = func
+                    code = func.code
+                    consts = func.consts
+                    frame = args
+                    pc = 0
+                elif op == OP_RETURN:
+                    chunk, pc, frame = calls.pop()
+                    code = chunk.code
+                    consts = chunk.consts
+                elif op == OP_CONST:
+                    push(consts[arg])
+                elif op == OP_CAR:
+                    val = stack[-1]
+                    stack[-1] = val.car if type(val) is Pair else []
+                elif op == OP_CDR:
+                    val = stack[-1]
+                    stack[-1] = val.cdr if type(val) is Pair else []
+                elif op == OP_ADD:
+                    b = pop()
+                    a = stack[-1]
+                    stack[-1] = a + b if type(a) is int and type(b) is int else _arith(operator.add, a, b)
+                elif op == OP_ADD_CONST:
+                    a = stack[-1]
+                    stack[-1] = a + consts[arg] if type(a) is int else _arith(operator.add, a, consts[arg])
+                elif op == OP_JUMP_IF_NOT:
+                    func, target = consts[arg]
+                    b = pop()
+                    if not func(pop(), b):
+                        pc = target
+                elif op == OP_JUMP:
+                    pc = arg
+                elif op == OP_CONS:
+                    cdr = pop()
+                    stack[-1] = Pair(stack[-1], cdr)
+                elif op == OP_JUMP_IF_FALSE:
+                    if not pop():
+                        pc = arg
+                elif op == OP_COMPARE_CONST:
+                    func, value = consts[arg]
+                    stack[-1] = func(stack[-1], value)
+                elif op == OP_COMPARE:
+                    b = pop()
+                    stack[-1] = consts[arg](stack[-1], b)
+                elif op == OP_SUB:
+                    b = pop()
+                    a = stack[-1]
+                    stack[-1] = a - b if type(a) is int and type(b) is int else _arith(operator.sub, a, b)
+                elif op == OP_MUL:
+                    b = pop()
+                    a = stack[-1]
+                    stack[-1] = a * b if type(a) is int and type(b) is int else _arith(operator.mul, a, b)
+                elif op == OP_ARITH:
+                    b = pop()
+                    stack[-1] = _arith(consts[arg], stack[-1], b)
+                elif op == OP_LIST:
+                    if arg:
+                        items = stack[-arg:]
+                        del stack[-arg:]
+                        push(from_list(items))
+                    else:
+                        push([])
+                elif op == OP_RESULT:
+                    result = pop()
+                    self.last_result = result
+                    print(f"=> {self.format_result(result)}")
+                elif op == OP_LOAD:
+                    push(self.load(consts[arg]))
+                elif op == OP_HALT:
+                    return stack[-1] if stack else None
+                else:
+                    print(f"AVISO: Instrução não reconhecida: {op}")
+        except Exception:
+            self.error_at = (chunk, pc - 2)
+            raise
+
+    def load(self, filename):
+        """Executa LOAD: compila e executa o arquivo; T se carregou, nil se não."""
+        # Adicionar extensão .lisp se não tiver
+        if not (filename.endswith('.lisp') or filename.endswith('.txt')):
+            filename += '.lisp'
+        if not os.path.exists(filename):
+            print(f"ERRO: Arquivo '{filename}' não encontrado")
+            return []
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                lisp_code = f.read()
+            print(f"Carregando arquivo: {filename}")
+            ast = get_parser().parse(lisp_code, lexer=get_lexer())
+            if ast is None:
+                print(f"ERRO: Falha ao analisar arquivo '{filename}'")
+                return []
+            self.run(self.compile(ast), [])
+        except Exception as e:
+            print(f"ERRO ao carregar arquivo '{filename}': {e}")
+            return []
+        print(f"Arquivo '{filename}' carregado com sucesso")
+        return True
+
+    def format_result(self, result):
+        """Formata resultado para impressão no estilo Lisp."""
+        return format_value(result)
+
+    def quicken_report(self):
+        """Sem quickening no bytecode de pilha (as operações já são especializadas)."""
+        return []
+
+    # ==============================
+    #     Interface Pública
+    # ==============================
+
+    def call_function(self, func_name, args):
+        """Chama uma função diretamente (para testes)."""
+        if func_name not in self.functions:
+            print(f"ERRO: Função '{func_name}' não definida")
+            return []
+        # Chunk mínimo: empilha os argumentos, chama e para com o resultado no topo
+        consts = [runtime_value(arg) for arg in args] + [(func_name, len(args))]
+        code = []
+        for i in range(len(args)):
+            code += (OP_CONST, i)
+        code += (OP_CALL, len(args), OP_HALT, 0)
+        return self.run(Chunk(None, 0, code, tuple(consts)), [])
@@ -1,3 +1,5 @@
+import os
+import sys
 import ply.lex as lex
 
 # palavras reservadas (keywords) em um único dicionário
@@ -116,7 +118,30 @@ def t_error(t):
     t.lexer.skip(1)
 
 # Construção do lexer
-lexer = lex.lex()
+
+# Diretório das tabelas geradas (lextab.py e parsetab.py), distribuídas com o código
+TABLES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def build_lexer(optimize=True):
+    # Em modo otimizado as regras vêm de lextab.py e a validação é pulada;
+    # se a tabela não existir ela é gerada e gravada em TABLES_DIR
+    return lex.lex(module=sys.modules[__name__], optimize=optimize,
+                   lextab='lextab', outputdir=TABLES_DIR)
+
+_lexer = None
+
+def get_lexer():
+    # O lexer só é construído no primeiro uso
+    global _lexer
+    if _lexer is None:
+        _lexer = build_lexer()
+    return _lexer
+
+# Mantém "from tokens import lexer" funcionando, agora de forma preguiçosa
+def __getattr__(name):
+    if name == 'lexer':
+        return get_lexer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 
@@ -0,0 +1,5 @@
+# conftest.py - Os módulos do compilador ficam em src/ e se importam pelo nome
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
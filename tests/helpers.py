@@ -0,0 +1,88 @@
+# helpers.py - Compilação e execução de programas pequenos nos testes
+import contextlib
+import io
+import random
+
+from codegen import CodeGenerator
+from fastlexer import FastLexer
+from interpreter import Interpreter
+from optimizer import optimize
+from parser import get_parser
+
+
+def parse(source):
+    return get_parser().parse(source, lexer=FastLexer())
+
+
+def compile_source(source, opt_level=0, **options):
+    """Fonte -> código intermediário (otimizado em opt_level)."""
+    code, _ = optimize(CodeGenerator().generate(parse(source)), opt_level, **options)
+    return code
+
+
+def output(run):
+    """Linhas impressas por run(), sem a posição da instrução que falhou
+    (ela depende do formato do código)."""
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        run()
+    return [line for line in out.getvalue().splitlines() if not line.startswith('Erro na instrução')]
+
+
+def run_source(source, opt_level=0, interpreter=None, **options):
+    """Saída do programa executado no Interpreter (ou no backend dado)."""
+    code = compile_source(source, opt_level, **options)
+    interpreter = interpreter or Interpreter()
+    return output(lambda: interpreter.execute(code))
+
+
+def run_ast(source, backend):
+    """Saída do programa executado direto da AST (backends closure e stack)."""
+    return output(lambda: backend.execute_ast(parse(source)))
+
+
+# ==============================
+#     Programas aleatórios
+# ==============================
+
+def random_expression(rng, params, depth, functions):
+    leaves = ['nil', 't', str(rng.randint(0, 3))] + list(params)
+    if depth <= 0 or rng.random() < 0.3:
+        return rng.choice(leaves)
+
+    def sub():
+        return random_expression(rng, params, depth - 1, functions)
+
+    kind = rng.randrange(9)
+    if kind == 0:
+        return f"({rng.choice(['+', '-', '*'])} {sub()} {sub()})"
+    if kind == 1:
+        return f"({rng.choice(['<', '<=', '>', '>=', '=', '/='])} {sub()} {sub()})"
+    if kind == 2:
+        return f"(if {sub()} {sub()} {sub()})"
+    if kind == 3:
+        return f"(list {sub()} {sub()})"
+    if kind == 4:
+        return f"(car {sub()})"
+    if kind == 5:
+        return f"(cons {sub()} {sub()})"
+    if kind == 6:
+        return f"(cond ({sub()} {sub()}) ({sub()} {sub()}))"
+    if kind == 7 and functions:
+        name, arity = rng.choice(functions)
+        return f"({name} {' '.join(sub() for _ in range(arity))})"
+    return rng.choice(leaves)
+
+
+def random_program(seed):
+    """Programa pequeno com funções e expressões sobre nil, t, números e listas:
+    boa parte das comparações falha em tempo de execução."""
+    rng = random.Random(seed)
+    functions = []
+    forms = []
+    for i in range(rng.randint(1, 3)):
+        params = [f"p{j}" for j in range(rng.randint(1, 3))]
+        forms.append(f"(defun f{i} ({' '.join(params)}) {random_expression(rng, params, 3, functions)})")
+        functions.append((f"f{i}", len(params)))
+    for _ in range(3):
+        forms.append(random_expression(rng, [], 3, functions))
+    return '\n'.join(forms)
@@ -0,0 +1,71 @@
+# test_backends.py - Backends de execução (python, closure, stack): mesma saída do Interpreter
+import pytest
+
+from closures import ClosureBackend
+from helpers import run_ast, run_source, random_program
+from pybackend import PyBackend
+from stackvm import StackVM
+
+# Saída de cada backend, no nível de otimização dado
+BACKENDS = {
+    'python': lambda source, level: run_source(source, level, PyBackend(opt_level=level)),
+    'closure': lambda source, level: run_ast(source, ClosureBackend(opt_level=level)),
+    'stack': lambda source, level: run_ast(source, StackVM(opt_level=level)),
+}
+
+PROGRAMS = [
+    "(defun fat (n) (if (<= n 1) 1 (* n (fat (- n 1)))))\n(fat 10)\n(fat 20)",
+    "(defun soma (l acc) (if (eq l nil) acc (soma (cdr l) (+ acc (car l)))))\n(soma (list 1 2 3) 0)",
+    "(cond ((> 1 2) 1) ((< 1 2) (list 1 (cons 2 nil))))\n(car (cdr (list 1 2 3)))",
+    # Parâmetros e símbolos escritos como temporários
+    "(defun f (t1) (+ t1 1))\n(f 5)",
+    "(defun g (t1 x) (+ x (* t1 2)))\n(g 3 4)",
+    "(cons t9 1)\n(list foo t1 t2)",
+]
+
+# Erros e casos de borda: a saída inclui a mensagem de erro
+EDGE_CASES = [
+    # Função não definida, fora e em posição de cauda
+    "(defun f (x) (g x))\n(f 1)\n(+ 1 2)",
+    "(defun f (x) (if x (g x) 0))\n(f 0)\n(f 1)\n(+ 1 2)",
+    # Argumentos faltando (nil) e sobrando (ignorados)
+    "(defun f (a b) (list a b))\n(f 1)\n(f 1 2 3)",
+    # Erro em tempo de execução: a saída anterior não se repete
+    "(+ 1 2)\n(defun f (x) (< x 0))\n(f 5)\n(f nil)\n(+ 3 4)",
+    # LOAD de arquivo que não existe
+    "(+ 1 2)\n(load \"nao-existe.lisp\")\n(+ 3 4)",
+    # Recursão mais funda que a pilha do Python
+    "(defun conta (n) (if (= n 0) 0 (+ 1 (conta (- n 1)))))\n(+ 1 1)\n(conta 5000)\n(conta 3)",
+]
+
+
+@pytest.mark.parametrize('level', [0, 1])
+@pytest.mark.parametrize('source', PROGRAMS + EDGE_CASES)
+@pytest.mark.parametrize('backend', list(BACKENDS))
+def test_same_output_as_interpreter(backend, source, level):
+    assert BACKENDS[backend](source, level) == run_source(source, level)
+
+
+@pytest.mark.parametrize('backend', list(BACKENDS))
+def test_random_programs(backend):
+    for seed in range(150):
+        source = random_program(seed)
+        for level in (0, 1):
+            assert BACKENDS[backend](source, level) == run_source(source, level), f"semente {seed}"
+
+
+@pytest.mark.parametrize('backend', list(BACKENDS))
+def test_parameters_named_like_temps(backend):
+    source = "(defun f (t1) (+ t1 1))\n(f 5)\n(defun g (t1 x) (+ x (* t1 2)))\n(g 3 4)"
+    assert BACKENDS[backend](source, 0) == ['=> 6', '=> 10']
+
+
+@pytest.mark.parametrize('backend', list(BACKENDS))
+def test_load_failures(tmp_path, backend):
+    # Arquivo com erro de execução (com um PARAM pendente) e arquivo que não analisa
+    (tmp_path / 'err.lisp').write_text("(defun g (x) (+ 1 (< x 1)))\n(g nil)\n")
+    (tmp_path / 'ruim.lisp').write_text("(+ 1\n")
+    source = (f'(defun h (x) (list (load "{tmp_path / "err"}") x))\n(h 5)\n'
+              f'(load "{tmp_path / "ruim"}")\n(+ 2 2)')
+    for level in (0, 1):
+        assert BACKENDS[backend](source, level) == run_source(source, level)
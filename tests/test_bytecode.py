@@ -0,0 +1,44 @@
+# test_bytecode.py - Formato binário .lispc
+import struct
+
+import pytest
+
+import bytecode
+from codegen import allocate_slots
+from helpers import compile_source
+from interpreter import Interpreter
+
+SOURCE = "(defun f (a b) (if (< a b) (list a b) (cons b a)))\n(f 1 2)\n(f 3 1)"
+
+
+def encoded():
+    code, frame = allocate_slots(compile_source(SOURCE, 1))
+    return code, bytecode.encode(code, frame)
+
+
+def test_round_trip():
+    code, program = encoded()
+    loaded = bytecode.from_bytes(program.to_bytes())
+    assert loaded.decode() == code
+    assert loaded.frame == program.frame
+
+
+def test_every_opcode_has_a_handler():
+    interpreter = Interpreter()
+    for op in bytecode.OPCODES:
+        if op != 'LABEL':
+            assert interpreter.decode((op, None, (), None)) != interpreter.execute_unknown, op
+
+
+@pytest.mark.parametrize('version', [bytecode.FORMAT_VERSION - 1, bytecode.FORMAT_VERSION + 1])
+def test_other_version_is_rejected(version):
+    data = bytearray(encoded()[1].to_bytes())
+    struct.pack_into('<H', data, 4, version)
+    with pytest.raises(ValueError, match='versão'):
+        bytecode.from_bytes(bytes(data))
+
+
+def test_bad_magic_is_rejected():
+    data = b'XXXX' + encoded()[1].to_bytes()[4:]
+    with pytest.raises(ValueError):
+        bytecode.from_bytes(data)
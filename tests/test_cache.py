@@ -0,0 +1,23 @@
+# test_cache.py - Cache de código intermediário em disco
+from cache import CompileCache
+from compiler import LispCompiler
+
+
+def test_cache_is_off_by_default(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    compiler = LispCompiler()
+    assert compiler.cache is None
+    source = tmp_path / 'programa.lisp'
+    source.write_text('(defun f (x) (* x 2))\n(f 21)\n')
+    compiler.compile_and_execute_file(str(source))
+    assert not (tmp_path / '__lispcache__').exists()
+
+
+def test_cache_round_trip(tmp_path):
+    cache = CompileCache(str(tmp_path / 'cache'))
+    key = cache.key('(+ 1 2)', 'O0')
+    assert cache.get(key) is None
+    code = [('+', 1, 2, '%t1'), ('RESULT', '%t1', None, None)]
+    cache.put(key, code)
+    assert cache.get(key) == code
+    assert cache.key('(+ 1 2)', 'O1') != key
@@ -0,0 +1,38 @@
+# test_cfg.py - Simplificação do fluxo de controle
+from cfg import simplify_cfg
+from helpers import run_source
+
+
+def test_jump_to_next_block_keeps_comparison():
+    # Os dois caminhos do salto dão no mesmo bloco: sai o salto, fica a comparação
+    code = [('CMP_<', 'x', 0, '%t1'), ('IF_TRUE_GOTO', '%t1', None, 'L1'),
+            ('LABEL', None, None, 'L1'), ('RESULT', 'x', None, None)]
+    assert simplify_cfg(code) == [('CMP_<', 'x', 0, '%t1'), ('RESULT', 'x', None, None)]
+
+
+def test_fused_comparison_that_may_fail_is_kept():
+    code = [('IF_CMP_<', 'x', 0, 'L1'), ('LABEL', None, None, 'L1'), ('RESULT', 'x', None, None)]
+    simplified = simplify_cfg(code)
+    assert [instr[0] for instr in simplified] == ['IF_CMP_<', 'LABEL', 'RESULT']
+    assert simplified[0][3] == simplified[1][3]
+
+
+def test_fused_comparison_of_ints_is_removed():
+    code = [('IF_NOT_CMP_<', 1, 2, 'L1'), ('LABEL', None, None, 'L1'), ('RESULT', 'x', None, None)]
+    assert simplify_cfg(code) == [('RESULT', 'x', None, None)]
+
+
+def test_fused_comparison_is_inverted_without_changing_operator():
+    # Salta para o bloco seguinte e cai em outro: inverte o salto, não a comparação
+    code = [('IF_CMP_<', 'x', 0, 'L1'), ('GOTO', None, None, 'L2'),
+            ('LABEL', None, None, 'L1'), ('RESULT', 1, None, None),
+            ('LABEL', None, None, 'L2'), ('RESULT', 2, None, None)]
+    simplified = simplify_cfg(code)
+    assert simplified[0][:3] == ('IF_NOT_CMP_<', 'x', 0)
+    assert ('RESULT', 1, None, None) == simplified[1]
+
+
+def test_error_in_dropped_branch_condition():
+    source = "(defun f (x) (if (< x 0) 1 1))\n(f 5)\n(f nil)"
+    assert run_source(source, 1) == run_source(source, 0)
+    assert run_source(source, 1)[-1].startswith("Erro: '<' not supported")
@@ -0,0 +1,26 @@
+# test_closures.py - Modo closure: o que compila e o que volta ao Interpreter
+# (a saída comparada com a do Interpreter está em test_backends.py)
+from closures import ClosureBackend
+from helpers import run_ast
+
+
+def test_error_reruns_only_that_expression():
+    source = "(+ 1 2)\n(defun f (x) (< x 0))\n(f 5)\n(f nil)\n(+ 3 4)"
+    backend = ClosureBackend()
+    run_ast(source, backend)
+    assert backend.closure_stats == {'closure': 2, 'interpreted': 0, 'fallbacks': 1}
+    assert 'f' in backend.closures   # A função continua compilada
+
+
+def test_deep_recursion_reruns_only_that_expression():
+    source = ("(defun conta (n) (if (= n 0) 0 (+ 1 (conta (- n 1)))))\n"
+              "(+ 1 1)\n(conta 5000)\n(conta 3)")
+    backend = ClosureBackend()
+    run_ast(source, backend)
+    assert backend.closure_stats['fallbacks'] == 1
+
+
+def test_only_unsupported_form_uses_intermediate_code():
+    backend = ClosureBackend()
+    run_ast("(+ 1 2)\n(load \"nao-existe.lisp\")\n(+ 3 4)", backend)
+    assert backend.closure_stats == {'closure': 2, 'interpreted': 1, 'fallbacks': 0}
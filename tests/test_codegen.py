@@ -0,0 +1,37 @@
+# test_codegen.py - Código intermediário gerado
+import pytest
+
+from codegen import CodeGenerator, is_temp
+from helpers import parse, run_source
+
+# Parâmetros e símbolos que começam com t não são temporários
+SOURCE = """
+(defun f (total tmp) (if total tmp total))
+(defun g (tmp) (cond ((eq tmp 0) tmp) (t (+ (if tmp tmp 0) 1))))
+(f 1 5)
+(f nil 7)
+(g 0)
+(g 4)
+"""
+
+
+def test_symbols_starting_with_t_are_not_temps():
+    code = CodeGenerator().generate(parse(SOURCE))
+    returned = {instr[1] for instr in code if instr[0] == 'RETURN'}
+    assert not returned & {'total', 'tmp'}
+    assert not any(is_temp(name) for name in ('total', 'tmp', 't', 'T', 't1x', 't1', 't9'))
+    assert is_temp(CodeGenerator().new_temp())
+
+
+@pytest.mark.parametrize('level', [0, 1])
+def test_symbols_starting_with_t_run(level):
+    assert run_source(SOURCE, level) == ['=> 5', '=> NIL', '=> 0', '=> 5']
+
+
+# Símbolos escritos como os temporários antigos (t1, t2...) são constantes
+SYMBOLS = "(cons t9 1)\n(list foo t1 t2)"
+
+
+@pytest.mark.parametrize('level', [0, 1])
+def test_symbols_named_like_temps_are_constants(level):
+    assert run_source(SYMBOLS, level) == ['=> (t9 . 1)', '=> (foo t1 t2)']
@@ -0,0 +1,73 @@
+# test_inline.py - Expansão em linha de funções pequenas (-O1)
+import pytest
+
+from benchmark import CONSTANT_PROGRAM, DIFF_PROGRAMS, INLINE_PROGRAMS, SAMPLE_PROGRAM
+from codegen import CodeGenerator, is_temp
+from helpers import compile_source, parse, run_source
+from inline import candidates, inline_functions
+
+
+def generate(source):
+    return CodeGenerator().generate(parse(source))
+
+
+def inline(source, size=12):
+    stats = {}
+    return inline_functions(generate(source), size, stats), stats
+
+
+def test_body_is_renamed_at_each_call():
+    source = "(defun sinal (n) (if (< n 0) (- 0 n) n))\n(+ (sinal 5) (sinal (- 0 3)))"
+    code, stats = inline(source)
+    assert stats == {'sinal': 2}
+    # Labels e temporários novos: nenhum definido duas vezes
+    labels = [instr[3] for instr in code if instr[0] == 'LABEL']
+    assert len(labels) == len(set(labels))
+    top = code[next(i for i, instr in enumerate(code) if instr[0] == 'FUNC_END') + 1:]
+    body = {instr[3] for instr in code[:len(code) - len(top)] if is_temp(instr[3])}
+    assert not body & {instr[3] for instr in top if is_temp(instr[3])}
+    assert run_source(source, 1) == run_source(source, 0) == ['=> 8']
+
+
+def test_parameters_named_like_temps():
+    # Os parâmetros t1 e t2 não se confundem com os temporários do corpo
+    source = "(defun id (t1) t1)\n(defun w (t2) (+ (id t2) (id 1)))\n(w 5)\n(id 7)"
+    assert inline(source)[1] == {'id': 3, 'w': 1}
+    assert run_source(source, 1) == run_source(source, 1, inline_size=0) == ['=> 6', '=> 7']
+    # A definição de id fica como estava, para as chamadas não expandidas
+    code = compile_source(source, 1)
+    start = code.index(('FUNC_BEGIN', 'id', None, None))
+    assert code[start + 2] == ('RETURN', 't1', None, None)
+
+
+def test_recursive_functions_are_not_candidates():
+    code = generate("(defun fat (n) (if (<= n 1) 1 (* n (fat (- n 1)))))\n"
+                    "(defun par (n) (if (= n 0) t (impar (- n 1))))\n"
+                    "(defun impar (n) (if (= n 0) nil (par (- n 1))))\n"
+                    "(defun dobro (x) (* x 2))")
+    assert set(candidates(code, 100)) == {'dobro'}
+
+
+def test_arity_mismatch_is_not_expanded():
+    source = "(defun f (a b) (list a b))\n(f 1)\n(f 1 2 3)\n(f 1 2)"
+    assert inline(source)[1] == {'f': 1}
+    assert run_source(source, 1) == run_source(source, 0) == ['=> (1 NIL)', '=> (1 2)', '=> (1 2)']
+
+
+def test_unit_with_load_is_left_alone():
+    code = generate("(defun dobro (x) (* x 2))\n(load \"outro\")\n(dobro 3)")
+    stats = {}
+    assert inline_functions(code, 12, stats) == code
+    assert stats == {}
+
+
+# Mesma conferência do "benchmark.py inline": -O1 com e sem expansão dá a saída de -O0
+PROGRAMS = dict(DIFF_PROGRAMS, exemplo=SAMPLE_PROGRAM, constantes=CONSTANT_PROGRAM)
+PROGRAMS.update((name, source) for name, (source, _) in INLINE_PROGRAMS.items())
+
+
+@pytest.mark.parametrize('size', [0, 12])
+@pytest.mark.parametrize('name', list(PROGRAMS))
+def test_same_output_as_without_optimization(name, size):
+    source = PROGRAMS[name]
+    assert run_source(source, 1, inline_size=size) == run_source(source, 0)
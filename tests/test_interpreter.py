@@ -0,0 +1,34 @@
+# test_interpreter.py - Interpreter: LOAD, predicados e quickening
+import pytest
+
+from helpers import run_source
+from interpreter import Interpreter, QUICKEN_AFTER
+from pybackend import PyBackend
+
+
+@pytest.mark.parametrize('backend', [Interpreter, PyBackend])
+@pytest.mark.parametrize('level', [0, 1])
+def test_load_error_unwinds_the_loaded_file(tmp_path, backend, level):
+    # Erro dentro de uma função do arquivo, chamada com um PARAM pendente
+    (tmp_path / 'err.lisp').write_text("(defun g (x) (+ 1 (< x 1)))\n(g nil)\n")
+    source = f'(defun h (x) (list (load "{tmp_path / "err"}") x))\n(h 5)\n(+ 2 2)'
+    lines = run_source(source, level, backend())
+    assert lines[-2:] == ['=> (NIL 5)', '=> 4']
+
+
+@pytest.mark.parametrize('level', [0, 1])
+def test_equalp_compares_numbers_by_text(level):
+    # 1.0 e 1: o mesmo resultado da comparação pelo texto
+    assert run_source("(equalp (expt 1 (- 0 1)) 1)\n(equalp 2 2)", level) == ['=> NIL', '=> T']
+
+
+@pytest.mark.parametrize('count_hits', [False, True])
+def test_quickening_hits_counted_only_on_request(count_hits):
+    interpreter = Interpreter()
+    interpreter.count_hits = count_hits
+    run_source("(defun soma (n acc) (if (= n 0) acc (soma (- n 1) (+ acc n))))\n(soma 100 0)",
+               interpreter=interpreter)
+    report = {row[0]: row[1:] for row in interpreter.quicken_report()}
+    specialized, _, hits, misses, _ = report['+']
+    assert specialized == 1 and misses == 0
+    assert hits == (100 - QUICKEN_AFTER if count_hits else None)
@@ -0,0 +1,45 @@
+# test_lexer.py - O lexer rápido (e o TokenStream) produz os mesmos tokens do PLY
+import pytest
+
+from fastlexer import tokenize, scan
+from tokens import get_lexer
+
+SOURCES = [
+    "(+ 1 2)",
+    "(defun soma (a b) (+ a b))\n(soma 10 20)",
+    "; comentário\n(list 1 \"texto com ; e (parênteses)\" nil t)",
+    "(string= \"a\" \"b\") (string-equal x y) (equalp a b) (/= 1 2) (<= 1 2)",
+    "(floor 7 2) (mod 7 2) (expt 2 10) (car (cdr (cons 1 nil)))",
+    "(cond ((eq a b) 1)\n      ((eql a c) 2)\n      (t 3))",
+    "(load \"outro.lisp\") simbolo-com-hifen *especial* x1",
+    "",
+]
+
+
+def key(tok):
+    return (tok.type, tok.value, tok.lineno, tok.lexpos)
+
+
+def ply_tokens(source):
+    lexer = get_lexer().clone()
+    lexer.lineno = 1    # O lexer global guarda a linha do último uso
+    lexer.input(source)
+    return [key(tok) for tok in lexer]
+
+
+@pytest.mark.parametrize('source', SOURCES)
+def test_fast_lexer_matches_ply(source):
+    fast = [key(tok) for batch in tokenize(source) for tok in batch]
+    assert fast == ply_tokens(source)
+
+
+@pytest.mark.parametrize('source', SOURCES)
+def test_token_stream_matches_ply(source):
+    assert [key(tok) for tok in scan(source)] == ply_tokens(source)
+
+
+def test_batches_split_long_input():
+    source = "(+ 1 2)\n" * 2000
+    batches = list(tokenize(source, batch_size=100))
+    assert len(batches) > 1
+    assert [key(tok) for batch in batches for tok in batch] == ply_tokens(source)
@@ -0,0 +1,59 @@
+# test_optimizer.py - -O1 não muda o que o programa faz, inclusive quando ele falha
+import pytest
+
+from helpers import compile_source, run_source, random_program
+from optimizer import dead_temp_elimination, may_fail
+
+PROGRAMS = [
+    "(defun fat (n) (if (<= n 1) 1 (* n (fat (- n 1)))))\n(fat 10)",
+    "(defun soma (l) (if (eq l nil) 0 (+ (car l) (soma (cdr l)))))\n(soma (list 1 2 3 4))",
+    "(+ (* 2 3) (- 10 4))\n(cond ((> 1 2) 1) ((< 1 2) 2))",
+    "(defun quadrado (x) (* x x))\n(defun f (a) (+ (quadrado a) 1))\n(f 7)",
+]
+
+# Erros em tempo de execução cujo resultado não é usado: -O1 não pode removê-los
+ERROR_PROGRAMS = [
+    # Argumento não usado por uma função expandida em linha
+    "(defun f0 (p0 p1 p2) p2)\n(f0 (<= nil 0) (list 1) (list 9))",
+    "(defun f (a b) b)\n(+ 1 2)\n(f (< (list 1) 2) 5)\n(+ 3 4)",
+    "(defun k (a b) b)\n(k (expt 0 (- 0 1)) 3)",
+    # Condição de um if cujos dois ramos dão no mesmo valor
+    "(if (< nil 0) 1 1)",
+    # Comparação fundida com o salto (IF_NOT_CMP_x): o erro cita o operador original
+    "(defun g (x) (if (> x 0) x x))\n(g 2)\n(g nil)",
+    "(cond ((>= nil 1) 2) (t 2))",
+    "(defun h (x) (if (< x 0) 0 x))\n(h 5)\n(h nil)",
+]
+
+
+@pytest.mark.parametrize('source', PROGRAMS)
+def test_same_results(source):
+    assert run_source(source, 1) == run_source(source, 0)
+
+
+@pytest.mark.parametrize('source', ERROR_PROGRAMS)
+def test_same_errors(source):
+    expected = run_source(source, 0)
+    assert any(line.startswith('Erro:') for line in expected)
+    assert run_source(source, 1) == expected
+
+
+def test_random_programs():
+    for seed in range(300):
+        source = random_program(seed)
+        assert run_source(source, 1) == run_source(source, 0), f"semente {seed}:\n{source}"
+
+
+def test_dead_fallible_ops_are_kept():
+    stats = {'removed': 0}
+    code = [('CMP_<', 'x', 0, '%t1'), ('expt', 0, -1, '%t2'), ('+', 'x', 1, '%t3'),
+            ('CMP_<', 1, 2, '%t4'), ('+', 1, 2, '%t5'), ('CAR', 'x', None, '%t6')]
+    kept = dead_temp_elimination(code, stats)
+    assert kept == code[:3]
+    assert stats['removed'] == 3
+    assert not may_fail(('CONS', 'x', 'y', '%t1'))
+
+
+def test_unused_constant_comparison_disappears():
+    code = compile_source("(defun f (a b) b)\n(f (< 1 2) 5)", 1)
+    assert not any(instr[0].startswith('CMP_') for instr in code)
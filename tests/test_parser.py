@@ -0,0 +1,63 @@
+# test_parser.py - Listas da gramática (formas, parâmetros, argumentos, cláusulas)
+import pytest
+
+from fastlexer import FastLexer
+from nodes import DEFUN, LIST, COND, CALL
+from parser import get_parser
+from tokens import get_lexer
+
+
+def parse(source, lexer=None):
+    return get_parser().parse(source, lexer=lexer or FastLexer())
+
+
+@pytest.mark.parametrize('source', [
+    "(defun soma (a b c) (+ a (+ b c)))\n(soma 1 2 3)",
+    "(cond ((eq x 1) 10) ((< x 5) 20) (t 30))",
+    "(list 1 (list 2 3) nil t)\n(f)\n(defun g () 0)",
+])
+def test_fast_lexer_gives_same_ast_as_ply(source):
+    ply = get_lexer().clone()
+    assert repr(parse(source, ply)) == repr(parse(source))
+
+
+def test_sequence_keeps_form_order():
+    ast = parse('\n'.join(f'(+ {i} 1)' for i in range(500)))
+    assert [node.left.value for node in ast] == list(range(500))
+
+
+def test_long_argument_list_in_order():
+    n = 5000
+    node, = parse('(list ' + ' '.join(str(i) for i in range(n)) + ')')
+    assert node.kind == LIST
+    assert [item.value for item in node.items] == list(range(n))
+
+    node, = parse('(f ' + ' '.join(str(i) for i in range(n)) + ')')
+    assert node.kind == CALL
+    assert [arg.value for arg in node.args] == list(range(n))
+
+
+def test_long_parameter_list_in_order():
+    node, = parse('(defun f (' + ' '.join(f'p{i}' for i in range(3000)) + ') 0)')
+    assert node.kind == DEFUN
+    assert node.params == [f'p{i}' for i in range(3000)]
+
+
+def test_long_cond_in_order():
+    node, = parse('(cond ' + ' '.join(f'((eq x {i}) {i})' for i in range(2000)) + ')')
+    assert node.kind == COND
+    assert [body.value for _, body in node.clauses] == list(range(2000))
+
+
+def test_empty_lists():
+    defun, call = parse('(defun f () 0) (f)')
+    assert defun.params == []
+    assert call.args == []
+
+
+@pytest.mark.parametrize('make_lexer', [lambda: get_lexer().clone(), FastLexer])
+def test_number_span_covers_leading_zeros(make_lexer):
+    source = '(+ 007 x)'
+    node, = parse(source, make_lexer())
+    assert node.left.value == 7
+    assert source[node.left.start:node.left.end] == '007'
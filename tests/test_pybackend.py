@@ -0,0 +1,33 @@
+# test_pybackend.py - Backend Python: trechos e execução refeita no Interpreter
+# (a saída comparada com a do Interpreter está em test_backends.py)
+from helpers import compile_source, output, run_source
+from pybackend import PyBackend, statements
+
+
+def test_error_reruns_only_that_expression():
+    source = "(+ 1 2)\n(defun f (x) (< x 0))\n(f 5)\n(f nil)\n(+ 3 4)"
+    backend = PyBackend()
+    run_source(source, 0, backend)
+    assert backend.native_stats['fallbacks'] == 1
+
+
+def test_deep_recursion_reruns_only_that_expression():
+    source = ("(defun conta (n) (if (= n 0) 0 (+ 1 (conta (- n 1)))))\n"
+              "(+ 1 1)\n(conta 5000)\n(conta 3)")
+    backend = PyBackend()
+    run_source(source, 0, backend)
+    assert backend.native_stats['fallbacks'] == 1
+
+
+def test_one_statement_per_expression():
+    code = compile_source("(+ 1 2)\n(defun f (x) x)\n(if (f 1) 2 3)\n(f 4)", 1)
+    chunks = statements(code)
+    assert len(chunks) == 3
+    assert all(chunk[-1][0] == 'RESULT' for chunk in chunks)
+
+
+def test_unit_is_run_once():
+    backend = PyBackend()
+    code = compile_source("(+ 1 2)\n(+ 3 4)")
+    assert output(lambda: backend.execute(code)) == ['=> 3', '=> 7']
+    assert backend.native_stats == {'native': 1, 'interpreted': 0, 'fallbacks': 0}